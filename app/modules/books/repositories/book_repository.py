@@ -1,8 +1,10 @@
 from typing import Optional, List
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import or_, func, cast, literal_column, Float
+from app.config.settings import settings
 from app.shared.base_repository import BaseRepository
 from app.modules.books.models.book import Book
+from app.modules.books.search import TEXT_SEARCH_CONFIG, looks_like_isbn, search_schema_installed
 
 class BookRepository(BaseRepository[Book]):
     def __init__(self, db: Session):
@@ -13,6 +15,13 @@ class BookRepository(BaseRepository[Book]):
 
     def search(self, term: str, skip: int, limit: int) -> List[Book]:
         q = self.db.query(Book)
+        term = term.strip() if term else term
+        if term and looks_like_isbn(term):
+            book = self.get_by_isbn(term)
+            if book:
+                return [book][skip:skip + limit]
+        if term and self._full_text_search_available():
+            return self._ranked_search(term, skip, limit)
         if term:
             q = q.filter(or_(
                 Book.title.ilike(f"%{term}%"),
@@ -20,3 +29,29 @@ class BookRepository(BaseRepository[Book]):
                 Book.genre.ilike(f"%{term}%"),
             ))
         return q.offset(skip).limit(limit).all()
+
+    def _full_text_search_available(self) -> bool:
+        bind = self.db.get_bind()
+        return (
+            settings.FULL_TEXT_SEARCH_ENABLED
+            and bind.dialect.name == "postgresql"
+            and search_schema_installed(bind)
+        )
+
+    def _ranked_search(self, term: str, skip: int, limit: int) -> List[Book]:
+        # Full-text, fuzzy and substring matches, most relevant first
+        search_vector = literal_column("books.search_vector")
+        ts_query = func.websearch_to_tsquery(literal_column(f"'{TEXT_SEARCH_CONFIG}'::regconfig"), term)
+        rank = (
+            cast(func.ts_rank_cd(search_vector, ts_query), Float)
+            + cast(func.greatest(func.word_similarity(term, Book.title), func.word_similarity(term, Book.author)), Float)
+        )
+        q = self.db.query(Book).filter(or_(
+            search_vector.op("@@")(ts_query),
+            Book.title.op("%>")(term),
+            Book.author.op("%>")(term),
+            Book.title.ilike(f"%{term}%"),
+            Book.author.ilike(f"%{term}%"),
+            Book.genre.ilike(f"%{term}%"),
+        ))
+        return q.order_by(rank.desc(), Book.id).offset(skip).limit(limit).all()
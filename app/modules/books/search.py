@@ -0,0 +1,50 @@
+import re
+from typing import Dict
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+# Text search configuration of the stored vector; queries must use the same one
+TEXT_SEARCH_CONFIG = "english"
+
+SEARCH_VECTOR = (
+    f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(author, '')), 'B') || "
+    f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(genre, '')), 'C')"
+)
+
+SEARCH_SCHEMA_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"ALTER TABLE books ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR}) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_books_search_vector ON books USING gin (search_vector)",
+    *[
+        f"CREATE INDEX IF NOT EXISTS ix_books_{column}_trgm ON books USING gin ({column} gin_trgm_ops)"
+        for column in ("title", "author", "genre")
+    ],
+]
+
+# Database URL -> whether books.search_vector exists there
+_schema_installed: Dict[str, bool] = {}
+
+ISBN_PATTERN = re.compile(r"^[0-9][0-9\- ]{8,15}[0-9Xx]$")
+
+def looks_like_isbn(term: str) -> bool:
+    digits = re.sub(r"[\- ]", "", term)
+    return bool(ISBN_PATTERN.match(term)) and len(digits) in (10, 13)
+
+def install_search_schema(engine: Engine) -> bool:
+    # PostgreSQL only; idempotent, so it also upgrades existing catalogs
+    if engine.dialect.name != "postgresql":
+        return False
+    with engine.begin() as conn:
+        for statement in SEARCH_SCHEMA_DDL:
+            conn.execute(text(statement))
+    _schema_installed[str(engine.url)] = True
+    return True
+
+def search_schema_installed(engine: Engine) -> bool:
+    # Checked once per database; deployments that never ran scripts/init_db.py keep substring search
+    key = str(engine.url)
+    if key not in _schema_installed:
+        columns = inspect(engine).get_columns("books")
+        _schema_installed[key] = any(column["name"] == "search_vector" for column in columns)
+    return _schema_installed[key]
@@ -12,11 +12,14 @@ from app.shared.base_model import Base
 from app.modules.users.models.user import User
 from app.modules.books.models.book import Book
 from app.modules.loans.models.loan import Loan
+from app.modules.books.search import install_search_schema
 
 def init_db():
     print("Creating database tables...")
     Base.metadata.create_all(bind=engine)
     print("Database tables created successfully!")
+    if install_search_schema(engine):
+        print("Full-text search schema installed!")
 
 if __name__ == "__main__":
     init_db()
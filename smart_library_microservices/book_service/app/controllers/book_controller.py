@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, List
+from library_common.imports import iter_records
+from library_common.serialization import FastJSONResponse
 from app.config.database import get_db
 from app.services.book_service import BookService
 from app.schemas.book import (
     BookCreate, BookUpdate, BookResponse, BookSearchResponse,
-    BookAvailabilityUpdate, BookAvailabilityResponse
+    BookAvailabilityUpdate, BookAvailabilityResponse, BookBatchResponse,
+    BulkAvailabilityRequest, BulkAvailabilityResponse, AutocompleteResponse,
+    ImportFormat, IMPORT_CSV_COLUMNS, BookImportResponse
 )
-from app.core.exceptions import BookServiceException
+from app.core.exceptions import BookServiceException, InvalidBookDataException, InvalidImportFileException
 from app.core.logging import logger
 
 router = APIRouter(prefix="/api/books", tags=["books"])
@@ -15,27 +19,128 @@ router = APIRouter(prefix="/api/books", tags=["books"])
 @router.post("", response_model=BookResponse, status_code=status.HTTP_201_CREATED)
 async def create_book(
     book_data: BookCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> BookResponse:
     """Create a new book"""
     try:
         service = BookService(db)
-        return service.create_book(book_data)
+        return await service.create_book(book_data)
     except BookServiceException as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
         logger.error(f"Unexpected error creating book: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.post("/import", response_model=BookImportResponse)
+async def import_books(
+    request: Request,
+    format: Optional[ImportFormat] = Query(None, description="csv or ndjson; defaults to csv for a text/csv body"),
+    db: AsyncSession = Depends(get_db)
+) -> BookImportResponse:
+    """Create books from a streamed CSV or NDJSON body, reporting rows that could not be created"""
+    try:
+        if format is None:
+            format = ImportFormat.CSV if "csv" in request.headers.get("content-type", "") else ImportFormat.NDJSON
+        service = BookService(db)
+        return await service.import_books(iter_records(
+            request.stream(), format, IMPORT_CSV_COLUMNS, InvalidImportFileException
+        ))
+    except BookServiceException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        logger.error(f"Unexpected error importing books: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+def parse_ids(ids: str) -> List[int]:
+    """Parse a comma-separated list of IDs, dropping duplicates but keeping order"""
+    try:
+        parsed = [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise InvalidBookDataException({"ids": "ids must be a comma-separated list of integers"})
+    return list(dict.fromkeys(parsed))
+
+@router.get("/batch", response_model=BookBatchResponse)
+async def get_books_batch(
+    ids: str = Query(..., description="Comma-separated book IDs"),
+    db: AsyncSession = Depends(get_db)
+) -> FastJSONResponse:
+    """Get several books by ID in one request"""
+    try:
+        service = BookService(db)
+        books, not_found = await service.get_books(parse_ids(ids))
+        return FastJSONResponse(BookBatchResponse.model_construct(books=books, not_found=not_found))
+    except BookServiceException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        logger.error(f"Unexpected error fetching books batch: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.get("/autocomplete", response_model=AutocompleteResponse)
+async def autocomplete(
+    q: str = Query(..., min_length=1, max_length=100, description="What has been typed so far"),
+    limit: int = Query(10, ge=1, le=20),
+    db: AsyncSession = Depends(get_db)
+) -> AutocompleteResponse:
+    """Suggest titles and authors for a partly typed query"""
+    try:
+        service = BookService(db)
+        return AutocompleteResponse(query=q, suggestions=await service.autocomplete(q, limit))
+    except BookServiceException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        logger.error(f"Unexpected error suggesting books: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.get("/available", response_model=BookSearchResponse)
+async def get_available_books(
+    page: int = Query(1, ge=1),
+    per_page: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page; replaces page"),
+    db: AsyncSession = Depends(get_db)
+) -> FastJSONResponse:
+    """List books with available copies"""
+    try:
+        service = BookService(db)
+        result = await service.get_available_books(page, per_page, cursor)
+        
+        return FastJSONResponse(BookSearchResponse.model_construct(
+            books=result.items,
+            total=result.total,
+            page=page if cursor is None else None,
+            per_page=per_page,
+            next_cursor=result.next_cursor,
+            total_exact=result.total_exact
+        ))
+    except BookServiceException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        logger.error(f"Unexpected error listing available books: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.patch("/batch/availability", response_model=BulkAvailabilityResponse)
+async def bulk_update_availability(
+    request: BulkAvailabilityRequest,
+    db: AsyncSession = Depends(get_db)
+) -> BulkAvailabilityResponse:
+    """Update availability of many books in one transaction"""
+    try:
+        service = BookService(db)
+        return await service.bulk_update_availability(request)
+    except BookServiceException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        logger.error(f"Unexpected error bulk updating availability: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @router.get("/{book_id}", response_model=BookResponse)
 async def get_book(
     book_id: int,
-    db: Session = Depends(get_db)
-) -> BookResponse:
+    db: AsyncSession = Depends(get_db)
+) -> FastJSONResponse:
     """Get book by ID"""
     try:
         service = BookService(db)
-        return service.get_book(book_id)
+        return FastJSONResponse(await service.get_book(book_id))
     except BookServiceException as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
@@ -46,12 +151,12 @@ async def get_book(
 async def update_book(
     book_id: int,
     book_data: BookUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> BookResponse:
     """Update book"""
     try:
         service = BookService(db)
-        return service.update_book(book_id, book_data)
+        return await service.update_book(book_id, book_data)
     except BookServiceException as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
@@ -62,12 +167,12 @@ async def update_book(
 async def update_book_availability(
     book_id: int,
     update: BookAvailabilityUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> BookAvailabilityResponse:
     """Update book availability"""
     try:
         service = BookService(db)
-        result = service.update_availability(book_id, update)
+        result = await service.update_availability(book_id, update)
         return BookAvailabilityResponse(**result)
     except BookServiceException as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
@@ -78,12 +183,12 @@ async def update_book_availability(
 @router.delete("/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_book(
     book_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> None:
     """Delete book"""
     try:
         service = BookService(db)
-        service.delete_book(book_id)
+        await service.delete_book(book_id)
     except BookServiceException as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
@@ -95,19 +200,32 @@ async def search_books(
     search: Optional[str] = Query(None, description="Search term"),
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db)
-) -> BookSearchResponse:
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page; replaces page"),
+    exact_total: bool = Query(False, description="Always count exactly instead of estimating large totals"),
+    genre: Optional[str] = Query(None, description="Exact genre"),
+    author: Optional[str] = Query(None, description="Exact author"),
+    available: Optional[bool] = Query(None, description="Only books with (true) or without (false) available copies"),
+    facets: bool = Query(False, description="Include genre, author and availability counts over all matches"),
+    db: AsyncSession = Depends(get_db)
+) -> FastJSONResponse:
     """Search books with pagination"""
     try:
         service = BookService(db)
-        books, total = service.search_books(search, page, per_page)
-        
-        return BookSearchResponse(
-            books=books,
-            total=total,
-            page=page,
-            per_page=per_page
+        result, facet_counts = await service.search_books(
+            search, page, per_page, cursor, exact_total, genre, author, available, facets
         )
+        
+        return FastJSONResponse(BookSearchResponse.model_construct(
+            books=result.items,
+            total=result.total,
+            page=page if cursor is None else None,
+            per_page=per_page,
+            next_cursor=result.next_cursor,
+            total_exact=result.total_exact,
+            facets=facet_counts
+        ))
+    except BookServiceException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
         logger.error(f"Unexpected error searching books: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -41,6 +41,30 @@ class InsufficientCopiesException(BookServiceException):
             status_code=400
         )
 
+class CopiesLimitExceededException(BookServiceException):
+    """Raised when available copies would exceed total copies"""
+    def __init__(self, book_id: int, requested: int, copies: int):
+        super().__init__(
+            message=f"Available copies for book {book_id} cannot exceed total copies. Requested: {requested}, Copies: {copies}",
+            status_code=400
+        )
+
+class InvalidImportFileException(BookServiceException):
+    """Raised when an import file cannot be read at all"""
+    def __init__(self, reason: str):
+        super().__init__(
+            message=f"Invalid import file: {reason}",
+            status_code=400
+        )
+
+class AutocompleteUnavailableException(BookServiceException):
+    """Raised when suggestions are requested while the autocomplete index is disabled"""
+    def __init__(self):
+        super().__init__(
+            message="Autocomplete is not enabled",
+            status_code=503
+        )
+
 class BookNotDeletableException(BookServiceException):
     """Raised when book cannot be deleted"""
     def __init__(self, book_id: int, reason: str):
@@ -0,0 +1,103 @@
+import re
+from typing import Dict
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import SQLAlchemyError
+from app.config.settings import settings
+from app.core.logging import logger
+
+# Text search configuration of the stored vector; queries must use the same one
+TEXT_SEARCH_CONFIG = "english"
+
+SEARCH_VECTOR = (
+    f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(author, '')), 'B') || "
+    f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(genre, '')), 'C')"
+)
+
+SEARCH_INDEXES = {
+    "ix_books_search_vector": "search_vector",
+    # Serve substring (ILIKE) and fuzzy (%>) matches
+    **{f"ix_books_{column}_trgm": f"{column} gin_trgm_ops" for column in ("title", "author", "isbn", "genre")},
+}
+
+# Run once per database by scripts/install_search.py, not at startup. Idempotent, so it also upgrades
+# catalogs created before search was added and resumes an interrupted run
+SEARCH_SCHEMA_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # Rewrites the table; the indexes are then built without blocking writes
+    f"ALTER TABLE books ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR}) STORED",
+    *[
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON books USING gin ({expression})"
+        for name, expression in SEARCH_INDEXES.items()
+    ],
+]
+
+ISBN_PATTERN = re.compile(r"^[0-9][0-9\- ]{8,15}[0-9Xx]$")
+
+def looks_like_isbn(term: str) -> bool:
+    """Whether a search term is an ISBN-10 or ISBN-13, with or without separators"""
+    digits = re.sub(r"[\- ]", "", term)
+    return bool(ISBN_PATTERN.match(term)) and len(digits) in (10, 13)
+
+def _index_validity(conn: Connection) -> Dict[str, bool]:
+    """Whether each search index that exists is valid; a failed concurrent build leaves an invalid one"""
+    rows = conn.execute(
+        text(
+            "SELECT index_class.relname, pg_index.indisvalid FROM pg_index "
+            "JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid "
+            "WHERE pg_index.indrelid = to_regclass('books') AND index_class.relname = ANY(:names)"
+        ),
+        {"names": list(SEARCH_INDEXES)}
+    ).all()
+    return {name: valid for name, valid in rows}
+
+def install_search_schema(engine: Engine) -> None:
+    """Create the search column and indexes; concurrent index builds cannot run inside a transaction"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # IF NOT EXISTS would keep an invalid index left by an earlier failed run
+        for name, valid in _index_validity(conn).items():
+            if not valid:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        for statement in SEARCH_SCHEMA_DDL:
+            logger.info(f"Running: {statement[:80]}")
+            conn.execute(text(statement))
+
+class FullTextSearch:
+    """PostgreSQL full-text and trigram search, used once its schema is installed"""
+    
+    def __init__(self):
+        self.enabled = False
+    
+    def detect(self, engine: Engine) -> bool:
+        """Check that the search column and indexes are installed; search falls back to ILIKE when they are not"""
+        self.enabled = False
+        if engine.dialect.name != "postgresql" or not settings.FULL_TEXT_SEARCH_ENABLED:
+            return False
+        
+        try:
+            with engine.connect() as conn:
+                has_column = conn.execute(text(
+                    "SELECT 1 FROM information_schema.columns WHERE table_schema = current_schema() "
+                    "AND table_name = 'books' AND column_name = 'search_vector'"
+                )).first() is not None
+                validity = _index_validity(conn)
+        except SQLAlchemyError as e:
+            logger.warning(f"Full-text search unavailable, using substring search: {str(e)}")
+            return False
+        
+        missing = ([] if has_column else ["search_vector"]) + [
+            name for name in SEARCH_INDEXES if not validity.get(name)
+        ]
+        if missing:
+            logger.warning(
+                f"Full-text search not installed (missing {', '.join(missing)}), using substring search; "
+                f"run scripts/install_search.py"
+            )
+            return False
+        
+        self.enabled = True
+        logger.info("Full-text search enabled")
+        return True
+
+full_text_search = FullTextSearch()
@@ -6,10 +6,17 @@ from datetime import datetime
 from sqlalchemy import text
 
 from app.config.settings import settings
-from app.config.database import engine, get_db
-from app.models.book import Base
+from app.config.database import engine, async_engine, get_db
+from app.models.book import Base, Book
+from app.models.processed_operation import ProcessedOperation
 from app.controllers.book_controller import router as book_router
 from app.schemas.book import HealthResponse
+from app.core.search import full_text_search
+from app.services.search_index import book_search_index
+from app.services.autocomplete_index import autocomplete_index
+from app.services.index_refresher import search_index_refresher
+from app.services.idempotency_key_purger import idempotency_key_purger
+from app.core.cache import facet_cache
 from app.core.logging import logger
 
 # Create database tables
@@ -18,9 +25,22 @@ async def lifespan(app: FastAPI):
     logger.info(f"Starting {settings.SERVICE_NAME}")
     # Create tables
     Base.metadata.create_all(bind=engine)
+    # Indexes added to existing tables (create_all skips tables that exist)
+    for index in Book.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
     logger.info("Database tables created")
+    # The search schema is installed by scripts/install_search.py; until then search matches substrings
+    full_text_search.detect(engine)
+    # In-process indexes, refreshed with books other workers and replicas change
+    await search_index_refresher.rebuild()
+    await search_index_refresher.start()
+    await idempotency_key_purger.start()
     yield
     logger.info(f"Shutting down {settings.SERVICE_NAME}")
+    await search_index_refresher.stop()
+    await idempotency_key_purger.stop()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 # Create FastAPI app
 app = FastAPI(
@@ -57,21 +77,27 @@ async def health_check():
     """Health check endpoint"""
     try:
         # Check database connection
-        db = next(get_db())
-        db.execute(text("SELECT 1"))
+        async for db in get_db():
+            await db.execute(text("SELECT 1"))
         db_status = "healthy"
     except Exception as e:
         logger.error(f"Database health check failed: {str(e)}")
         db_status = "unhealthy"
-    finally:
-        if 'db' in locals():
-            db.close()
     
     return HealthResponse(
         status="healthy" if db_status == "healthy" else "degraded",
         service=settings.SERVICE_NAME,
         version=settings.SERVICE_VERSION,
         database=db_status,
+        idempotency_keys=idempotency_key_purger.stats(),
+        search={
+            "backend": settings.SEARCH_BACKEND,
+            "full_text": full_text_search.enabled,
+            "index": book_search_index.stats(),
+            "autocomplete": autocomplete_index.stats(),
+            "index_refresh": search_index_refresher.stats(),
+            "facet_cache": facet_cache.stats()
+        },
         timestamp=datetime.utcnow()
     )
 
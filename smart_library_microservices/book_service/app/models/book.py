@@ -1,4 +1,5 @@
 from sqlalchemy import Column, Integer, String, DateTime, CheckConstraint
+from sqlalchemy.orm import query_expression
 from sqlalchemy.sql import func
 from app.config.database import Base
 
@@ -7,13 +8,17 @@ class Book(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(500), nullable=False)
-    author = Column(String(255), nullable=False)
+    # Indexed for exact-match search filters
+    author = Column(String(255), nullable=False, index=True)
     isbn = Column(String(20), unique=True, index=True, nullable=False)
-    genre = Column(String(100), nullable=True)
+    genre = Column(String(100), nullable=True, index=True)
     copies = Column(Integer, nullable=False, default=1)
     available_copies = Column(Integer, nullable=False, default=1)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Indexed for the in-process search indexes' refresh of recently changed books
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
+    # Relevance of a ranked search result; only loaded by full-text search
+    search_rank = query_expression()
     
     __table_args__ = (
         CheckConstraint('copies >= 0', name='check_copies_positive'),
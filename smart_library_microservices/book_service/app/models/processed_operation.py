@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.config.database import Base
+
+class ProcessedOperation(Base):
+    """Idempotency key of an availability operation that has already been applied"""
+    __tablename__ = "processed_operations"
+    
+    idempotency_key = Column(String(64), primary_key=True)
+    book_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    
+    def __repr__(self):
+        return f"<ProcessedOperation(idempotency_key={self.idempotency_key}, book_id={self.book_id})>"
@@ -1,33 +1,96 @@
-from typing import Optional, List, Tuple
-from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+import heapq
+from typing import Optional, List, NamedTuple, AsyncIterator, Sequence, Any, Dict, Tuple, Set
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import (
+    func, or_, and_, select, insert, update, delete, union_all, cast, literal, literal_column,
+    Float, Integer, String, Select
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import with_expression
+from sqlalchemy.sql.elements import ColumnElement
+from library_common.pagination import Page, encode_cursor, decode_cursor, split_page, fetch_offset_page
 from app.models.book import Book
+from app.models.processed_operation import ProcessedOperation
 from app.schemas.book import BookCreate, BookUpdate
+from app.core.search import TEXT_SEARCH_CONFIG, full_text_search, looks_like_isbn
+from app.config.settings import settings
+
+# Ids per IN list when a query is restricted to many books
+ID_CHUNK_SIZE = 5000
+
+class AvailabilityChange(NamedTuple):
+    """Outcome of a conditional availability update"""
+    found: bool
+    applied: bool
+    copies: Optional[int] = None
+    available_copies: Optional[int] = None
+    updated_at: Optional[datetime] = None
+
+class BookFilters(NamedTuple):
+    """Exact-match filters on a book search; None means any"""
+    genre: Optional[str] = None
+    author: Optional[str] = None
+    available: Optional[bool] = None
 
 class BookRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
-    def create(self, book_data: BookCreate) -> Book:
+    async def create(self, book_data: BookCreate) -> Book:
         """Create a new book"""
         book = Book(**book_data.model_dump())
         book.available_copies = book.copies
         self.db.add(book)
-        self.db.commit()
-        self.db.refresh(book)
+        await self.db.commit()
+        await self.db.refresh(book)
         return book
     
-    def get_by_id(self, book_id: int) -> Optional[Book]:
+    async def create_many(self, books: List[BookCreate]) -> List[Book]:
+        """Insert books with multi-row INSERTs in one transaction, skipping ISBNs that already exist"""
+        if not books:
+            return []
+        rows = [{**book.model_dump(), "available_copies": book.copies} for book in books]
+        
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            statement = postgresql.insert(Book).on_conflict_do_nothing(index_elements=[Book.isbn])
+        elif dialect == "sqlite":
+            statement = sqlite.insert(Book).on_conflict_do_nothing(index_elements=[Book.isbn])
+        else:
+            statement = insert(Book)
+        # Rows are sent as batched multi-row VALUES; RETURNING yields only the rows inserted
+        result = await self.db.scalars(statement.returning(Book), rows)
+        created = list(result.all())
+        await self.db.commit()
+        return created
+    
+    async def get_existing_isbns(self, isbns: List[str]) -> Set[str]:
+        """Those of the ISBNs that are in the catalog, in one query"""
+        if not isbns:
+            return set()
+        result = await self.db.execute(select(Book.isbn).where(Book.isbn.in_(isbns)))
+        return set(result.scalars().all())
+    
+    async def get_by_id(self, book_id: int) -> Optional[Book]:
         """Get book by ID"""
-        return self.db.query(Book).filter(Book.id == book_id).first()
+        return await self.db.get(Book, book_id)
+    
+    async def get_by_ids(self, book_ids: List[int]) -> List[Book]:
+        """Get books by a list of IDs in a single query"""
+        if not book_ids:
+            return []
+        result = await self.db.execute(select(Book).where(Book.id.in_(book_ids)))
+        return list(result.scalars().all())
     
-    def get_by_isbn(self, isbn: str) -> Optional[Book]:
+    async def get_by_isbn(self, isbn: str) -> Optional[Book]:
         """Get book by ISBN"""
-        return self.db.query(Book).filter(Book.isbn == isbn).first()
+        result = await self.db.execute(select(Book).where(Book.isbn == isbn).limit(1))
+        return result.scalars().first()
     
-    def update(self, book_id: int, book_data: BookUpdate) -> Optional[Book]:
+    async def update(self, book_id: int, book_data: BookUpdate) -> Optional[Book]:
         """Update book"""
-        book = self.get_by_id(book_id)
+        book = await self.get_by_id(book_id)
         if not book:
             return None
         
@@ -45,76 +108,345 @@ class BookRepository:
         for field, value in update_data.items():
             setattr(book, field, value)
         
-        self.db.commit()
-        self.db.refresh(book)
+        await self.db.commit()
+        await self.db.refresh(book)
         return book
     
-    def update_availability(self, book_id: int, change: int) -> Optional[Book]:
-        """Update book availability"""
-        book = self.get_by_id(book_id)
-        if not book:
-            return None
-        
-        new_available = book.available_copies + change
-        if new_available < 0 or new_available > book.copies:
-            return None
-        
-        book.available_copies = new_available
-        self.db.commit()
-        self.db.refresh(book)
-        return book
+    async def update_availability(self, book_id: int, change: int, commit: bool = True) -> AvailabilityChange:
+        """Atomically add change to available copies if the result stays within bounds"""
+        return await self._apply_availability(book_id, Book.available_copies + change, commit)
     
-    def set_availability(self, book_id: int, available_copies: int) -> Optional[Book]:
-        """Set book availability to specific value"""
-        book = self.get_by_id(book_id)
-        if not book:
-            return None
+    async def set_availability(self, book_id: int, available_copies: int, commit: bool = True) -> AvailabilityChange:
+        """Atomically set available copies if the value stays within bounds"""
+        return await self._apply_availability(book_id, literal(available_copies, Integer), commit)
+    
+    async def is_processed(self, idempotency_key: str) -> bool:
+        """Whether an operation with this idempotency key was already applied"""
+        return await self.db.get(ProcessedOperation, idempotency_key) is not None
+    
+    async def record_processed(self, idempotency_key: str, book_id: int) -> None:
+        """Record an applied operation's idempotency key in the current transaction"""
+        self.db.add(ProcessedOperation(idempotency_key=idempotency_key, book_id=book_id))
+        await self.db.flush()
+    
+    async def delete_processed_chunk(self, cutoff: datetime, limit: int) -> int:
+        """Delete up to limit idempotency keys recorded before cutoff, in its own transaction"""
+        expired = (
+            select(ProcessedOperation.idempotency_key)
+            .where(ProcessedOperation.created_at < cutoff)
+            .limit(limit)
+            .scalar_subquery()
+        )
+        result = await self.db.execute(
+            delete(ProcessedOperation)
+            .where(ProcessedOperation.idempotency_key.in_(expired))
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        return result.rowcount
+    
+    async def savepoint(self) -> Any:
+        """Open a SAVEPOINT inside the current transaction; commit or roll back the returned transaction"""
+        return await self.db.begin_nested()
+    
+    async def commit(self) -> None:
+        """Commit changes made with commit=False"""
+        await self.db.commit()
+    
+    async def rollback(self) -> None:
+        """Discard changes made with commit=False"""
+        await self.db.rollback()
+    
+    async def _apply_availability(self, book_id: int, new_available: ColumnElement, commit: bool) -> AvailabilityChange:
+        """Run one conditional UPDATE ... RETURNING on available copies"""
+        updated = (
+            update(Book)
+            .where(Book.id == book_id, new_available >= 0, new_available <= Book.copies)
+            .values(available_copies=new_available)
+            .returning(Book.id, Book.copies, Book.available_copies, Book.updated_at)
+        )
         
-        if available_copies < 0 or available_copies > book.copies:
-            return None
+        if self.db.get_bind().dialect.name == "postgresql":
+            # The outer read sees the pre-update row, so a single statement tells
+            # "not found" (no row) apart from "out of bounds" (row, no update)
+            changed = updated.cte("changed")
+            row = (await self.db.execute(
+                select(
+                    Book.copies,
+                    Book.available_copies,
+                    changed.c.available_copies.label("new_available"),
+                    changed.c.updated_at
+                )
+                .select_from(Book.__table__.outerjoin(changed, changed.c.id == Book.id))
+                .where(Book.id == book_id)
+            )).first()
+            if commit:
+                await self.db.commit()
+            
+            if row is None:
+                return AvailabilityChange(found=False, applied=False)
+            if row.new_available is None:
+                return AvailabilityChange(True, False, row.copies, row.available_copies)
+            return AvailabilityChange(True, True, row.copies, row.new_available, row.updated_at)
         
-        book.available_copies = available_copies
-        self.db.commit()
-        self.db.refresh(book)
-        return book
+        row = (await self.db.execute(updated)).first()
+        if commit:
+            await self.db.commit()
+        if row is not None:
+            return AvailabilityChange(True, True, row.copies, row.available_copies, row.updated_at)
+        
+        # Other dialects have no writable CTEs; classify the failure with a read
+        current = (await self.db.execute(
+            select(Book.copies, Book.available_copies).where(Book.id == book_id)
+        )).first()
+        if current is None:
+            return AvailabilityChange(found=False, applied=False)
+        return AvailabilityChange(True, False, current.copies, current.available_copies)
     
-    def delete(self, book_id: int) -> bool:
+    async def delete(self, book_id: int) -> bool:
         """Delete book"""
-        book = self.get_by_id(book_id)
+        book = await self.get_by_id(book_id)
         if not book:
             return False
         
-        self.db.delete(book)
-        self.db.commit()
+        await self.db.delete(book)
+        await self.db.commit()
         return True
     
-    def search(self, search_term: Optional[str], page: int, per_page: int) -> Tuple[List[Book], int]:
+    async def search(
+        self,
+        search_term: Optional[str],
+        page: int,
+        per_page: int,
+        cursor: Optional[str] = None,
+        exact_total: bool = False,
+        filters: Optional[BookFilters] = None
+    ) -> Page:
         """Search books with pagination"""
-        query = self.db.query(Book)
-        
-        if search_term:
-            search_pattern = f"%{search_term}%"
-            query = query.filter(
-                or_(
-                    Book.title.ilike(search_pattern),
-                    Book.author.ilike(search_pattern),
-                    Book.isbn.ilike(search_pattern),
-                    Book.genre.ilike(search_pattern)
+        conditions, rank = await self._match(search_term, filters)
+        query = select(Book).where(*conditions)
+        if rank is not None:
+            return await self._paginate_ranked(query, rank, page, per_page, cursor, exact_total)
+        
+        # Without a filter the total is the table size, which may be estimated
+        estimate = not conditions and not exact_total
+        return await self._paginate(query, page, per_page, cursor, estimate, exact_total)
+    
+    async def facet_counts(
+        self, search_term: Optional[str], filters: Optional[BookFilters], limit: int,
+        book_ids: Optional[Sequence[int]] = None
+    ) -> Dict[str, Any]:
+        """Genre, author and availability counts over the books a search matches, in one statement;
+        given book_ids (the matches of the in-memory index), over those instead, a statement per chunk"""
+        if book_ids is None:
+            conditions, _ = await self._match(search_term, filters)
+            condition_sets = [conditions]
+        else:
+            conditions, _ = await self._match(None, filters)
+            condition_sets = [[*conditions, Book.id.in_(chunk)] for chunk in self._id_chunks(book_ids)]
+        
+        counts: Dict[str, Dict[Any, int]] = {"genre": {}, "author": {}}
+        availability = {"available": 0, "unavailable": 0}
+        for conditions in condition_sets:
+            for facet, value, count in await self._grouped_counts(conditions):
+                if facet == "available":
+                    availability["available" if value else "unavailable"] += count
+                else:
+                    counts[facet][value] = counts[facet].get(value, 0) + count
+        
+        facets: Dict[str, Any] = {"availability": availability}
+        for facet, values in counts.items():
+            facets[facet] = heapq.nsmallest(limit, values.items(), key=lambda item: (-item[1], item[0] or ""))
+        return facets
+    
+    async def filter_ids(self, book_ids: Sequence[int], filters: BookFilters) -> Set[int]:
+        """Those of the books that pass the filters, a query per chunk of ids"""
+        conditions, _ = await self._match(None, filters)
+        matching: Set[int] = set()
+        for chunk in self._id_chunks(book_ids):
+            matching.update((await self.db.scalars(select(Book.id).where(*conditions, Book.id.in_(chunk)))).all())
+        return matching
+    
+    @staticmethod
+    def _id_chunks(book_ids: Sequence[int]) -> List[Sequence[int]]:
+        # Stays under the bound parameter limits of asyncpg and SQLite
+        return [book_ids[start:start + ID_CHUNK_SIZE] for start in range(0, len(book_ids), ID_CHUNK_SIZE)]
+    
+    async def _grouped_counts(self, conditions: List[ColumnElement]) -> List[Tuple[str, Any, int]]:
+        """(facet, value, count) of the books matching the conditions, in one statement"""
+        # A literal 0 keeps the expression identical wherever it is repeated
+        available = Book.available_copies > literal_column("0")
+        
+        if self.db.get_bind().dialect.name == "postgresql":
+            # One pass over the matching rows for all three groupings
+            rows = (await self.db.execute(
+                select(
+                    func.grouping(Book.genre).label("by_genre"),
+                    func.grouping(Book.author).label("by_author"),
+                    Book.genre,
+                    Book.author,
+                    available.label("available"),
+                    func.count().label("count")
                 )
+                .where(*conditions)
+                .group_by(func.grouping_sets(Book.genre, Book.author, available))
+            )).all()
+            return [
+                ("genre", row.genre, row.count) if row.by_genre == 0
+                else ("author", row.author, row.count) if row.by_author == 0
+                else ("available", row.available, row.count)
+                for row in rows
+            ]
+        
+        # No GROUPING SETS; one UNION ALL statement instead
+        rows = (await self.db.execute(
+            union_all(
+                select(literal("genre").label("facet"), Book.genre.label("value"), func.count().label("count"))
+                .where(*conditions).group_by(Book.genre),
+                select(literal("author"), Book.author, func.count()).where(*conditions).group_by(Book.author),
+                select(literal("available"), cast(available, String), func.count())
+                .where(*conditions).group_by(available)
             )
+        )).all()
+        return [
+            (row.facet, row.value in ("1", "true") if row.facet == "available" else row.value, row.count)
+            for row in rows
+        ]
+    
+    async def _match(
+        self, search_term: Optional[str], filters: Optional[BookFilters]
+    ) -> Tuple[List[ColumnElement], Optional[ColumnElement]]:
+        """WHERE conditions selecting the books a search matches, and their relevance when ranked"""
+        conditions: List[ColumnElement] = []
+        rank = None
+        
+        if filters is not None:
+            # Exact values, served by the genre and author indexes
+            if filters.genre is not None:
+                conditions.append(Book.genre == filters.genre)
+            if filters.author is not None:
+                conditions.append(Book.author == filters.author)
+            if filters.available is not None:
+                conditions.append(Book.available_copies > 0 if filters.available else Book.available_copies == 0)
+        
+        term = search_term.strip() if search_term else ""
+        if not term:
+            return conditions, rank
         
-        total = query.count()
-        books = query.offset((page - 1) * per_page).limit(per_page).all()
+        # An exact ISBN needs only the unique index
+        if looks_like_isbn(term) and await self.get_by_isbn(term) is not None:
+            conditions.append(Book.isbn == term)
+            return conditions, rank
         
-        return books, total
+        pattern = f"%{term}%"
+        substring = [
+            Book.title.ilike(pattern),
+            Book.author.ilike(pattern),
+            Book.isbn.ilike(pattern),
+            Book.genre.ilike(pattern)
+        ]
+        if not full_text_search.enabled:
+            conditions.append(or_(*substring))
+            return conditions, rank
+        
+        search_vector = literal_column("books.search_vector")
+        ts_query = func.websearch_to_tsquery(literal_column(f"'{TEXT_SEARCH_CONFIG}'::regconfig"), term)
+        conditions.append(
+            or_(
+                search_vector.op("@@")(ts_query),
+                # Close to a word in the title or author, for typos
+                Book.title.op("%>")(term),
+                Book.author.op("%>")(term),
+                # Substring matches as on other databases, served by the trigram indexes
+                *substring
+            )
+        )
+        rank = (
+            cast(func.ts_rank_cd(search_vector, ts_query), Float)
+            + cast(func.greatest(func.word_similarity(term, Book.title), func.word_similarity(term, Book.author)), Float)
+        )
+        return conditions, rank
+    
+    async def _paginate_ranked(
+        self, query: Select, rank: ColumnElement, page: int, per_page: int, cursor: Optional[str], exact_total: bool
+    ) -> Page:
+        """Page through full-text matches, most relevant first (PostgreSQL)"""
+        query = query.options(with_expression(Book.search_rank, rank)).order_by(rank.desc(), Book.id)
+        
+        total, total_exact = None, True
+        if cursor is None:
+            rows, total, total_exact = await fetch_offset_page(
+                self.db, query, page, per_page,
+                count_cap=None if exact_total else settings.COUNT_CAP
+            )
+        else:
+            last_rank, last_id = decode_cursor(cursor, float, int)
+            query = query.where(or_(rank < last_rank, and_(rank == last_rank, Book.id > last_id)))
+            rows = (await self.db.execute(query.limit(per_page + 1))).scalars().all()
+        
+        books, has_more = split_page(rows, per_page)
+        next_cursor = encode_cursor(books[-1].search_rank, books[-1].id) if has_more else None
+        return Page(books, total, next_cursor, total_exact)
     
-    def count(self) -> int:
+    async def count(self) -> int:
         """Count total books"""
-        return self.db.query(func.count(Book.id)).scalar()
+        return await self.db.scalar(select(func.count(Book.id)))
     
-    def get_available_books(self, page: int, per_page: int) -> Tuple[List[Book], int]:
+    async def get_ids(self) -> Set[int]:
+        """Ids of every book"""
+        return set((await self.db.scalars(select(Book.id))).all())
+    
+    async def get_available_books(self, page: int, per_page: int, cursor: Optional[str] = None) -> Page:
         """Get books with available copies"""
-        query = self.db.query(Book).filter(Book.available_copies > 0)
-        total = query.count()
-        books = query.offset((page - 1) * per_page).limit(per_page).all()
-        return books, total
+        query = select(Book).where(Book.available_copies > 0)
+        return await self._paginate(query, page, per_page, cursor)
+    
+    async def iter_search_fields(
+        self, chunk_size: int, changed_since: Optional[datetime] = None
+    ) -> AsyncIterator[Sequence[Any]]:
+        """Stream the fields the in-memory indexes use of every book, or of those updated from changed_since on,
+        in id order, chunk_size rows at a time"""
+        query = select(
+            Book.id, Book.title, Book.author, Book.genre, Book.copies, Book.available_copies, Book.updated_at
+        )
+        if changed_since is not None:
+            query = query.where(Book.updated_at >= changed_since)
+        last_id = 0
+        while True:
+            rows = (await self.db.execute(
+                query.where(Book.id > last_id)
+                .order_by(Book.id)
+                .limit(chunk_size)
+            )).all()
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1].id
+    
+    async def _paginate(
+        self,
+        query: Select,
+        page: int,
+        per_page: int,
+        cursor: Optional[str],
+        estimate: bool = False,
+        exact_total: bool = False
+    ) -> Page:
+        """Page through a book query by id, by page number or after a cursor (which skips the total count)"""
+        query = query.order_by(Book.id)
+        total, total_exact = None, True
+        
+        if cursor is None:
+            rows, total, total_exact = await fetch_offset_page(
+                self.db, query, page, per_page,
+                estimate_table=Book.__tablename__ if estimate else None,
+                estimate_threshold=settings.COUNT_ESTIMATE_THRESHOLD,
+                count_cap=None if estimate or exact_total else settings.COUNT_CAP
+            )
+        else:
+            last_id, = decode_cursor(cursor, int)
+            rows = (await self.db.execute(query.where(Book.id > last_id).limit(per_page + 1))).scalars().all()
+        
+        books, has_more = split_page(rows, per_page)
+        next_cursor = encode_cursor(books[-1].id) if has_more else None
+        return Page(books, total, next_cursor, total_exact)
@@ -1,12 +1,24 @@
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from enum import Enum
+from library_common.imports import ImportFormat
 
 class AvailabilityOperation(str, Enum):
     INCREMENT = "increment"
     DECREMENT = "decrement"
 
+class BulkAvailabilityMode(str, Enum):
+    ATOMIC = "atomic"
+    BEST_EFFORT = "best_effort"
+
+class BulkItemStatus(str, Enum):
+    APPLIED = "applied"
+    FAILED = "failed"
+    ROLLED_BACK = "rolled_back"
+    SKIPPED = "skipped"
+    DUPLICATE = "duplicate"
+
 class BookBase(BaseModel):
     title: str = Field(..., min_length=1, max_length=500)
     author: str = Field(..., min_length=1, max_length=255)
@@ -27,6 +39,8 @@ class BookUpdate(BaseModel):
 class BookAvailabilityUpdate(BaseModel):
     available_copies: Optional[int] = Field(None, ge=0)
     operation: Optional[AvailabilityOperation] = None
+    # Copies the operation moves, e.g. several returns of one book aggregated
+    quantity: int = Field(1, ge=1)
     
     model_config = ConfigDict(
         json_schema_extra={
@@ -37,6 +51,27 @@ class BookAvailabilityUpdate(BaseModel):
         }
     )
 
+class BulkAvailabilityItem(BookAvailabilityUpdate):
+    book_id: int
+    # Items carrying a key that was already applied are reported as duplicates
+    idempotency_key: Optional[str] = Field(None, min_length=1, max_length=64)
+
+class BulkAvailabilityRequest(BaseModel):
+    items: List[BulkAvailabilityItem] = Field(..., min_length=1)
+    mode: BulkAvailabilityMode = BulkAvailabilityMode.ATOMIC
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "mode": "atomic",
+                "items": [
+                    {"book_id": 1, "operation": "increment"},
+                    {"book_id": 2, "operation": "increment"}
+                ]
+            }
+        }
+    )
+
 class BookResponse(BookBase):
     id: int
     available_copies: int
@@ -45,20 +80,99 @@ class BookResponse(BookBase):
     
     model_config = ConfigDict(from_attributes=True)
 
+class FacetCount(BaseModel):
+    value: Optional[str] = None
+    count: int
+
+class AvailabilityFacet(BaseModel):
+    available: int
+    unavailable: int
+
+class BookFacets(BaseModel):
+    # Most frequent first, at most FACET_LIMIT of each
+    genre: List[FacetCount]
+    author: List[FacetCount]
+    availability: AvailabilityFacet
+
 class BookSearchResponse(BaseModel):
     books: List[BookResponse]
-    total: int
-    page: int
+    # Not computed in cursor mode
+    total: Optional[int] = None
+    page: Optional[int] = None
     per_page: int
+    next_cursor: Optional[str] = None
+    # False when total is a planner estimate
+    total_exact: bool = True
+    # Only when requested; counts over every matching book, not just this page
+    facets: Optional[BookFacets] = None
+
+class BookBatchResponse(BaseModel):
+    books: List[BookResponse]
+    not_found: List[int]
 
 class BookAvailabilityResponse(BaseModel):
     id: int
     available_copies: int
     updated_at: datetime
 
+class BulkAvailabilityItemResult(BaseModel):
+    book_id: int
+    idempotency_key: Optional[str] = None
+    status: BulkItemStatus
+    available_copies: Optional[int] = None
+    updated_at: Optional[datetime] = None
+    error: Optional[str] = None
+    error_code: Optional[int] = None
+
+class BulkAvailabilityResponse(BaseModel):
+    mode: BulkAvailabilityMode
+    committed: bool
+    applied: int
+    failed: int
+    results: List[BulkAvailabilityItemResult]
+
+# Columns an import's CSV header must name
+IMPORT_CSV_COLUMNS = ("title", "author", "isbn")
+
+class BookImportError(BaseModel):
+    # 1-based, not counting a CSV header
+    row: int
+    isbn: Optional[str] = None
+    error: str
+
+class BookImportResponse(BaseModel):
+    received: int = 0
+    created: int = 0
+    # ISBNs already in the catalog or earlier in the file
+    duplicates: int = 0
+    failed: int = 0
+    # Failed rows, in the order they were found
+    errors: List[BookImportError] = []
+    # True when more rows failed than are listed
+    errors_truncated: bool = False
+    duration_seconds: float = 0.0
+
+class AutocompleteKind(str, Enum):
+    TITLE = "title"
+    AUTHOR = "author"
+
+class AutocompleteSuggestion(BaseModel):
+    text: str
+    kind: AutocompleteKind
+    # Set for title suggestions
+    book_id: Optional[int] = None
+    # Copies currently on loan (summed over an author's books)
+    popularity: int
+
+class AutocompleteResponse(BaseModel):
+    query: str
+    suggestions: List[AutocompleteSuggestion]
+
 class HealthResponse(BaseModel):
     status: str
     service: str
     version: str
     database: str
+    idempotency_keys: Dict[str, Any] = {}
+    search: Dict[str, Any] = {}
     timestamp: datetime
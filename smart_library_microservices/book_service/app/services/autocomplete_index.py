@@ -0,0 +1,201 @@
+import heapq
+import sys
+import time
+from bisect import bisect_left, insort
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+from app.config.settings import settings
+from app.services.search_index import tokenize
+from app.core.logging import logger
+
+# Separates a normalized key from its suggestion id; sorts before any word character
+KEY_SEPARATOR = "\x00"
+
+class Suggestion(NamedTuple):
+    """One autocomplete suggestion"""
+    text: str
+    kind: str
+    book_id: Optional[int]
+    popularity: int
+
+class AutocompleteIndex:
+    """Sorted array of normalized title and author keys for prefix suggestions, ranked by popularity"""
+    
+    def __init__(self):
+        self.enabled = False
+        self._clear()
+    
+    def _clear(self) -> None:
+        # Every word-start suffix of every title and author, as "<normalized suffix>\x00<suggestion id>"
+        self._keys: List[str] = []
+        self._texts: Dict[str, Tuple[str, str]] = {}
+        self._book_ids: Dict[str, Optional[int]] = {}
+        # Author suggestions are shared by their books; popularity is the sum over those books
+        self._author_books: Dict[str, Dict[int, int]] = {}
+        self._author_popularity: Dict[str, int] = {}
+        # book id -> (title, author, copies on loan) as indexed
+        self._books: Dict[int, Tuple[str, str, int]] = {}
+        self._key_bytes = 0
+        # While rebuilding, keys are appended and sorted once at the end
+        self._building = False
+        self._cache: Dict[Tuple[str, int], Tuple[float, List[Suggestion]]] = {}
+        self.built_at: Optional[float] = None
+    
+    def __len__(self) -> int:
+        return len(self._books)
+    
+    def book_ids(self) -> Set[int]:
+        """Ids of the indexed books"""
+        return set(self._books)
+    
+    def load(self, rows: Sequence[Any]) -> int:
+        """Replace the index with the given books and start serving suggestions"""
+        started = time.perf_counter()
+        # No awaits from here on, so no request sees a half-built index
+        self._clear()
+        self._building = True
+        for row in rows:
+            self._add(row.id, row.title, row.author, row.copies - row.available_copies)
+        self._keys.sort()
+        self._building = False
+        self.enabled = True
+        self.built_at = time.time()
+        
+        logger.info(
+            f"Autocomplete index built: {len(rows)} books, {len(self._keys)} keys "
+            f"in {(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+        return len(rows)
+    
+    def add(self, book: Any) -> None:
+        """Index a created or updated book, replacing its previous entries"""
+        if not self.enabled:
+            return
+        self.remove(book.id)
+        self._add(book.id, book.title, book.author, book.copies - book.available_copies)
+    
+    def remove(self, book_id: int) -> None:
+        """Drop a book's suggestions"""
+        if not self.enabled or book_id not in self._books:
+            return
+        title, author, _ = self._books.pop(book_id)
+        self._drop(f"t:{book_id}", title)
+        
+        author_id = f"a:{' '.join(tokenize(author))}"
+        books = self._author_books.get(author_id)
+        if books is not None:
+            self._author_popularity[author_id] -= books.pop(book_id, 0)
+            if not books:
+                del self._author_books[author_id]
+                del self._author_popularity[author_id]
+                self._drop(author_id, author)
+        self._cache.clear()
+    
+    def set_popularity(self, book_id: int, on_loan: int) -> None:
+        """Record how many copies of a book are on loan"""
+        entry = self._books.get(book_id) if self.enabled else None
+        if entry is None:
+            return
+        title, author, _ = entry
+        self._books[book_id] = (title, author, on_loan)
+        author_id = f"a:{' '.join(tokenize(author))}"
+        books = self._author_books.get(author_id)
+        if books is not None:
+            self._author_popularity[author_id] += on_loan - books.get(book_id, 0)
+            books[book_id] = on_loan
+        # Cached suggestions keep their order until they expire
+    
+    def suggest(self, query: str, limit: int) -> List[Suggestion]:
+        """Most popular titles and authors with a word starting with the query"""
+        prefix = " ".join(tokenize(query))
+        if not prefix:
+            return []
+        
+        cache_key = (prefix, limit)
+        cached = self._cache.get(cache_key)
+        if cached is not None and time.monotonic() - cached[0] < settings.AUTOCOMPLETE_CACHE_TTL:
+            return cached[1]
+        
+        popularity: Dict[str, int] = {}
+        start = bisect_left(self._keys, prefix)
+        for key in self._keys[start:start + settings.AUTOCOMPLETE_MAX_SCAN]:
+            if not key.startswith(prefix):
+                break
+            suggestion_id = key.rpartition(KEY_SEPARATOR)[2]
+            if suggestion_id not in popularity:
+                popularity[suggestion_id] = self._popularity(suggestion_id)
+        
+        best = heapq.nsmallest(
+            limit, popularity.items(),
+            key=lambda item: (-item[1], self._texts[item[0]][0].lower())
+        )
+        suggestions = [
+            Suggestion(self._texts[suggestion_id][0], self._texts[suggestion_id][1], self._book_ids[suggestion_id], score)
+            for suggestion_id, score in best
+        ]
+        
+        if len(self._cache) >= settings.AUTOCOMPLETE_CACHE_SIZE:
+            self._cache.clear()
+        self._cache[cache_key] = (time.monotonic(), suggestions)
+        return suggestions
+    
+    def stats(self) -> Dict[str, Any]:
+        """Index size and approximate memory use for health reporting"""
+        return {
+            "enabled": self.enabled,
+            "books": len(self._books),
+            "keys": len(self._keys),
+            "memory_bytes": self._key_bytes + sum(
+                sys.getsizeof(container)
+                for container in (self._keys, self._texts, self._book_ids, self._author_books, self._books)
+            ),
+            "cached_queries": len(self._cache),
+            "built_at": self.built_at
+        }
+    
+    def _add(self, book_id: int, title: str, author: str, on_loan: int) -> None:
+        self._books[book_id] = (title, author, on_loan)
+        self._insert(f"t:{book_id}", title, "title", book_id)
+        
+        author_id = f"a:{' '.join(tokenize(author))}"
+        books = self._author_books.get(author_id)
+        if books is None:
+            books = self._author_books[author_id] = {}
+            self._author_popularity[author_id] = 0
+            self._insert(author_id, author, "author", None)
+        books[book_id] = on_loan
+        self._author_popularity[author_id] += on_loan
+        self._cache.clear()
+    
+    def _insert(self, suggestion_id: str, text: str, kind: str, book_id: Optional[int]) -> None:
+        self._texts[suggestion_id] = (text, kind)
+        self._book_ids[suggestion_id] = book_id
+        for key in self._suffix_keys(suggestion_id, text):
+            if self._building:
+                self._keys.append(key)
+            else:
+                insort(self._keys, key)
+            self._key_bytes += sys.getsizeof(key)
+    
+    def _drop(self, suggestion_id: str, text: str) -> None:
+        self._texts.pop(suggestion_id, None)
+        self._book_ids.pop(suggestion_id, None)
+        for key in self._suffix_keys(suggestion_id, text):
+            position = bisect_left(self._keys, key)
+            if position < len(self._keys) and self._keys[position] == key:
+                del self._keys[position]
+                self._key_bytes -= sys.getsizeof(key)
+    
+    @staticmethod
+    def _suffix_keys(suggestion_id: str, text: str) -> List[str]:
+        """'the great gatsby' is found by 'the g', 'great' and 'gats'"""
+        words = tokenize(text)
+        return list(dict.fromkeys(
+            f"{' '.join(words[position:])}{KEY_SEPARATOR}{suggestion_id}" for position in range(len(words))
+        ))
+    
+    def _popularity(self, suggestion_id: str) -> int:
+        if suggestion_id.startswith("t:"):
+            return self._books[int(suggestion_id[2:])][2]
+        return self._author_popularity[suggestion_id]
+
+autocomplete_index = AutocompleteIndex()
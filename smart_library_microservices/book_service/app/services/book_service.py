@@ -1,114 +1,358 @@
-from typing import List, Tuple, Optional
-from sqlalchemy.orm import Session
-from app.repositories.book_repository import BookRepository
+import time
+from typing import AsyncIterator, List, Set, Tuple, Optional
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from library_common.imports import ImportRecord
+from library_common.pagination import Page, InvalidCursorError, encode_cursor, decode_cursor, split_page
+from library_common.serialization import from_orm
+from app.repositories.book_repository import BookRepository, BookFilters
 from app.schemas.book import (
     BookCreate, BookUpdate, BookResponse, 
-    BookAvailabilityUpdate, AvailabilityOperation
+    BookAvailabilityUpdate, AvailabilityOperation,
+    BulkAvailabilityRequest, BulkAvailabilityResponse, BulkAvailabilityItemResult,
+    BulkAvailabilityMode, BulkItemStatus, AutocompleteSuggestion,
+    BookFacets, FacetCount, AvailabilityFacet, BookImportResponse, BookImportError
 )
 from app.core.exceptions import (
-    BookNotFoundException, BookAlreadyExistsException,
-    InsufficientCopiesException, BookNotDeletableException
+    BookServiceException, BookNotFoundException, BookAlreadyExistsException,
+    InsufficientCopiesException, BookNotDeletableException,
+    InvalidBookDataException, CopiesLimitExceededException, AutocompleteUnavailableException
 )
+from app.services.search_index import book_search_index
+from app.services.autocomplete_index import autocomplete_index
+from app.core.search import looks_like_isbn
+from app.core.cache import facet_cache
+from app.config.settings import settings
 from app.core.logging import logger
 
 class BookService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.repository = BookRepository(db)
     
-    def create_book(self, book_data: BookCreate) -> BookResponse:
+    async def create_book(self, book_data: BookCreate) -> BookResponse:
         """Create a new book"""
         logger.info(f"Creating book with ISBN: {book_data.isbn}")
         
         # Check if book already exists
-        existing_book = self.repository.get_by_isbn(book_data.isbn)
+        existing_book = await self.repository.get_by_isbn(book_data.isbn)
         if existing_book:
             logger.warning(f"Book with ISBN {book_data.isbn} already exists")
             raise BookAlreadyExistsException(book_data.isbn)
         
         # Create book
-        book = self.repository.create(book_data)
+        book = await self.repository.create(book_data)
+        book_search_index.add(book)
+        autocomplete_index.add(book)
+        facet_cache.clear()
         logger.info(f"Book created with id: {book.id}")
         
-        return BookResponse.model_validate(book)
+        return from_orm(BookResponse, book)
     
-    def get_book(self, book_id: int) -> BookResponse:
+    async def import_books(self, records: AsyncIterator[ImportRecord]) -> BookImportResponse:
+        """Create books from a stream of rows in batches, reporting rows that fail instead of stopping"""
+        logger.info("Importing books")
+        started = time.perf_counter()
+        report = BookImportResponse()
+        # ISBNs earlier in this import
+        seen = set()
+        batch: List[Tuple[int, BookCreate]] = []
+        
+        async for record in records:
+            report.received += 1
+            if record.error is not None:
+                self._reject_import_row(report, record.row, None, record.error)
+                continue
+            try:
+                book = BookCreate.model_validate(record.data)
+            except ValidationError as e:
+                isbn = record.data.get("isbn")
+                self._reject_import_row(report, record.row, isbn if isinstance(isbn, str) else None, "; ".join(
+                    f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+                ))
+                continue
+            if book.isbn in seen:
+                self._reject_import_row(report, record.row, book.isbn, "ISBN appears earlier in the import", True)
+                continue
+            seen.add(book.isbn)
+            
+            batch.append((record.row, book))
+            if len(batch) >= settings.IMPORT_BATCH_SIZE:
+                await self._import_batch(batch, report)
+                batch = []
+        if batch:
+            await self._import_batch(batch, report)
+        
+        if report.created:
+            facet_cache.clear()
+        report.duration_seconds = round(time.perf_counter() - started, 3)
+        logger.info(
+            f"Book import finished: {report.received} rows, {report.created} created, "
+            f"{report.duplicates} duplicates, {report.failed} failed in {report.duration_seconds}s"
+        )
+        return report
+    
+    async def _import_batch(self, batch: List[Tuple[int, BookCreate]], report: BookImportResponse) -> None:
+        """Insert the rows of a batch whose ISBNs are not yet in the catalog"""
+        existing = await self.repository.get_existing_isbns([book.isbn for _, book in batch])
+        new = []
+        for row, book in batch:
+            if book.isbn in existing:
+                self._reject_import_row(report, row, book.isbn, f"Book with ISBN {book.isbn} already exists", True)
+            else:
+                new.append((row, book))
+        
+        try:
+            created = await self.repository.create_many([book for _, book in new])
+        except SQLAlchemyError as e:
+            await self.repository.rollback()
+            logger.error(f"Import batch of {len(new)} books failed: {str(e)}")
+            for row, book in new:
+                self._reject_import_row(report, row, book.isbn, "Batch insert failed")
+            return
+        
+        created_isbns = {book.isbn for book in created}
+        for row, book in new:
+            # Created concurrently since the lookup
+            if book.isbn not in created_isbns:
+                self._reject_import_row(report, row, book.isbn, f"Book with ISBN {book.isbn} already exists", True)
+        for book in created:
+            book_search_index.add(book)
+            autocomplete_index.add(book)
+        report.created += len(created)
+    
+    @staticmethod
+    def _reject_import_row(
+        report: BookImportResponse, row: int, isbn: Optional[str], error: str, duplicate: bool = False
+    ) -> None:
+        if duplicate:
+            # Expected when re-running an import, so only counted
+            report.duplicates += 1
+            return
+        report.failed += 1
+        if len(report.errors) < settings.IMPORT_MAX_ERRORS:
+            report.errors.append(BookImportError(row=row, isbn=isbn, error=error))
+        else:
+            report.errors_truncated = True
+    
+    async def get_book(self, book_id: int) -> BookResponse:
         """Get book by ID"""
         logger.info(f"Fetching book with id: {book_id}")
         
-        book = self.repository.get_by_id(book_id)
+        book = await self.repository.get_by_id(book_id)
         if not book:
             logger.warning(f"Book with id {book_id} not found")
             raise BookNotFoundException(book_id)
         
-        return BookResponse.model_validate(book)
+        return from_orm(BookResponse, book)
     
-    def update_book(self, book_id: int, book_data: BookUpdate) -> BookResponse:
+    async def get_books(self, book_ids: List[int]) -> Tuple[List[BookResponse], List[int]]:
+        """Get several books by ID, reporting the IDs that were not found"""
+        logger.info(f"Fetching {len(book_ids)} books by id")
+        
+        if len(book_ids) > settings.MAX_BATCH_SIZE:
+            raise InvalidBookDataException({
+                "ids": f"At most {settings.MAX_BATCH_SIZE} ids may be requested at once"
+            })
+        
+        books = {book.id: book for book in await self.repository.get_by_ids(book_ids)}
+        found = [from_orm(BookResponse, books[book_id]) for book_id in book_ids if book_id in books]
+        not_found = [book_id for book_id in book_ids if book_id not in books]
+        if not_found:
+            logger.warning(f"Books not found: {not_found}")
+        
+        return found, not_found
+    
+    async def update_book(self, book_id: int, book_data: BookUpdate) -> BookResponse:
         """Update book"""
         logger.info(f"Updating book with id: {book_id}")
         
         # Check if book exists
-        book = self.repository.get_by_id(book_id)
+        book = await self.repository.get_by_id(book_id)
         if not book:
             logger.warning(f"Book with id {book_id} not found")
             raise BookNotFoundException(book_id)
         
         # Check if ISBN is being updated and already exists
         if book_data.isbn and book_data.isbn != book.isbn:
-            existing_book = self.repository.get_by_isbn(book_data.isbn)
+            existing_book = await self.repository.get_by_isbn(book_data.isbn)
             if existing_book:
                 logger.warning(f"Book with ISBN {book_data.isbn} already exists")
                 raise BookAlreadyExistsException(book_data.isbn)
         
         # Update book
-        updated_book = self.repository.update(book_id, book_data)
+        updated_book = await self.repository.update(book_id, book_data)
+        book_search_index.add(updated_book)
+        autocomplete_index.add(updated_book)
+        facet_cache.clear()
         logger.info(f"Book {book_id} updated successfully")
         
-        return BookResponse.model_validate(updated_book)
+        return from_orm(BookResponse, updated_book)
     
-    def update_availability(self, book_id: int, update: BookAvailabilityUpdate) -> dict:
+    async def update_availability(self, book_id: int, update: BookAvailabilityUpdate) -> dict:
         """Update book availability"""
         logger.info(f"Updating availability for book {book_id}")
+        return await self._apply_availability(book_id, update, commit=True)
+    
+    async def bulk_update_availability(self, request: BulkAvailabilityRequest) -> BulkAvailabilityResponse:
+        """Apply many availability updates in a single transaction"""
+        logger.info(f"Bulk updating availability for {len(request.items)} items ({request.mode.value})")
         
-        book = self.repository.get_by_id(book_id)
-        if not book:
-            logger.warning(f"Book with id {book_id} not found")
-            raise BookNotFoundException(book_id)
+        if len(request.items) > settings.MAX_BATCH_SIZE:
+            raise InvalidBookDataException({
+                "items": f"At most {settings.MAX_BATCH_SIZE} items may be updated at once"
+            })
+        
+        atomic = request.mode == BulkAvailabilityMode.ATOMIC
+        results: List[Optional[BulkAvailabilityItemResult]] = [None] * len(request.items)
+        # Copies on loan per book, published to the autocomplete index once committed
+        on_loan = {}
+        # Whether some book became available or unavailable, which changes facet counts
+        facets_stale = False
+        
+        # Touch rows in book id order so concurrent batches cannot deadlock
+        order = sorted(range(len(request.items)), key=lambda index: request.items[index].book_id)
+        try:
+            for position, index in enumerate(order):
+                item = request.items[index]
+                if item.idempotency_key and await self.repository.is_processed(item.idempotency_key):
+                    logger.info(f"Skipping already applied operation {item.idempotency_key} for book {item.book_id}")
+                    results[index] = BulkAvailabilityItemResult(
+                        book_id=item.book_id,
+                        status=BulkItemStatus.DUPLICATE
+                    )
+                    continue
+                # Each item gets a savepoint so a failed one leaves the rest of the batch intact
+                savepoint = await self.repository.savepoint()
+                try:
+                    result = await self._apply_availability(item.book_id, item, commit=False)
+                    if item.idempotency_key:
+                        await self.repository.record_processed(item.idempotency_key, item.book_id)
+                    await savepoint.commit()
+                    on_loan[item.book_id] = result["on_loan"]
+                    facets_stale = facets_stale or result["availability_flipped"]
+                    results[index] = BulkAvailabilityItemResult(
+                        book_id=item.book_id,
+                        status=BulkItemStatus.APPLIED,
+                        available_copies=result["available_copies"],
+                        updated_at=result["updated_at"]
+                    )
+                except IntegrityError:
+                    # A concurrent batch (e.g. a retry after its lease expired) recorded the key first
+                    await savepoint.rollback()
+                    logger.info(f"Operation {item.idempotency_key} for book {item.book_id} was applied concurrently")
+                    results[index] = BulkAvailabilityItemResult(
+                        book_id=item.book_id,
+                        status=BulkItemStatus.DUPLICATE
+                    )
+                except BookServiceException as e:
+                    await savepoint.rollback()
+                    results[index] = BulkAvailabilityItemResult(
+                        book_id=item.book_id,
+                        status=BulkItemStatus.FAILED,
+                        error=e.message,
+                        error_code=e.status_code
+                    )
+                    if atomic:
+                        for rest in order[position + 1:]:
+                            results[rest] = BulkAvailabilityItemResult(
+                                book_id=request.items[rest].book_id,
+                                status=BulkItemStatus.SKIPPED
+                            )
+                        break
+        except Exception:
+            await self.repository.rollback()
+            raise
+        
+        # Callers match results to their operations by key rather than by position
+        for item, result in zip(request.items, results):
+            result.idempotency_key = item.idempotency_key
         
+        failed = sum(1 for result in results if result.status == BulkItemStatus.FAILED)
+        committed = not (atomic and failed)
+        if committed:
+            await self.repository.commit()
+            for book_id, copies_on_loan in on_loan.items():
+                autocomplete_index.set_popularity(book_id, copies_on_loan)
+            if facets_stale:
+                facet_cache.clear()
+        else:
+            await self.repository.rollback()
+            for result in results:
+                if result.status == BulkItemStatus.APPLIED:
+                    result.status = BulkItemStatus.ROLLED_BACK
+                    result.available_copies = None
+                    result.updated_at = None
+        
+        applied = sum(1 for result in results if result.status == BulkItemStatus.APPLIED)
+        logger.info(f"Bulk availability update {'committed' if committed else 'rolled back'}: {applied} applied, {failed} failed")
+        
+        return BulkAvailabilityResponse(
+            mode=request.mode,
+            committed=committed,
+            applied=applied,
+            failed=failed,
+            results=results
+        )
+    
+    async def _apply_availability(self, book_id: int, update: BookAvailabilityUpdate, commit: bool) -> dict:
+        """Apply one availability update, optionally leaving the transaction open"""
         # Handle operation-based update
         if update.operation:
-            if update.operation == AvailabilityOperation.INCREMENT:
-                result = self.repository.update_availability(book_id, 1)
-            else:  # DECREMENT
-                if book.available_copies < 1:
-                    raise InsufficientCopiesException(book_id, 1, book.available_copies)
-                result = self.repository.update_availability(book_id, -1)
+            change = update.quantity if update.operation == AvailabilityOperation.INCREMENT else -update.quantity
+            result = await self.repository.update_availability(book_id, change, commit)
+            requested = result.available_copies + change if result.found else None
+            previous = result.available_copies - change if result.applied else None
         
         # Handle explicit availability update
         elif update.available_copies is not None:
-            if update.available_copies > book.copies:
-                raise InsufficientCopiesException(
-                    book_id, 
-                    update.available_copies, 
-                    book.copies
-                )
-            result = self.repository.set_availability(book_id, update.available_copies)
+            result = await self.repository.set_availability(book_id, update.available_copies, commit)
+            requested = update.available_copies
+            # The previous count is not known, so assume the book may have changed facet
+            previous = None
         else:
             # No operation specified
-            result = book
+            book = await self.repository.get_by_id(book_id)
+            if not book:
+                logger.warning(f"Book with id {book_id} not found")
+                raise BookNotFoundException(book_id)
+            return {
+                "id": book.id,
+                "available_copies": book.available_copies,
+                "updated_at": book.updated_at
+            }
+        
+        if not result.found:
+            logger.warning(f"Book with id {book_id} not found")
+            raise BookNotFoundException(book_id)
+        
+        if not result.applied:
+            logger.warning(f"Availability change rejected for book {book_id}: {result.available_copies}/{result.copies} available")
+            if requested < 0:
+                raise InsufficientCopiesException(book_id, update.quantity, result.available_copies)
+            raise CopiesLimitExceededException(book_id, requested, result.copies)
         
         logger.info(f"Book {book_id} availability updated to {result.available_copies}")
+        # Availability facets count books with and without available copies
+        flipped = previous is None or (previous > 0) != (result.available_copies > 0)
+        if commit:
+            autocomplete_index.set_popularity(book_id, result.copies - result.available_copies)
+            if flipped:
+                facet_cache.clear()
         
         return {
-            "id": result.id,
+            "id": book_id,
             "available_copies": result.available_copies,
-            "updated_at": result.updated_at
+            "updated_at": result.updated_at,
+            "on_loan": result.copies - result.available_copies,
+            "availability_flipped": flipped
         }
     
-    def delete_book(self, book_id: int) -> bool:
+    async def delete_book(self, book_id: int) -> bool:
         """Delete book"""
         logger.info(f"Deleting book with id: {book_id}")
         
-        book = self.repository.get_by_id(book_id)
+        book = await self.repository.get_by_id(book_id)
         if not book:
             logger.warning(f"Book with id {book_id} not found")
             raise BookNotFoundException(book_id)
@@ -122,30 +366,118 @@ class BookService:
                 f"{borrowed} copies are currently borrowed"
             )
         
-        result = self.repository.delete(book_id)
+        result = await self.repository.delete(book_id)
+        book_search_index.remove(book_id)
+        autocomplete_index.remove(book_id)
+        facet_cache.clear()
         logger.info(f"Book {book_id} deleted successfully")
         
         return result
     
-    def search_books(
+    async def search_books(
         self, 
         search_term: Optional[str], 
         page: int, 
-        per_page: int
-    ) -> Tuple[List[BookResponse], int]:
-        """Search books with pagination"""
-        logger.info(f"Searching books - term: {search_term}, page: {page}, per_page: {per_page}")
+        per_page: int,
+        cursor: Optional[str] = None,
+        exact_total: bool = False,
+        genre: Optional[str] = None,
+        author: Optional[str] = None,
+        available: Optional[bool] = None,
+        facets: bool = False
+    ) -> Tuple[Page, Optional[BookFacets]]:
+        """Search books with pagination, optionally with facet counts over all matches"""
+        logger.info(
+            f"Searching books - term: {search_term}, genre: {genre}, author: {author}, available: {available}, "
+            f"page: {page}, per_page: {per_page}, cursor: {cursor}, facets: {facets}"
+        )
+        filters = BookFilters(genre, author, available)
+        if filters == BookFilters():
+            filters = None
         
-        books, total = self.repository.search(search_term, page, per_page)
-        book_responses = [BookResponse.model_validate(book) for book in books]
+        # ISBNs are not in the in-memory index; the repository finds them by index
+        use_index = bool(search_term) and book_search_index.enabled and not looks_like_isbn(search_term.strip())
+        # Filters and facets apply to the index's own matches, so a facet narrows the list it was counted over
+        matched = book_search_index.matching_ids(search_term) if use_index and (facets or filters is not None) else None
+        try:
+            if use_index:
+                among = await self.repository.filter_ids(matched, filters) if filters is not None else None
+                result = await self._search_index(search_term, page, per_page, cursor, among)
+            else:
+                result = await self.repository.search(search_term, page, per_page, cursor, exact_total, filters)
+        except InvalidCursorError as e:
+            raise InvalidBookDataException({"cursor": str(e)})
+        
+        result = result._replace(items=[from_orm(BookResponse, book) for book in result.items])
+        return result, await self._search_facets(search_term, filters, matched) if facets else None
+    
+    async def _search_facets(
+        self, search_term: Optional[str], filters: Optional[BookFilters], matched: Optional[List[int]]
+    ) -> BookFacets:
+        """Facet counts of a search, over the in-memory index's matches if given, cached so popular
+        searches do not recount"""
+        term = " ".join(search_term.split()) if search_term else ""
+        key = (term.lower(), filters, matched is not None)
         
-        return book_responses, total
+        async def count() -> BookFacets:
+            counts = await self.repository.facet_counts(term, filters, settings.FACET_LIMIT, matched)
+            return BookFacets(
+                genre=[FacetCount(value=value, count=count) for value, count in counts["genre"]],
+                author=[FacetCount(value=value, count=count) for value, count in counts["author"]],
+                availability=AvailabilityFacet(**counts["availability"])
+            )
+        
+        return await facet_cache.get_or_fetch(key, count)
+    
+    async def _search_index(
+        self, search_term: str, page: int, per_page: int, cursor: Optional[str], among: Optional[Set[int]] = None
+    ) -> Page:
+        """Rank matches in the in-memory index, among the given ids if any, and load only the requested page"""
+        if cursor is None:
+            start = (page - 1) * per_page
+            total, ranked = book_search_index.search(search_term, start + per_page + 1, among=among)
+            ranked = ranked[start:]
+        else:
+            last_score, last_id = decode_cursor(cursor, float, int)
+            total, ranked = book_search_index.search(
+                search_term, per_page + 1, after=(last_score, last_id), among=among
+            )
+            total = None
+        
+        window, has_more = split_page(ranked, per_page)
+        books = {book.id: book for book in await self.repository.get_by_ids([book_id for _, book_id in window])}
+        next_cursor = encode_cursor(*window[-1]) if has_more else None
+        
+        # Deleted by another process since the last index refresh
+        missing = [book_id for _, book_id in window if book_id not in books]
+        for book_id in missing:
+            book_search_index.remove(book_id)
+            autocomplete_index.remove(book_id)
+        if missing and total is not None:
+            total -= len(missing)
+        
+        return Page(
+            [books[book_id] for _, book_id in window if book_id in books],
+            total,
+            next_cursor
+        )
+    
+    async def autocomplete(self, query: str, limit: int) -> List[AutocompleteSuggestion]:
+        """Most popular titles and authors with a word starting with the query"""
+        if not autocomplete_index.enabled:
+            raise AutocompleteUnavailableException()
+        return [
+            AutocompleteSuggestion(**suggestion._asdict())
+            for suggestion in autocomplete_index.suggest(query, limit)
+        ]
     
-    def get_available_books(self, page: int, per_page: int) -> Tuple[List[BookResponse], int]:
+    async def get_available_books(self, page: int, per_page: int, cursor: Optional[str] = None) -> Page:
         """Get books with available copies"""
-        logger.info(f"Fetching available books - page: {page}, per_page: {per_page}")
+        logger.info(f"Fetching available books - page: {page}, per_page: {per_page}, cursor: {cursor}")
         
-        books, total = self.repository.get_available_books(page, per_page)
-        book_responses = [BookResponse.model_validate(book) for book in books]
+        try:
+            result = await self.repository.get_available_books(page, per_page, cursor)
+        except InvalidCursorError as e:
+            raise InvalidBookDataException({"cursor": str(e)})
         
-        return book_responses, total
+        return result._replace(items=[from_orm(BookResponse, book) for book in result.items])
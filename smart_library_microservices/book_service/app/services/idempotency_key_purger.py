@@ -0,0 +1,74 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+from app.config.database import get_db
+from app.config.settings import settings
+from app.repositories.book_repository import BookRepository
+from app.core.logging import logger
+
+class IdempotencyKeyPurger:
+    """Background job that deletes idempotency keys older than IDEMPOTENCY_KEY_TTL_HOURS in bounded chunks"""
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.purged = 0
+        self.last_duration_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+    
+    async def start(self) -> None:
+        if self._task is None and settings.IDEMPOTENCY_KEY_PURGE_INTERVAL > 0:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Idempotency key purger started (every {settings.IDEMPOTENCY_KEY_PURGE_INTERVAL}s)")
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            logger.info("Idempotency key purger stopped")
+    
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.purge_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Idempotency key purge failed: {str(e)}")
+            await asyncio.sleep(settings.IDEMPOTENCY_KEY_PURGE_INTERVAL)
+    
+    async def purge_once(self) -> int:
+        """Delete every expired idempotency key, one committed chunk at a time"""
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+        start = time.perf_counter()
+        purged = 0
+        async for db in get_db():
+            repository = BookRepository(db)
+            while True:
+                chunk = await repository.delete_processed_chunk(cutoff, settings.IDEMPOTENCY_KEY_PURGE_CHUNK_SIZE)
+                purged += chunk
+                if chunk < settings.IDEMPOTENCY_KEY_PURGE_CHUNK_SIZE:
+                    break
+        
+        self.runs += 1
+        self.purged += purged
+        self.last_error = None
+        self.last_duration_ms = round((time.perf_counter() - start) * 1000, 1)
+        if purged:
+            logger.info(f"Purged {purged} expired idempotency keys in {self.last_duration_ms}ms")
+        return purged
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": settings.IDEMPOTENCY_KEY_PURGE_INTERVAL,
+            "ttl_hours": settings.IDEMPOTENCY_KEY_TTL_HOURS,
+            "runs": self.runs,
+            "purged": self.purged,
+            "last_duration_ms": self.last_duration_ms,
+            "last_error": self.last_error
+        }
+
+idempotency_key_purger = IdempotencyKeyPurger()
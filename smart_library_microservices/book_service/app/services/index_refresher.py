@@ -0,0 +1,133 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Union
+from app.config.database import get_db
+from app.config.settings import settings
+from app.repositories.book_repository import BookRepository
+from app.services.autocomplete_index import AutocompleteIndex, autocomplete_index
+from app.services.search_index import BookSearchIndex, book_search_index
+from app.core.logging import logger
+
+class SearchIndexRefresher:
+    """Builds the in-process search and autocomplete indexes and keeps them in step with books changed
+    by other workers and replicas, re-reading rows updated since the last refresh and dropping ids
+    no longer in the table"""
+    # Rows committed late with an earlier updated_at are still picked up; re-indexing a book is idempotent
+    WATERMARK_OVERLAP = timedelta(seconds=5)
+    
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._watermark: Optional[datetime] = None
+        self.refreshed_at: Optional[float] = None
+        self.refreshes = 0
+        self.rebuilds = 0
+        self.changed = 0
+        self.deleted = 0
+        self.last_error: Optional[str] = None
+    
+    def _indexes(self) -> List[Union[BookSearchIndex, AutocompleteIndex]]:
+        indexes = []
+        if settings.SEARCH_BACKEND == "memory":
+            indexes.append(book_search_index)
+        if settings.AUTOCOMPLETE_ENABLED:
+            indexes.append(autocomplete_index)
+        return indexes
+    
+    async def start(self) -> None:
+        if self._task is None and self._indexes() and settings.SEARCH_INDEX_REFRESH_INTERVAL > 0:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Search index refresher started (every {settings.SEARCH_INDEX_REFRESH_INTERVAL}s)")
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            logger.info("Search index refresher stopped")
+    
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.SEARCH_INDEX_REFRESH_INTERVAL)
+            try:
+                await self.refresh_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Search index refresh failed: {str(e)}")
+    
+    async def rebuild(self, chunk_size: int = 5000) -> int:
+        """Build every enabled index from one read of the table"""
+        indexes = self._indexes()
+        if not indexes:
+            return 0
+        rows = []
+        async for db in get_db():
+            async for chunk in BookRepository(db).iter_search_fields(chunk_size):
+                rows.extend(chunk)
+        
+        for index in indexes:
+            index.load(rows)
+        self._advance(rows)
+        self.rebuilds += 1
+        self.refreshed_at = time.time()
+        return len(rows)
+    
+    async def refresh_once(self, chunk_size: int = 5000) -> int:
+        """Re-index books updated since the last refresh and drop books deleted elsewhere"""
+        indexes = self._indexes()
+        if not indexes:
+            return 0
+        if self._watermark is None:
+            return await self.rebuild(chunk_size)
+        
+        # Books indexed by this process while the queries below run are not in this snapshot,
+        # so they are not mistaken for deleted ones
+        indexed = [index.book_ids() for index in indexes]
+        rows = []
+        async for db in get_db():
+            repository = BookRepository(db)
+            async for chunk in repository.iter_search_fields(chunk_size, self._watermark - self.WATERMARK_OVERLAP):
+                rows.extend(chunk)
+            # Deletions leave no updated row behind, only an id missing from the table
+            existing = await repository.get_ids()
+        
+        # No awaits while applying, so no request sees a half-applied refresh
+        deleted = 0
+        for index, book_ids in zip(indexes, indexed):
+            for row in rows:
+                index.add(row)
+            for book_id in book_ids - existing:
+                index.remove(book_id)
+                deleted += 1
+        self._advance(rows)
+        self.refreshes += 1
+        self.changed += len(rows)
+        self.deleted += deleted
+        self.last_error = None
+        self.refreshed_at = time.time()
+        if deleted:
+            logger.info(f"Dropped {deleted} books deleted by another process from the search indexes")
+        return len(rows)
+    
+    def _advance(self, rows: List[Any]) -> None:
+        updated = [row.updated_at for row in rows if row.updated_at is not None]
+        if updated:
+            latest = max(updated)
+            self._watermark = latest if self._watermark is None else max(self._watermark, latest)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": settings.SEARCH_INDEX_REFRESH_INTERVAL,
+            "refreshes": self.refreshes,
+            "rebuilds": self.rebuilds,
+            "changed": self.changed,
+            "deleted": self.deleted,
+            # How far behind other processes' writes the indexes may be
+            "age_seconds": round(time.time() - self.refreshed_at, 1) if self.refreshed_at is not None else None,
+            "last_error": self.last_error
+        }
+
+search_index_refresher = SearchIndexRefresher()
@@ -0,0 +1,217 @@
+import heapq
+import math
+import re
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from app.core.logging import logger
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase words of a text with accents removed"""
+    if not text:
+        return []
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return TOKEN_PATTERN.findall(stripped.lower())
+
+class BookSearchIndex:
+    """In-memory inverted index over book title, author and genre, ranked with BM25"""
+    
+    # A term in the title counts as much as three in the genre
+    FIELD_WEIGHTS = {"title": 3.0, "author": 2.0, "genre": 1.0}
+    K1 = 1.2
+    B = 0.75
+    # Bounds the work of matching a short prefix such as "a"
+    MAX_PREFIX_EXPANSIONS = 200
+    
+    def __init__(self):
+        self.enabled = False
+        self._clear()
+    
+    def _clear(self) -> None:
+        # term -> {book id: field-weighted term frequency}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        # Sorted terms, for prefix lookups
+        self._vocabulary: List[str] = []
+        self._doc_terms: Dict[int, Set[str]] = {}
+        self._doc_lengths: Dict[int, float] = {}
+        self._total_length = 0.0
+        # Number of (term, book) postings
+        self._posting_count = 0
+        # BM25 length normalisation per book; recomputed after the index changes
+        self._norms: Optional[Dict[int, float]] = None
+        self.built_at: Optional[float] = None
+    
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+    
+    def book_ids(self) -> Set[int]:
+        """Ids of the indexed books"""
+        return set(self._doc_lengths)
+    
+    def load(self, rows: Sequence[Any]) -> int:
+        """Replace the index with the given books and start serving searches"""
+        started = time.perf_counter()
+        # No awaits from here on, so no search sees a half-built index
+        self._clear()
+        for row in rows:
+            self._index(row.id, row.title, row.author, row.genre)
+        self.enabled = True
+        self.built_at = time.time()
+        
+        logger.info(
+            f"Search index built: {len(rows)} books, {len(self._postings)} terms "
+            f"in {(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+        return len(rows)
+    
+    def add(self, book: Any) -> None:
+        """Index a created or updated book, replacing its previous entry"""
+        if not self.enabled:
+            return
+        self.remove(book.id)
+        self._index(book.id, book.title, book.author, book.genre)
+    
+    def remove(self, book_id: int) -> None:
+        """Drop a book from the index"""
+        if not self.enabled or book_id not in self._doc_terms:
+            return
+        terms = self._doc_terms.pop(book_id)
+        self._posting_count -= len(terms)
+        for term in terms:
+            postings = self._postings[term]
+            del postings[book_id]
+            if not postings:
+                del self._postings[term]
+                del self._vocabulary[bisect_left(self._vocabulary, term)]
+        self._total_length -= self._doc_lengths.pop(book_id)
+        self._norms = None
+    
+    def search(
+        self, query: str, limit: int, after: Optional[Tuple[float, int]] = None, among: Optional[Set[int]] = None
+    ) -> Tuple[int, List[Tuple[float, int]]]:
+        """Count books matching every query word (the last one as a prefix), only those among the given
+        ids if any, and return the best limit of them ranked after the (score, book id) after,
+        as (score, book id) best first"""
+        scores = self._match(query)
+        if among is not None:
+            scores = {book_id: score for book_id, score in scores.items() if book_id in among}
+        matches: Iterable[Tuple[float, int]] = ((score, book_id) for book_id, score in scores.items())
+        if after is not None:
+            after_key = (-after[0], after[1])
+            matches = (match for match in matches if (-match[0], match[1]) > after_key)
+        # Only the requested page is ordered, not every match
+        return len(scores), heapq.nsmallest(limit, matches, key=lambda match: (-match[0], match[1]))
+    
+    def matching_ids(self, query: str) -> List[int]:
+        """Ids of every book the query matches, unranked"""
+        return list(self._match(query))
+    
+    def _match(self, query: str) -> Dict[int, float]:
+        words = tokenize(query)
+        if not words or not self._doc_lengths:
+            return {}
+        
+        # The last word may still be being typed
+        word_terms = [[word] for word in words[:-1]] + [self._expand_prefix(words[-1])]
+        # Start from the rarest word so later words only score the books still in the running
+        word_terms.sort(key=lambda terms: sum(len(self._postings.get(term, ())) for term in terms))
+        
+        scores: Optional[Dict[int, float]] = None
+        for terms in word_terms:
+            word_scores = self._score_terms(terms, scores)
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {book_id: scores[book_id] + score for book_id, score in word_scores.items()}
+            if not scores:
+                return {}
+        return scores
+    
+    def stats(self) -> Dict[str, Any]:
+        """Index size for health reporting"""
+        return {
+            "enabled": self.enabled,
+            "documents": len(self._doc_lengths),
+            "terms": len(self._postings),
+            "built_at": self.built_at
+        }
+    
+    def _index(self, book_id: int, title: str, author: str, genre: Optional[str]) -> None:
+        frequencies: Dict[str, float] = {}
+        length = 0.0
+        for field, text in (("title", title), ("author", author), ("genre", genre)):
+            weight = self.FIELD_WEIGHTS[field]
+            for term in tokenize(text):
+                frequencies[term] = frequencies.get(term, 0.0) + weight
+                length += weight
+        
+        for term, frequency in frequencies.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                insort(self._vocabulary, term)
+            postings[book_id] = frequency
+        self._doc_terms[book_id] = set(frequencies)
+        self._doc_lengths[book_id] = length
+        self._total_length += length
+        self._posting_count += len(frequencies)
+        self._norms = None
+    
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        start = bisect_left(self._vocabulary, prefix)
+        terms = []
+        for term in self._vocabulary[start:start + self.MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+    
+    def _score_terms(self, terms: List[str], candidates: Optional[Dict[int, float]] = None) -> Dict[int, float]:
+        """BM25 contribution per book of the best matching term, among candidates if given"""
+        documents = len(self._doc_lengths)
+        norms = self._length_norms()
+        idfs = {
+            term: math.log(1 + (documents - len(self._postings[term]) + 0.5) / (len(self._postings[term]) + 0.5))
+            for term in terms if term in self._postings
+        }
+        
+        # Hot loops: locals and inlined arithmetic
+        postings, doc_terms, k1_plus_1 = self._postings, self._doc_terms, self.K1 + 1
+        scores: Dict[int, float] = {}
+        
+        terms_per_book = self._posting_count / documents
+        if candidates is not None and len(candidates) * terms_per_book < sum(len(postings[term]) for term in idfs):
+            # Fewer candidate terms than postings: look the terms up in each candidate's own term set
+            for book_id in candidates:
+                norm = norms[book_id]
+                for term in doc_terms[book_id]:
+                    idf = idfs.get(term)
+                    if idf is not None:
+                        frequency = postings[term][book_id]
+                        score = idf * frequency * k1_plus_1 / (frequency + norm)
+                        if score > scores.get(book_id, 0.0):
+                            scores[book_id] = score
+        else:
+            for term, idf in idfs.items():
+                for book_id, frequency in postings[term].items():
+                    if candidates is None or book_id in candidates:
+                        score = idf * frequency * k1_plus_1 / (frequency + norms[book_id])
+                        if score > scores.get(book_id, 0.0):
+                            scores[book_id] = score
+        return scores
+    
+    def _length_norms(self) -> Dict[int, float]:
+        if self._norms is None:
+            # Books with no words (e.g. a title of punctuation) never match, but still count
+            average_length = self._total_length / len(self._doc_lengths) or 1.0
+            self._norms = {
+                book_id: self.K1 * (1 - self.B + self.B * length / average_length)
+                for book_id, length in self._doc_lengths.items()
+            }
+        return self._norms
+
+book_search_index = BookSearchIndex()
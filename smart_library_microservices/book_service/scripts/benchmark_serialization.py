@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Per-item cost of serializing a page of books: validate + response_model path versus the construct + orjson path"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+# Add the parent directory to the path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from app.models.book import Book
+from app.schemas.book import BookResponse, BookSearchResponse
+from library_common.serialization import FastJSONResponse, from_orm
+
+RESPONSE_FIELD = create_response_field("Response_search_books", BookSearchResponse)
+
+def make_books(count: int) -> list:
+    """Detached ORM rows shaped like a search page"""
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [
+        Book(
+            id=book_id,
+            title=f"The Book Number {book_id}",
+            author=f"Author {book_id % 50}",
+            isbn=f"978{book_id:010d}",
+            genre="Fiction",
+            copies=3,
+            available_copies=2,
+            created_at=now,
+            updated_at=now + timedelta(seconds=book_id)
+        )
+        for book_id in range(1, count + 1)
+    ]
+
+async def validated(books: list) -> bytes:
+    """As before: model_validate per row, then FastAPI re-validates through response_model and json-encodes"""
+    page = BookSearchResponse(
+        books=[BookResponse.model_validate(book) for book in books],
+        total=len(books), page=1, per_page=len(books)
+    )
+    content = await serialize_response(field=RESPONSE_FIELD, response_content=page)
+    return JSONResponse(content).body
+
+async def constructed(books: list) -> bytes:
+    """Fast path: construct without validation and render with orjson"""
+    page = BookSearchResponse.model_construct(
+        books=[from_orm(BookResponse, book) for book in books],
+        total=len(books), page=1, per_page=len(books)
+    )
+    return FastJSONResponse(page).body
+
+async def per_item_us(render, books: list, repeat: int) -> float:
+    """Best of repeat runs, in microseconds per item"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await render(books)
+        best = min(best, time.perf_counter() - started)
+    return best / len(books) * 1e6
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=100, help="Books per page")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    
+    books = make_books(args.items)
+    before, after = await validated(books), await constructed(books)
+    assert before == after, "Both paths must produce identical JSON"
+    
+    before_us = await per_item_us(validated, books, args.repeat)
+    after_us = await per_item_us(constructed, books, args.repeat)
+    print(f"{args.items} items per page, {len(after)} bytes")
+    print(f"validate + response_model: {before_us:.2f} us/item")
+    print(f"construct + orjson:        {after_us:.2f} us/item ({before_us / after_us:.1f}x)")
+
+if __name__ == "__main__":
+    asyncio.run(main())
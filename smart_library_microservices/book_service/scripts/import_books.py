@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Stream a CSV or NDJSON catalog file to the book service import endpoint and print the report"""
+import argparse
+import json
+import sys
+import httpx
+
+CONTENT_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+def read_chunks(path: str, chunk_size: int):
+    """The file in chunks, so large catalogs are never held in memory"""
+    with open(path, "rb") as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", help="CSV with a title,author,isbn[,genre,copies] header, or one JSON object per line")
+    parser.add_argument("--url", default="http://localhost:8002", help="Book service base URL")
+    parser.add_argument("--format", choices=sorted(CONTENT_TYPES), help="Defaults to csv for a .csv file, else ndjson")
+    parser.add_argument("--chunk-size", type=int, default=64 * 1024)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    args = parser.parse_args()
+    
+    import_format = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    response = httpx.post(
+        f"{args.url.rstrip('/')}/api/books/import",
+        params={"format": import_format},
+        headers={"Content-Type": CONTENT_TYPES[import_format]},
+        content=read_chunks(args.path, args.chunk_size),
+        timeout=args.timeout
+    )
+    if response.status_code != 200:
+        print(f"Import failed ({response.status_code}): {response.text}", file=sys.stderr)
+        sys.exit(1)
+    
+    report = response.json()
+    for error in report["errors"]:
+        print(f"row {error['row']}{' (' + error['isbn'] + ')' if error['isbn'] else ''}: {error['error']}")
+    if report["errors_truncated"]:
+        print("... more rows were rejected than listed")
+    rate = report["received"] / report["duration_seconds"] if report["duration_seconds"] else 0.0
+    print(json.dumps({key: value for key, value in report.items() if key != "errors"}))
+    print(f"{report['created']} of {report['received']} rows created ({rate:.0f} rows/s)")
+    sys.exit(1 if report["failed"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""Install the PostgreSQL full-text and trigram search column and indexes on the books table, once per database"""
+import argparse
+import os
+import sys
+
+# Add the parent directory to the path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from app.config.settings import settings
+from app.core.search import install_search_schema
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", default=settings.DATABASE_URL, help="Defaults to DATABASE_URL")
+    args = parser.parse_args()
+    
+    engine = create_engine(args.database_url)
+    if engine.dialect.name != "postgresql":
+        sys.exit("Full-text search needs PostgreSQL")
+    install_search_schema(engine)
+    print("Search schema installed; restart the service to enable full-text search")
+
+if __name__ == "__main__":
+    main()
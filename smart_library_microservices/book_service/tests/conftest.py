@@ -0,0 +1,58 @@
+import os
+import tempfile
+
+# Point the service at a throwaway SQLite database before the app reads its settings
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'book_service_test.db')}"
+
+import httpx
+import pytest
+from app import main
+from app.config.database import AsyncSessionLocal, Base, SessionLocal, ThreadedSession, async_engine, engine
+from app.config.settings import settings
+from app.core.cache import facet_cache
+from app.main import app
+from app.services import book_service, index_refresher
+from app.services.autocomplete_index import AutocompleteIndex
+from app.services.index_refresher import SearchIndexRefresher
+from app.services.search_index import BookSearchIndex
+
+@pytest.fixture(autouse=True)
+def empty_facet_cache():
+    facet_cache.clear()
+    yield
+    facet_cache.clear()
+
+@pytest.fixture
+def indexes(monkeypatch):
+    """Fresh memory search and autocomplete indexes, refreshed by their own refresher"""
+    monkeypatch.setattr(settings, "SEARCH_BACKEND", "memory")
+    search_index, suggestions = BookSearchIndex(), AutocompleteIndex()
+    for module in (index_refresher, book_service, main):
+        monkeypatch.setattr(module, "book_search_index", search_index)
+        monkeypatch.setattr(module, "autocomplete_index", suggestions)
+    return search_index, suggestions, SearchIndexRefresher()
+
+@pytest.fixture
+async def database():
+    Base.metadata.create_all(bind=engine)
+    yield
+    # Pooled aiosqlite connections belong to this test's event loop
+    await async_engine.dispose()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+async def db(database):
+    async with AsyncSessionLocal() as session:
+        yield session
+
+@pytest.fixture
+async def threaded_db(database):
+    """The DATABASE_ASYNC=false session: sync SQLAlchemy run in worker threads"""
+    session = ThreadedSession(SessionLocal(expire_on_commit=False))
+    yield session
+    await session.close()
+
+@pytest.fixture
+async def client(database):
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        yield client
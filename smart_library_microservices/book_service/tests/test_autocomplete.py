@@ -0,0 +1,86 @@
+from types import SimpleNamespace
+from app.config.settings import settings
+from app.services.autocomplete_index import AutocompleteIndex
+
+def row(book_id, title, author, on_loan=0):
+    return SimpleNamespace(id=book_id, title=title, author=author, copies=5, available_copies=5 - on_loan)
+
+def loaded(*rows):
+    index = AutocompleteIndex()
+    index.load(rows)
+    return index
+
+def texts(suggestions):
+    return [(suggestion.text, suggestion.kind) for suggestion in suggestions]
+
+def test_matches_the_start_of_any_word():
+    index = loaded(row(1, "The Great Gatsby", "F. Scott Fitzgerald"))
+    assert texts(index.suggest("gats", 5)) == [("The Great Gatsby", "title")]
+    assert texts(index.suggest("the g", 5)) == [("The Great Gatsby", "title")]
+    assert texts(index.suggest("fitz", 5)) == [("F. Scott Fitzgerald", "author")]
+    assert index.suggest("atsby", 5) == []
+
+def test_ranked_by_copies_on_loan_then_text():
+    index = loaded(row(1, "Dune", "Herbert", on_loan=1), row(2, "Dune Messiah", "Herbert", on_loan=3), row(3, "Dubliners", "Joyce"))
+    assert [(s.text, s.popularity) for s in index.suggest("du", 5)] == [
+        ("Dune Messiah", 3), ("Dune", 1), ("Dubliners", 0)
+    ]
+    # An author's popularity is the sum over their books
+    assert [(s.text, s.popularity) for s in index.suggest("herb", 5)] == [("Herbert", 4)]
+
+def test_set_popularity_reorders_once_the_cache_expires(monkeypatch):
+    monkeypatch.setattr(settings, "AUTOCOMPLETE_CACHE_TTL", 0.0)
+    index = loaded(row(1, "Dune", "Herbert"), row(2, "Dubliners", "Joyce"))
+    index.set_popularity(2, 2)
+    assert [s.book_id for s in index.suggest("du", 5)] == [2, 1]
+
+def test_limit_caps_suggestions():
+    index = loaded(*(row(book_id, f"Dune {book_id}", f"Author {book_id}") for book_id in range(1, 6)))
+    assert len(index.suggest("dune", 3)) == 3
+
+def test_author_suggestion_outlives_only_its_last_book():
+    index = loaded(row(1, "Dune", "Herbert"), row(2, "Dune Messiah", "Herbert"))
+    index.remove(1)
+    assert texts(index.suggest("herb", 5)) == [("Herbert", "author")]
+    index.remove(2)
+    assert index.suggest("herb", 5) == []
+    assert index.stats()["keys"] == 0
+
+async def test_autocomplete_endpoint(client, indexes):
+    _, _, refresher = indexes
+    await refresher.rebuild()
+    book_ids = [
+        (await client.post("/api/books", json={"title": title, "author": "Herbert", "isbn": f"isbn-{i}", "copies": 3})).json()["id"]
+        for i, title in enumerate(["Dune", "Dune Messiah", "Dubliners"])
+    ]
+    messiah_id = book_ids[1]
+    await client.patch(f"/api/books/{messiah_id}/availability", json={"operation": "decrement", "quantity": 2})
+    
+    body = (await client.get("/api/books/autocomplete", params={"q": "du", "limit": 2})).json()
+    assert body["query"] == "du"
+    assert [(s["text"], s["kind"], s["popularity"]) for s in body["suggestions"]] == [
+        ("Dune Messiah", "title", 2), ("Dubliners", "title", 0)
+    ]
+    assert body["suggestions"][0]["book_id"] == messiah_id
+    
+    assert (await client.get("/api/books/autocomplete", params={"q": "du", "limit": 21})).status_code == 422
+    assert (await client.get("/api/books/autocomplete", params={"q": ""})).status_code == 422
+
+async def test_autocomplete_is_unavailable_when_disabled(client, indexes, monkeypatch):
+    monkeypatch.setattr(settings, "AUTOCOMPLETE_ENABLED", False)
+    _, suggestions, refresher = indexes
+    await refresher.rebuild()
+    assert not suggestions.enabled
+    
+    response = await client.get("/api/books/autocomplete", params={"q": "du"})
+    assert response.status_code == 503
+    assert response.json()["detail"] == "Autocomplete is not enabled"
+
+async def test_health_reports_autocomplete_memory(client, indexes):
+    _, _, refresher = indexes
+    await refresher.rebuild()
+    await client.post("/api/books", json={"title": "Dune", "author": "Herbert", "isbn": "isbn-1"})
+    
+    autocomplete = (await client.get("/health")).json()["search"]["autocomplete"]
+    assert (autocomplete["enabled"], autocomplete["books"], autocomplete["keys"]) == (True, 1, 2)
+    assert autocomplete["memory_bytes"] > 0
@@ -0,0 +1,205 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import select
+from app.config.settings import settings
+from app.core.cache import facet_cache
+from app.core.exceptions import (
+    BookNotFoundException, CopiesLimitExceededException, InsufficientCopiesException, InvalidBookDataException
+)
+from app.models.processed_operation import ProcessedOperation
+from app.repositories.book_repository import BookRepository
+from app.schemas.book import (
+    BookAvailabilityUpdate, BookCreate, BulkAvailabilityItem, BulkAvailabilityMode,
+    BulkAvailabilityRequest, BulkItemStatus
+)
+from app.services.book_service import BookService
+from app.services.idempotency_key_purger import IdempotencyKeyPurger
+
+async def create_books(db, *copies):
+    """Ids of new books; ORM instances expire when a batch rolls back"""
+    return [
+        (await BookRepository(db).create(BookCreate(title=f"B{i}", author="A", isbn=f"isbn-{i}", copies=count))).id
+        for i, count in enumerate(copies)
+    ]
+
+def decrement(book_id, key=None):
+    return BulkAvailabilityItem(book_id=book_id, operation="decrement", idempotency_key=key)
+
+async def available(db, book_id):
+    return (await BookService(db).get_book(book_id)).available_copies
+
+async def test_decrement_within_bounds_is_applied(db):
+    book_id, = await create_books(db, 2)
+    change = await BookRepository(db).update_availability(book_id, -1)
+    assert change.found and change.applied
+    assert (change.copies, change.available_copies) == (2, 1)
+    assert change.updated_at is not None
+
+async def test_decrement_below_zero_is_refused_without_writing(db):
+    book_id, = await create_books(db, 1)
+    repository = BookRepository(db)
+    await repository.update_availability(book_id, -1)
+    
+    change = await repository.update_availability(book_id, -1)
+    assert change.found and not change.applied
+    assert change.available_copies == 0
+    assert await available(db, book_id) == 0
+
+async def test_increment_past_copies_is_refused(db):
+    book_id, = await create_books(db, 3)
+    change = await BookRepository(db).update_availability(book_id, 1)
+    assert change.found and not change.applied
+    assert (change.copies, change.available_copies) == (3, 3)
+
+async def test_set_availability_checks_bounds(db):
+    book_id, = await create_books(db, 3)
+    repository = BookRepository(db)
+    assert (await repository.set_availability(book_id, 1)).available_copies == 1
+    assert not (await repository.set_availability(book_id, 4)).applied
+
+async def test_missing_book_is_not_found(db):
+    change = await BookRepository(db).update_availability(404, -1)
+    assert not change.found and not change.applied
+
+async def test_single_update_raises_on_refusal(db):
+    book_id, = await create_books(db, 1)
+    service = BookService(db)
+    await service.update_availability(book_id, BookAvailabilityUpdate(operation="decrement"))
+    with pytest.raises(InsufficientCopiesException):
+        await service.update_availability(book_id, BookAvailabilityUpdate(operation="decrement"))
+    with pytest.raises(CopiesLimitExceededException):
+        await service.update_availability(book_id, BookAvailabilityUpdate(operation="increment", quantity=2))
+    with pytest.raises(BookNotFoundException):
+        await service.update_availability(999, BookAvailabilityUpdate(operation="decrement"))
+
+async def test_availability_endpoint(client):
+    book_id = (await client.post("/api/books", json={"title": "T", "author": "A", "isbn": "isbn-1"})).json()["id"]
+    response = await client.patch(f"/api/books/{book_id}/availability", json={"operation": "decrement"})
+    assert response.json()["available_copies"] == 0
+    response = await client.patch(f"/api/books/{book_id}/availability", json={"operation": "decrement"})
+    assert response.status_code == 400
+
+async def test_atomic_batch_rolls_back_on_failure(db):
+    first_id, empty_id, last_id = await create_books(db, 2, 1, 2)
+    await BookRepository(db).set_availability(empty_id, 0)
+    
+    response = await BookService(db).bulk_update_availability(BulkAvailabilityRequest(
+        items=[decrement(last_id), decrement(empty_id), decrement(first_id)]
+    ))
+    assert not response.committed
+    # Items are applied in book id order, so the last book is never reached
+    assert [result.status for result in response.results] == [
+        BulkItemStatus.SKIPPED, BulkItemStatus.FAILED, BulkItemStatus.ROLLED_BACK
+    ]
+    assert response.results[1].error_code == 400
+    assert await available(db, first_id) == 2
+    assert await available(db, last_id) == 2
+
+async def test_best_effort_batch_commits_what_it_can(db):
+    first_id, empty_id = await create_books(db, 2, 1)
+    await BookRepository(db).set_availability(empty_id, 0)
+    
+    response = await BookService(db).bulk_update_availability(BulkAvailabilityRequest(
+        mode=BulkAvailabilityMode.BEST_EFFORT,
+        items=[decrement(first_id), decrement(empty_id), decrement(404)]
+    ))
+    assert response.committed
+    assert (response.applied, response.failed) == (1, 2)
+    assert response.results[0].available_copies == 1
+    assert response.results[2].error_code == 404
+    assert await available(db, first_id) == 1
+
+async def test_idempotency_key_applies_once(db):
+    book_id, = await create_books(db, 3)
+    service = BookService(db)
+    request = BulkAvailabilityRequest(mode=BulkAvailabilityMode.BEST_EFFORT, items=[decrement(book_id, "key-1")])
+    
+    assert (await service.bulk_update_availability(request)).results[0].status == BulkItemStatus.APPLIED
+    assert (await service.bulk_update_availability(request)).results[0].status == BulkItemStatus.DUPLICATE
+    assert await available(db, book_id) == 2
+
+@pytest.mark.parametrize("mode", ["async", "threaded"])
+async def test_concurrently_recorded_key_is_a_duplicate(db, threaded_db, mode, monkeypatch):
+    session = db if mode == "async" else threaded_db
+    book_id, other_id = await create_books(session, 3, 3)
+    service = BookService(session)
+    await service.bulk_update_availability(BulkAvailabilityRequest(items=[decrement(book_id, "key-1")]))
+    # A concurrent batch checked for the key before the first one recorded it
+    monkeypatch.setattr(BookRepository, "is_processed", lambda self, key: _false())
+    
+    response = await service.bulk_update_availability(BulkAvailabilityRequest(
+        mode=BulkAvailabilityMode.BEST_EFFORT,
+        items=[decrement(book_id, "key-1"), decrement(other_id, "key-2")]
+    ))
+    assert response.committed
+    assert [result.status for result in response.results] == [BulkItemStatus.DUPLICATE, BulkItemStatus.APPLIED]
+    assert await available(session, book_id) == 2
+    assert await available(session, other_id) == 2
+
+async def test_expired_idempotency_keys_are_purged(db, monkeypatch):
+    monkeypatch.setattr(settings, "IDEMPOTENCY_KEY_PURGE_CHUNK_SIZE", 2)
+    expires_at = datetime.now(timezone.utc) - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+    db.add_all([
+        ProcessedOperation(idempotency_key=f"old-{i}", book_id=1, created_at=expires_at - timedelta(minutes=1))
+        for i in range(3)
+    ] + [ProcessedOperation(idempotency_key="recent", book_id=1, created_at=expires_at + timedelta(minutes=1))])
+    await db.commit()
+    
+    purger = IdempotencyKeyPurger()
+    # Deleted as one full chunk and one partial chunk
+    assert await purger.purge_once() == 3
+    assert await purger.purge_once() == 0
+    assert (purger.stats()["runs"], purger.stats()["purged"]) == (2, 3)
+    assert list(await db.scalars(select(ProcessedOperation.idempotency_key))) == ["recent"]
+
+async def _false():
+    return False
+
+async def test_rolled_back_keys_can_be_retried(db):
+    book_id, empty_id = await create_books(db, 1, 1)
+    await BookRepository(db).set_availability(empty_id, 0)
+    service = BookService(db)
+    
+    await service.bulk_update_availability(BulkAvailabilityRequest(
+        items=[decrement(book_id, "key-1"), decrement(empty_id, "key-2")]
+    ))
+    retried = await service.bulk_update_availability(BulkAvailabilityRequest(items=[decrement(book_id, "key-1")]))
+    assert retried.results[0].status == BulkItemStatus.APPLIED
+
+async def test_batch_size_is_limited(db, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_BATCH_SIZE", 1)
+    with pytest.raises(InvalidBookDataException):
+        await BookService(db).bulk_update_availability(BulkAvailabilityRequest(items=[decrement(1), decrement(2)]))
+
+async def test_facets_are_recounted_only_when_availability_flips(db):
+    book_id, = await create_books(db, 2)
+    service = BookService(db)
+    
+    async def availability_facet():
+        _, facets = await service.search_books(None, 1, 10, facets=True)
+        return facets.availability.available, facets.availability.unavailable
+    
+    assert await availability_facet() == (1, 0)
+    await service.update_availability(book_id, BookAvailabilityUpdate(operation="decrement"))
+    # Still has a copy, so the cached counts stay valid
+    assert facet_cache.stats()["entries"] == 1
+    await service.update_availability(book_id, BookAvailabilityUpdate(operation="decrement"))
+    assert facet_cache.stats()["entries"] == 0
+    assert await availability_facet() == (0, 1)
+    
+    await service.bulk_update_availability(BulkAvailabilityRequest(
+        items=[BulkAvailabilityItem(book_id=book_id, operation="increment")]
+    ))
+    assert await availability_facet() == (1, 0)
+
+async def test_bulk_endpoint(client):
+    response = await client.post("/api/books", json={"title": "T", "author": "A", "isbn": "isbn-1"})
+    book_id = response.json()["id"]
+    
+    response = await client.patch("/api/books/batch/availability", json={
+        "mode": "best_effort",
+        "items": [{"book_id": book_id, "operation": "decrement", "idempotency_key": "k"}]
+    })
+    assert response.status_code == 200
+    assert response.json()["results"][0]["available_copies"] == 0
+    assert response.json()["results"][0]["idempotency_key"] == "k"
@@ -0,0 +1,55 @@
+from typing import AsyncIterator
+from library_common.imports import iter_records
+from app.config.settings import settings
+from app.core.exceptions import InvalidImportFileException
+from app.schemas.book import IMPORT_CSV_COLUMNS, ImportFormat
+from app.services.book_service import BookService
+
+async def body(data: bytes, size: int = 5) -> AsyncIterator[bytes]:
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+def records(data: bytes, import_format: ImportFormat):
+    return iter_records(body(data), import_format, IMPORT_CSV_COLUMNS, InvalidImportFileException)
+
+async def import_csv(db, data: bytes):
+    return await BookService(db).import_books(records(data, ImportFormat.CSV))
+
+async def test_import_counts_rows_and_lists_only_failures(db):
+    report = await import_csv(db, (
+        b"title,author,isbn,copies\n"
+        b"Dune,Herbert,isbn-1,2\n"
+        b"Dune again,Herbert,isbn-1,1\n"
+        b"No copies,Someone,isbn-2,0\n"
+        b",Nobody,isbn-3,1\n"
+    ))
+    assert (report.received, report.created, report.duplicates, report.failed) == (4, 1, 1, 2)
+    assert [(error.row, error.isbn) for error in report.errors] == [(3, "isbn-2"), (4, "isbn-3")]
+    assert "copies" in report.errors[0].error
+    assert not report.errors_truncated
+
+async def test_reimport_only_counts_duplicates(db):
+    data = b"title,author,isbn\nA,B,isbn-1\nC,D,isbn-2\n"
+    await import_csv(db, data)
+    report = await import_csv(db, data)
+    assert (report.created, report.duplicates, report.failed) == (0, 2, 0)
+    assert report.errors == []
+
+async def test_error_list_is_capped(db, monkeypatch):
+    monkeypatch.setattr(settings, "IMPORT_MAX_ERRORS", 3)
+    rows = "".join(f'{{"title": "T{i}", "author": "A", "isbn": "isbn-{i}", "copies": -1}}\n' for i in range(10))
+    report = await BookService(db).import_books(records(rows.encode(), ImportFormat.NDJSON))
+    assert report.failed == 10
+    assert len(report.errors) == 3
+    assert report.errors_truncated
+
+async def test_import_endpoint_rejects_a_bad_header(client):
+    response = await client.post(
+        "/api/books/import", content=b"title,isbn\nA,isbn-1\n", headers={"content-type": "text/csv"}
+    )
+    assert response.status_code == 400
+    
+    response = await client.post(
+        "/api/books/import", content=b"title,author,isbn\nA,B,isbn-1\n", headers={"content-type": "text/csv"}
+    )
+    assert response.json()["created"] == 1
@@ -0,0 +1,177 @@
+import pytest
+from library_common.pagination import InvalidCursorError
+from app.config.settings import settings
+from app.controllers.book_controller import parse_ids
+from app.core.exceptions import InvalidBookDataException
+from app.repositories import book_repository
+from app.repositories.book_repository import BookFilters, BookRepository
+from app.schemas.book import BookCreate, BookUpdate
+from app.services.book_service import BookService
+
+def make_books(count, **fields):
+    return [
+        BookCreate(**{"title": f"Book {i}", "author": f"Author {i % 2}", "isbn": f"978000000{i:04d}", **fields})
+        for i in range(count)
+    ]
+
+@pytest.fixture(params=["async", "threaded"])
+def session(request, db, threaded_db):
+    """Both session modes DATABASE_ASYNC selects between"""
+    return db if request.param == "async" else threaded_db
+
+async def test_create_get_update_delete(session):
+    repository = BookRepository(session)
+    book = await repository.create(BookCreate(title="Dune", author="Herbert", isbn="isbn-1", copies=2))
+    assert (book.copies, book.available_copies) == (2, 2)
+    
+    assert (await repository.get_by_isbn("isbn-1")).id == book.id
+    updated = await repository.update(book.id, BookUpdate(copies=3, genre="Fiction"))
+    assert (updated.copies, updated.available_copies, updated.genre) == (3, 3, "Fiction")
+    
+    assert await repository.delete(book.id)
+    assert await repository.get_by_id(book.id) is None
+    assert not await repository.delete(book.id)
+
+async def test_count(session):
+    repository = BookRepository(session)
+    for i in range(3):
+        await repository.create(BookCreate(title=f"Book {i}", author="Author", isbn=f"isbn-{i}"))
+    assert await repository.count() == 3
+
+async def test_book_endpoints(client):
+    response = await client.post("/api/books", json={"title": "Dune", "author": "Herbert", "isbn": "isbn-1"})
+    assert response.status_code == 201
+    book_id = response.json()["id"]
+    
+    assert (await client.get(f"/api/books/{book_id}")).json()["available_copies"] == 1
+    response = await client.post("/api/books", json={"title": "Dune", "author": "Herbert", "isbn": "isbn-1"})
+    assert response.status_code == 409
+    assert (await client.delete(f"/api/books/{book_id}")).status_code == 204
+    assert (await client.get(f"/api/books/{book_id}")).status_code == 404
+
+async def test_get_by_ids_returns_only_existing(db):
+    repository = BookRepository(db)
+    books = [await repository.create(book) for book in make_books(2)]
+    assert [book.isbn for book in await repository.get_by_ids([books[1].id, 999])] == ["9780000000001"]
+    assert await repository.get_by_ids([]) == []
+
+async def test_get_books_keeps_request_order(db):
+    repository = BookRepository(db)
+    books = [await repository.create(book) for book in make_books(3)]
+    
+    found, not_found = await BookService(db).get_books([books[2].id, 998, books[0].id, 997])
+    assert [book.id for book in found] == [books[2].id, books[0].id]
+    assert not_found == [998, 997]
+
+async def test_get_books_rejects_oversized_batches(db, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_BATCH_SIZE", 2)
+    with pytest.raises(InvalidBookDataException):
+        await BookService(db).get_books([1, 2, 3])
+
+def test_parse_ids_drops_duplicates_in_order():
+    assert parse_ids("3, 1,3,,2,1") == [3, 1, 2]
+    with pytest.raises(InvalidBookDataException):
+        parse_ids("1,x")
+
+async def test_batch_endpoint_reports_missing_ids(client, monkeypatch):
+    book_id = (await client.post("/api/books", json={"title": "Dune", "author": "Herbert", "isbn": "isbn-1"})).json()["id"]
+    
+    body = (await client.get("/api/books/batch", params={"ids": f"999,{book_id},998,{book_id}"})).json()
+    assert [book["id"] for book in body["books"]] == [book_id]
+    assert body["not_found"] == [999, 998]
+    
+    assert (await client.get("/api/books/batch", params={"ids": "1,x"})).status_code == 400
+    monkeypatch.setattr(settings, "MAX_BATCH_SIZE", 2)
+    assert (await client.get("/api/books/batch", params={"ids": "1,2,3"})).status_code == 400
+    # Duplicates count once towards the limit
+    assert (await client.get("/api/books/batch", params={"ids": "1,2,1"})).status_code == 200
+
+async def test_search_cursor_pages_cover_matches_once(db):
+    repository = BookRepository(db)
+    for book in make_books(5):
+        await repository.create(book)
+    
+    first = await repository.search(None, page=1, per_page=2)
+    assert first.total == 5
+    titles = [book.title for book in first.items]
+    cursor = first.next_cursor
+    while cursor is not None:
+        page = await repository.search(None, page=1, per_page=2, cursor=cursor)
+        assert page.total is None
+        titles.extend(book.title for book in page.items)
+        cursor = page.next_cursor
+    assert sorted(titles) == [f"Book {i}" for i in range(5)]
+
+async def test_available_books_follow_cursor(db):
+    repository = BookRepository(db)
+    books = [await repository.create(book) for book in make_books(4)]
+    await repository.set_availability(books[1].id, 0)
+    
+    first = await repository.get_available_books(page=1, per_page=2)
+    rest = await repository.get_available_books(page=1, per_page=2, cursor=first.next_cursor)
+    assert [book.id for book in first.items + rest.items] == [books[0].id, books[2].id, books[3].id]
+
+async def test_malformed_cursor_is_rejected(db):
+    with pytest.raises(InvalidCursorError):
+        await BookRepository(db).search(None, page=1, per_page=10, cursor="bm9wZQ")
+
+async def test_filtered_total_stops_at_the_count_cap(db, monkeypatch):
+    monkeypatch.setattr(settings, "COUNT_CAP", 3)
+    repository = BookRepository(db)
+    for book in make_books(5):
+        await repository.create(book)
+    
+    page = await repository.get_available_books(page=1, per_page=2)
+    assert (page.total, page.total_exact) == (3, False)
+    # Past the cap, the rows seen so far (the lookahead row included) are the lower bound
+    page = await repository.get_available_books(page=2, per_page=2)
+    assert (page.total, page.total_exact) == (5, False)
+    # The last page knows the total without counting
+    page = await repository.get_available_books(page=3, per_page=2)
+    assert (page.total, page.total_exact) == (5, True)
+    
+    page = await repository.search(None, page=1, per_page=2, exact_total=True)
+    assert (page.total, page.total_exact) == (5, True)
+
+async def test_filtered_search(db):
+    repository = BookRepository(db)
+    for book in make_books(7):
+        await repository.create(book)
+    
+    page = await repository.search(None, page=1, per_page=10, filters=BookFilters(author="Author 1"))
+    assert [book.title for book in page.items] == ["Book 1", "Book 3", "Book 5"]
+    page = await repository.search("Book 3", page=1, per_page=10, filters=BookFilters(author="Author 0"))
+    assert page.items == []
+
+async def test_facet_counts(db):
+    repository = BookRepository(db)
+    books = [await repository.create(book) for book in make_books(3, genre="Fiction")]
+    await repository.set_availability(books[0].id, 0)
+    
+    facets = await repository.facet_counts(None, None, limit=10)
+    assert facets["genre"] == [("Fiction", 3)]
+    assert facets["author"] == [("Author 0", 2), ("Author 1", 1)]
+    assert facets["availability"] == {"available": 2, "unavailable": 1}
+
+async def test_facet_counts_over_given_ids_merge_chunks(db, monkeypatch):
+    monkeypatch.setattr(book_repository, "ID_CHUNK_SIZE", 2)
+    repository = BookRepository(db)
+    books = [await repository.create(book) for book in make_books(6, genre="Fiction")]
+    await repository.set_availability(books[0].id, 0)
+    book_ids = [book.id for book in books[:5]]
+    
+    facets = await repository.facet_counts(None, None, limit=10, book_ids=book_ids)
+    assert facets["genre"] == [("Fiction", 5)]
+    assert facets["author"] == [("Author 0", 3), ("Author 1", 2)]
+    assert facets["availability"] == {"available": 4, "unavailable": 1}
+    
+    facets = await repository.facet_counts(None, BookFilters(author="Author 1"), limit=10, book_ids=book_ids)
+    assert facets["author"] == [("Author 1", 2)]
+    assert await repository.filter_ids(book_ids, BookFilters(available=False)) == {books[0].id}
+
+async def test_create_many_skips_existing_isbns(db):
+    repository = BookRepository(db)
+    await repository.create_many(make_books(2))
+    created = await repository.create_many(make_books(3))
+    assert [book.isbn for book in created] == ["9780000000002"]
+    assert created[0].available_copies == created[0].copies
@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+from app.core import cache as cache_module
+from app.core.cache import TTLCache
+
+async def test_hits_and_expiry(monkeypatch):
+    now = [100.0]
+    # Only the cache's clock; the event loop keeps the real one
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    cache = TTLCache("test", max_entries=10, ttl=5)
+    calls = []
+    
+    async def fetch():
+        calls.append(now[0])
+        return len(calls)
+    
+    assert await cache.get_or_fetch("key", fetch) == 1
+    now[0] += 5
+    assert await cache.get_or_fetch("key", fetch) == 1
+    now[0] += 0.1
+    assert await cache.get_or_fetch("key", fetch) == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+async def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache("test", max_entries=2, ttl=60)
+    
+    async def fetch():
+        return "fetched"
+    
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert await cache.get_or_fetch("a", fetch) == 1
+    cache.set("c", 3)
+    assert cache.evictions == 1
+    assert await cache.get_or_fetch("a", fetch) == 1
+    assert await cache.get_or_fetch("b", fetch) == "fetched"
+
+def test_clear_and_stats():
+    cache = TTLCache("test", max_entries=2, ttl=60)
+    cache.set("a", 1)
+    assert cache.stats()["entries"] == 1
+    cache.clear()
+    assert cache.stats() == {
+        "entries": 0, "max_entries": 2, "hits": 0, "misses": 0, "hit_ratio": 0.0, "evictions": 0
+    }
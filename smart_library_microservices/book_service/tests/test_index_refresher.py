@@ -0,0 +1,58 @@
+from app.repositories.book_repository import BookRepository
+from app.schemas.book import BookCreate, BookUpdate
+from app.services import book_service
+
+def found(search_index, query):
+    return [book_id for _, book_id in search_index.search(query, 10)[1]]
+
+async def test_refresh_picks_up_books_written_by_other_processes(db, indexes):
+    search_index, suggestions, refresher = indexes
+    repository = BookRepository(db)
+    dune = await repository.create(BookCreate(title="Dune", author="Herbert", isbn="isbn-1", copies=2))
+    assert await refresher.rebuild() == 1
+    
+    # Written straight to the table, as another worker or replica would
+    emma = await repository.create(BookCreate(title="Emma", author="Austen", isbn="isbn-2"))
+    await repository.update(dune.id, BookUpdate(title="Dune Messiah"))
+    await repository.update_availability(dune.id, -1)
+    assert found(search_index, "emma") == []
+    
+    assert await refresher.refresh_once() == 2
+    assert found(search_index, "emma") == [emma.id]
+    assert found(search_index, "messiah") == [dune.id]
+    assert [(s.text, s.popularity) for s in suggestions.suggest("dune", 5)] == [("Dune Messiah", 1)]
+    assert refresher.stats()["age_seconds"] is not None
+
+async def test_refresh_drops_books_deleted_elsewhere(db, indexes):
+    search_index, suggestions, refresher = indexes
+    repository = BookRepository(db)
+    dune = await repository.create(BookCreate(title="Dune", author="Herbert", isbn="isbn-1"))
+    await repository.create(BookCreate(title="Emma", author="Austen", isbn="isbn-2"))
+    await refresher.rebuild()
+    
+    # One deleted and one created, so the table is the same size as the index
+    await repository.delete(dune.id)
+    persuasion = await repository.create(BookCreate(title="Persuasion", author="Austen", isbn="isbn-3"))
+    await refresher.refresh_once()
+    assert found(search_index, "dune") == []
+    assert found(search_index, "persuasion") == [persuasion.id]
+    assert suggestions.suggest("dune", 5) == []
+    assert (len(search_index), len(suggestions)) == (2, 2)
+    assert (refresher.stats()["rebuilds"], refresher.stats()["deleted"]) == (1, 2)
+
+async def test_search_drops_books_it_cannot_load(db, indexes):
+    search_index, suggestions, refresher = indexes
+    repository = BookRepository(db)
+    dune = await repository.create(BookCreate(title="Dune", author="Herbert", isbn="isbn-1"))
+    messiah = await repository.create(BookCreate(title="Dune Messiah", author="Herbert", isbn="isbn-2"))
+    await refresher.rebuild()
+    
+    await repository.delete(dune.id)
+    page, _ = await book_service.BookService(db).search_books("dune", page=1, per_page=10)
+    assert ([book.id for book in page.items], page.total) == ([messiah.id], 1)
+    assert found(search_index, "dune") == [messiah.id]
+    assert [s.book_id for s in suggestions.suggest("dune", 5)] == [messiah.id]
+
+async def test_health_reports_index_age(client):
+    search = (await client.get("/health")).json()["search"]
+    assert set(search["index_refresh"]) >= {"age_seconds", "interval_seconds", "last_error"}
@@ -0,0 +1,142 @@
+import math
+from types import SimpleNamespace
+import pytest
+from app.schemas.book import BookCreate, BookUpdate
+from app.services.book_service import BookService
+from app.services.search_index import BookSearchIndex, tokenize
+
+def row(book_id, title, author="Anon", genre=None):
+    return SimpleNamespace(id=book_id, title=title, author=author, genre=genre)
+
+def loaded(*rows):
+    index = BookSearchIndex()
+    index.load(rows)
+    return index
+
+def found(index, query, limit=10):
+    return [book_id for _, book_id in index.search(query, limit)[1]]
+
+def test_tokenize_lowercases_and_strips_accents():
+    assert tokenize("Les Misérables, Vol. 2") == ["les", "miserables", "vol", "2"]
+    assert tokenize(None) == []
+
+def test_bm25_score_of_a_single_title_match():
+    index = loaded(row(1, "Dune"), row(2, "Emma"))
+    (score, book_id), = index.search("dune", 10)[1]
+    
+    # "dune" is one title word: frequency and length are both the title weight, the average length
+    weight = BookSearchIndex.FIELD_WEIGHTS["title"]
+    idf = math.log(1 + (2 - 1 + 0.5) / (1 + 0.5))
+    norm = BookSearchIndex.K1
+    assert book_id == 1
+    assert score == pytest.approx(idf * weight * (BookSearchIndex.K1 + 1) / (weight + norm))
+
+def test_title_matches_outrank_author_and_genre_matches():
+    index = loaded(
+        row(1, "Notes", genre="Dune"),
+        row(2, "Notes", author="Dune"),
+        row(3, "Dune"),
+    )
+    assert found(index, "dune") == [3, 2, 1]
+
+def test_every_word_must_match():
+    index = loaded(row(1, "Dune Messiah", "Herbert"), row(2, "Dune", "Herbert"), row(3, "Messiah"))
+    assert found(index, "dune messiah") == [1]
+    assert found(index, "herbert messiah") == [1]
+    assert found(index, "dune emma") == []
+
+def test_only_the_last_word_is_a_prefix():
+    index = loaded(row(1, "Dune"), row(2, "Dust"), row(3, "Duel Dune"))
+    assert sorted(found(index, "du")) == [1, 2, 3]
+    assert found(index, "du dune") == []
+    assert found(index, "duel du") == [3]
+
+def test_prefix_expansion_is_capped(monkeypatch):
+    monkeypatch.setattr(BookSearchIndex, "MAX_PREFIX_EXPANSIONS", 2)
+    index = loaded(row(1, "aa1"), row(2, "aa2"), row(3, "aa3"))
+    # Only the first terms in vocabulary order are expanded
+    assert sorted(found(index, "aa")) == [1, 2]
+    assert found(index, "aa3") == [3]
+
+def test_search_counts_every_match_but_returns_a_page():
+    index = loaded(*(row(book_id, f"Dune {book_id}") for book_id in range(1, 6)))
+    total, ranked = index.search("dune", 2)
+    assert (total, len(ranked)) == (5, 2)
+
+def test_after_continues_past_ties_in_id_order():
+    index = loaded(row(1, "Dune"), row(2, "Dune"), row(3, "Dune"), row(4, "Dune Messiah"))
+    _, first = index.search("dune", 2)
+    _, rest = index.search("dune", 10, after=first[-1])
+    assert [book_id for _, book_id in first + rest] == [1, 2, 3, 4]
+
+def test_add_replaces_and_remove_drops():
+    index = loaded(row(1, "Dune"))
+    index.add(row(1, "Emma"))
+    index.add(row(2, "Dune"))
+    assert (found(index, "emma"), found(index, "dune")) == ([1], [2])
+    
+    index.remove(2)
+    assert found(index, "dune") == []
+    assert found(index, "du") == []
+    assert (len(index), index.stats()["terms"]) == (1, 2)
+
+def test_disabled_index_ignores_changes():
+    index = BookSearchIndex()
+    index.add(row(1, "Dune"))
+    assert len(index) == 0
+
+async def test_cursor_pages_cover_ranked_matches_once(db, indexes):
+    search_index, _, refresher = indexes
+    service = BookService(db)
+    for i in range(5):
+        await service.create_book(BookCreate(title="Dune" if i % 2 else "Dune Messiah", author="Herbert", isbn=f"isbn-{i}"))
+    await refresher.rebuild()
+    
+    first, _ = await service.search_books("dune", page=1, per_page=2)
+    assert first.total == 5
+    ids = [book.id for book in first.items]
+    cursor = first.next_cursor
+    while cursor is not None:
+        page, _ = await service.search_books("dune", page=1, per_page=2, cursor=cursor)
+        assert page.total is None
+        ids.extend(book.id for book in page.items)
+        cursor = page.next_cursor
+    assert ids == found(search_index, "dune")
+    
+    second, _ = await service.search_books("dune", page=2, per_page=2)
+    assert [book.id for book in second.items] == ids[2:4]
+
+async def test_book_writes_update_the_index(db, indexes):
+    search_index, _, refresher = indexes
+    await refresher.rebuild()
+    service = BookService(db)
+    
+    book = await service.create_book(BookCreate(title="Dune", author="Herbert", isbn="isbn-1"))
+    assert found(search_index, "dune") == [book.id]
+    
+    await service.update_book(book.id, BookUpdate(title="Emma"))
+    assert (found(search_index, "dune"), found(search_index, "emma")) == ([], [book.id])
+    
+    await service.delete_book(book.id)
+    assert (found(search_index, "emma"), len(search_index)) == ([], 0)
+
+async def test_facets_and_filters_follow_the_index_matches(db, indexes):
+    _, _, refresher = indexes
+    service = BookService(db)
+    dune = await service.create_book(BookCreate(title="Dune", author="Herbert", isbn="isbn-1", genre="Science Fiction"))
+    await service.create_book(BookCreate(title="Dune Messiah", author="Herbert", isbn="isbn-2", genre="Classics"))
+    await service.create_book(BookCreate(title="Emma", author="Austen", isbn="isbn-3", genre="Classics"))
+    await refresher.rebuild()
+    
+    # Not a substring of any field, but every word matches in the index
+    page, facets = await service.search_books("dune herb", page=1, per_page=10, facets=True)
+    assert page.total == 2
+    assert {(facet.value, facet.count) for facet in facets.genre} == {("Science Fiction", 1), ("Classics", 1)}
+    assert [(facet.value, facet.count) for facet in facets.author] == [("Herbert", 2)]
+    assert (facets.availability.available, facets.availability.unavailable) == (2, 0)
+    
+    page, facets = await service.search_books(
+        "dune herb", page=1, per_page=10, genre="Science Fiction", facets=True
+    )
+    assert ([book.id for book in page.items], page.total) == ([dune.id], 1)
+    assert [(facet.value, facet.count) for facet in facets.genre] == [("Science Fiction", 1)]
@@ -0,0 +1,42 @@
+from datetime import datetime, timezone
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from library_common.serialization import FastJSONResponse, from_orm
+from app.models.book import Book
+from app.schemas.book import BookResponse, BookSearchResponse
+
+async def default_json(model, content) -> bytes:
+    """What FastAPI renders when a handler returns content for response_model=model"""
+    field = create_response_field(f"Response_{model.__name__}", model)
+    return JSONResponse(await serialize_response(field=field, response_content=content)).body
+
+def book(book_id, created_at, genre=None):
+    return Book(
+        id=book_id, title=f"Dune {book_id}", author="Herbert", isbn=f"isbn-{book_id}", genre=genre,
+        copies=2, available_copies=1, created_at=created_at, updated_at=created_at
+    )
+
+@pytest.mark.parametrize("created_at", [
+    datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+    datetime(2026, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+    # SQLite hands back naive datetimes
+    datetime(2026, 1, 2, 3, 4, 5)
+])
+async def test_book_matches_default_encoding(created_at):
+    for row in (book(1, created_at), book(2, created_at, genre="Fiction")):
+        response = from_orm(BookResponse, row)
+        assert FastJSONResponse(response).body == await default_json(BookResponse, response)
+
+async def test_search_page_matches_default_encoding():
+    books = [from_orm(BookResponse, book(book_id, datetime(2026, 1, 2, tzinfo=timezone.utc))) for book_id in (1, 2)]
+    page = BookSearchResponse.model_construct(
+        books=books, total=None, page=None, per_page=2, next_cursor=None, total_exact=True, facets=None
+    )
+    assert FastJSONResponse(page).body == await default_json(BookSearchResponse, page)
+
+def test_from_orm_sets_every_field():
+    response = from_orm(BookResponse, book(1, datetime(2026, 1, 2)))
+    assert set(response.__dict__) == set(BookResponse.model_fields)
+    assert response.model_fields_set == set(BookResponse.model_fields)
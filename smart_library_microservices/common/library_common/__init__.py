@@ -0,0 +1 @@
+"""Code shared by the Smart Library microservices"""
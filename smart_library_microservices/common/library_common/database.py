@@ -0,0 +1,118 @@
+from typing import Any, AsyncIterator, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+def to_async_url(url: str) -> str:
+    """Map a sync database URL onto the matching async driver"""
+    for prefix, async_prefix in (
+        ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+        ("postgresql://", "postgresql+asyncpg://"),
+        ("sqlite://", "sqlite+aiosqlite://"),
+    ):
+        if url.startswith(prefix):
+            return async_prefix + url[len(prefix):]
+    return url
+
+def pool_options(url: str) -> dict:
+    """Connection pool options; SQLite uses SQLAlchemy's defaults"""
+    if url.startswith("sqlite"):
+        return {}
+    return {"pool_pre_ping": True, "pool_size": 5, "max_overflow": 10}
+
+def enable_sqlite_savepoints(engine: Engine) -> None:
+    """Let SQLAlchemy emit BEGIN itself on SQLite, which the sqlite3 driver otherwise defers past a
+    SAVEPOINT, so that rolling back the outer transaction also undoes released savepoints"""
+    if engine.dialect.name != "sqlite":
+        return
+    
+    @event.listens_for(engine, "connect")
+    def disable_driver_transactions(dbapi_connection: Any, connection_record: Any) -> None:
+        dbapi_connection.isolation_level = None
+    
+    @event.listens_for(engine, "begin")
+    def begin(connection: Any) -> None:
+        connection.exec_driver_sql("BEGIN")
+
+class ThreadedResult:
+    """AsyncResult-compatible facade over a sync streaming Result that fetches in a worker thread"""
+    def __init__(self, result: Any):
+        self.sync_result = result
+    
+    async def partitions(self, size: Optional[int] = None) -> AsyncIterator[Any]:
+        partitions = self.sync_result.partitions(size)
+        while True:
+            partition = await run_in_threadpool(next, partitions, None)
+            if partition is None:
+                return
+            yield partition
+
+class ThreadedTransaction:
+    """AsyncSessionTransaction-compatible facade over a sync nested transaction, started when awaited"""
+    def __init__(self, session: Session):
+        self.sync_session = session
+        self.sync_transaction = None
+    
+    async def start(self) -> "ThreadedTransaction":
+        self.sync_transaction = await run_in_threadpool(self.sync_session.begin_nested)
+        return self
+    
+    def __await__(self):
+        return self.start().__await__()
+    
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_transaction.commit)
+    
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_transaction.rollback)
+
+class ThreadedSession:
+    """AsyncSession-compatible facade over a sync Session that runs each call in a worker thread"""
+    def __init__(self, session: Session):
+        self.sync_session = session
+    
+    def get_bind(self) -> Any:
+        return self.sync_session.get_bind()
+    
+    def add(self, instance: Any) -> None:
+        self.sync_session.add(instance)
+    
+    def add_all(self, instances: Any) -> None:
+        self.sync_session.add_all(instances)
+    
+    async def execute(self, *args: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(self.sync_session.execute, *args, **kwargs)
+    
+    async def stream(self, *args: Any, **kwargs: Any) -> ThreadedResult:
+        return ThreadedResult(await run_in_threadpool(self.sync_session.execute, *args, **kwargs))
+    
+    async def scalar(self, *args: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(self.sync_session.scalar, *args, **kwargs)
+    
+    async def scalars(self, *args: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(self.sync_session.scalars, *args, **kwargs)
+    
+    async def get(self, *args: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(self.sync_session.get, *args, **kwargs)
+    
+    async def delete(self, instance: Any) -> None:
+        await run_in_threadpool(self.sync_session.delete, instance)
+    
+    def begin_nested(self) -> ThreadedTransaction:
+        return ThreadedTransaction(self.sync_session)
+    
+    async def flush(self) -> None:
+        await run_in_threadpool(self.sync_session.flush)
+    
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+    
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+    
+    async def refresh(self, instance: Any) -> None:
+        await run_in_threadpool(self.sync_session.refresh, instance)
+    
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
@@ -0,0 +1,100 @@
+import codecs
+import csv
+import json
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+class ImportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+class ImportRecord(NamedTuple):
+    """One row of an import file: its fields, or why they could not be read"""
+    row: int
+    data: Optional[Dict[str, Any]]
+    error: Optional[str] = None
+
+async def iter_records(
+    chunks: AsyncIterator[bytes],
+    import_format: ImportFormat,
+    required_columns: Sequence[str],
+    invalid_file: Callable[[str], Exception]
+) -> AsyncIterator[ImportRecord]:
+    """Parse a streamed CSV or NDJSON file into records, numbered from 1 after any header. A CSV header
+    must name required_columns (others are ignored); a file that cannot be read at all raises
+    invalid_file(reason)"""
+    lines = _iter_lines(chunks, invalid_file)
+    if import_format == ImportFormat.CSV:
+        records = _iter_csv(lines, required_columns, invalid_file)
+    else:
+        records = _iter_ndjson(lines)
+    async for record in records:
+        yield record
+
+async def _iter_lines(chunks: AsyncIterator[bytes], invalid_file: Callable[[str], Exception]) -> AsyncIterator[str]:
+    """Lines of UTF-8 text (a leading BOM is dropped) without holding more than one chunk"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    try:
+        async for chunk in chunks:
+            pending += decoder.decode(chunk)
+            lines = pending.split("\n")
+            pending = lines.pop()
+            for line in lines:
+                yield line
+        pending += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise invalid_file("file is not UTF-8 text")
+    if pending:
+        yield pending
+
+async def _iter_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[ImportRecord]:
+    row = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield ImportRecord(row, None, f"Invalid JSON: {e.msg}")
+            continue
+        if not isinstance(data, dict):
+            yield ImportRecord(row, None, "Expected a JSON object")
+            continue
+        yield ImportRecord(row, data)
+
+async def _iter_csv(
+    lines: AsyncIterator[str], required_columns: Sequence[str], invalid_file: Callable[[str], Exception]
+) -> AsyncIterator[ImportRecord]:
+    header: Optional[List[str]] = None
+    row = 0
+    async for record in _iter_csv_records(lines):
+        fields = next(csv.reader([record]), [])
+        if not any(field.strip() for field in fields):
+            continue
+        if header is None:
+            header = [field.strip().lower() for field in fields]
+            missing = [column for column in required_columns if column not in header]
+            if missing:
+                raise invalid_file(f"CSV header is missing {', '.join(missing)}")
+            continue
+        
+        row += 1
+        if len(fields) != len(header):
+            yield ImportRecord(row, None, f"Expected {len(header)} fields, got {len(fields)}")
+            continue
+        # Empty cells fall back to the schema defaults
+        yield ImportRecord(row, {column: value for column, value in zip(header, fields) if value.strip()})
+
+async def _iter_csv_records(lines: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Join lines that belong to one record because a quoted field spans them"""
+    pending = ""
+    async for line in lines:
+        pending += line + "\n"
+        # Escaped quotes come in pairs, so an odd count means a quoted field is still open
+        if pending.count('"') % 2 == 0:
+            yield pending
+            pending = ""
+    if pending:
+        yield pending
@@ -0,0 +1,82 @@
+import base64
+import json
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence, Tuple, TypeVar
+from sqlalchemy import Select, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+T = TypeVar("T")
+
+class Page(NamedTuple):
+    """One page of a list query"""
+    items: List[Any]
+    # None in cursor mode, where no total is computed
+    total: Optional[int]
+    next_cursor: Optional[str]
+    # False when total is a planner estimate or a capped count, i.e. only roughly or at least that many
+    total_exact: bool = True
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+def encode_cursor(*values: Any) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor"""
+    payload = json.dumps(list(values), separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, *types: Callable[[Any], Any]) -> List[Any]:
+    """Decode a cursor produced by encode_cursor, converting each sort key value with the matching type"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(payload)
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("wrong number of values")
+        return [convert(value) for convert, value in zip(types, values)]
+    except (ValueError, TypeError):
+        raise InvalidCursorError("Malformed cursor")
+
+def split_page(rows: Sequence[T], per_page: int) -> Tuple[List[T], bool]:
+    """Trim a per_page + 1 row fetch to one page, reporting whether more rows follow"""
+    return list(rows[:per_page]), len(rows) > per_page
+
+async def estimate_row_count(db: AsyncSession, table: str) -> Optional[int]:
+    """Planner estimate of a table's row count; None where unsupported or not yet analyzed"""
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    estimate = await db.scalar(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": table}
+    )
+    return int(estimate) if estimate is not None and estimate >= 0 else None
+
+async def fetch_offset_page(
+    db: AsyncSession,
+    query: Select,
+    page: int,
+    per_page: int,
+    estimate_table: Optional[str] = None,
+    estimate_threshold: Optional[int] = None,
+    count_cap: Optional[int] = None
+) -> Tuple[List[Any], int, bool]:
+    """Fetch one offset page plus a lookahead row, with its total and whether that total is exact"""
+    offset = (page - 1) * per_page
+    # Only unfiltered queries pass estimate_table; big tables then report the planner estimate
+    if estimate_table is not None and estimate_threshold is not None:
+        estimate = await estimate_row_count(db, estimate_table)
+        if estimate is not None and estimate >= estimate_threshold:
+            result = await db.execute(query.offset(offset).limit(per_page + 1))
+            return list(result.scalars().all()), estimate, False
+    
+    rows = list((await db.execute(query.offset(offset).limit(per_page + 1))).scalars().all())
+    # The last page tells the total by itself
+    if len(rows) <= per_page and (rows or offset == 0):
+        return rows, offset + len(rows), True
+    
+    # Otherwise count, stopping at count_cap rows so a broad filter does not read every match
+    matches = query.order_by(None)
+    if count_cap is not None:
+        matches = matches.limit(count_cap)
+    total = await db.scalar(select(func.count()).select_from(matches.subquery()))
+    if count_cap is not None and total >= count_cap:
+        # At least this many
+        return rows, max(total, offset + len(rows)), False
+    return rows, total, True
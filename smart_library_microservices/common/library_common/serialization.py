@@ -0,0 +1,36 @@
+from typing import Any, Dict, Type, TypeVar
+import orjson
+from starlette.responses import JSONResponse
+from pydantic import BaseModel
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+def construct(model: Type[ModelT], values: Dict[str, Any]) -> ModelT:
+    """Build a model from trusted values for every field, without validation; the state model_construct
+    would set, minus its per-field alias and default handling (for models without private attributes)"""
+    instance = model.__new__(model)
+    object.__setattr__(instance, "__dict__", values)
+    object.__setattr__(instance, "__pydantic_fields_set__", set(values))
+    object.__setattr__(instance, "__pydantic_extra__", None)
+    object.__setattr__(instance, "__pydantic_private__", None)
+    return instance
+
+def from_orm(model: Type[ModelT], obj: Any) -> ModelT:
+    """Build a response model from a trusted ORM row without validating it"""
+    # Loaded columns are in the instance dict; anything else (e.g. expired) goes through the attribute
+    loaded = obj.__dict__
+    return construct(model, {
+        name: loaded[name] if name in loaded else getattr(obj, name) for name in model.model_fields
+    })
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        # Field values only; constructed models are not re-validated on the way out
+        return value.__dict__
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered by orjson, bypassing response_model re-validation when returned from a handler;
+    output matches FastAPI's (UTC datetimes end in Z)"""
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z)
@@ -0,0 +1,48 @@
+from typing import AsyncIterator, List
+import pytest
+from library_common.imports import ImportFormat, iter_records
+
+class InvalidFile(Exception):
+    pass
+
+async def chunked(data: bytes, size: int = 7) -> AsyncIterator[bytes]:
+    """Feed a body in small pieces, splitting lines and characters across chunks"""
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+async def collect(data: bytes, import_format: ImportFormat, required_columns=("name", "email")) -> List:
+    return [record async for record in iter_records(chunked(data), import_format, required_columns, InvalidFile)]
+
+async def test_csv_records_survive_chunk_boundaries():
+    data = '\ufeffname,email\n"Doe, Jane",jane@example.com\nZoë,zoe@example.com\n\n'.encode()
+    records = await collect(data, ImportFormat.CSV)
+    assert [record.row for record in records] == [1, 2]
+    assert records[0].data == {"name": "Doe, Jane", "email": "jane@example.com"}
+    assert records[1].data["name"] == "Zoë"
+
+async def test_csv_quoted_fields_may_span_lines():
+    records = await collect(b'name,email\n"Line one\nline two",a@example.com\n', ImportFormat.CSV)
+    assert records[0].data["name"] == "Line one\nline two"
+
+async def test_csv_empty_cells_are_left_out_and_short_rows_reported():
+    records = await collect(b"name,email,role\nAnn,ann@example.com,\nBob,bob@example.com\n", ImportFormat.CSV)
+    assert records[0].data == {"name": "Ann", "email": "ann@example.com"}
+    assert records[1].error == "Expected 3 fields, got 2"
+
+async def test_csv_header_must_name_the_required_columns():
+    with pytest.raises(InvalidFile, match="missing email"):
+        await collect(b"Name,role\nAnn,student\n", ImportFormat.CSV)
+    records = await collect(b"title,isbn\nDune,isbn-1\n", ImportFormat.CSV, required_columns=("title", "isbn"))
+    assert records[0].data == {"title": "Dune", "isbn": "isbn-1"}
+
+async def test_ndjson_reports_unreadable_lines():
+    data = b'{"name": "A", "email": "a@example.com"}\nnot json\n\n[1, 2]\n'
+    records = await collect(data, ImportFormat.NDJSON)
+    assert [record.row for record in records] == [1, 2, 3]
+    assert records[0].error is None
+    assert records[1].error.startswith("Invalid JSON")
+    assert records[2].error == "Expected a JSON object"
+
+async def test_non_utf8_file_is_invalid():
+    with pytest.raises(InvalidFile, match="UTF-8"):
+        await collect(b'{"name": "\xff"}\n', ImportFormat.NDJSON)
@@ -1,5 +1,11 @@
+import asyncio
+import random
+import time
 import httpx
 from typing import Dict, Any, Optional
+from app.clients.http_pool import http_pool, PooledHTTPClient
+from app.clients.resilience import resilience, ServiceGuard
+from app.config.settings import settings
 from app.core.logging import logger
 from app.core.exceptions import ServiceUnavailableException
 
@@ -18,29 +24,108 @@ class BaseServiceClient:
     ) -> Dict[str, Any]:
         """Make HTTP request to external service"""
         url = f"{self.base_url}{path}"
+        client = http_pool.get(service_name, self.base_url, self.timeout)
+        guard = resilience.get(service_name)
         
-        try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.request(
-                    method=method,
-                    url=url,
-                    json=data,
-                    params=params
-                )
+        if not guard.breaker.allow_request():
+            logger.warning(f"Circuit for {service_name} is open, failing fast")
+            raise ServiceUnavailableException(service_name)
+        
+        # Only idempotent reads are retried or hedged
+        idempotent = method.upper() == "GET"
+        guard.budget.record_request()
+        attempt = 0
+        
+        while True:
+            try:
+                response = await self._send(client, guard, method, path, data, params, hedge=idempotent)
                 
                 if response.status_code >= 500:
                     logger.error(f"{service_name} returned {response.status_code}")
                     raise ServiceUnavailableException(service_name)
                 
+                # Any non-5xx answer means the service itself is healthy
+                guard.breaker.record_success()
                 response.raise_for_status()
                 return response.json()
                 
-        except httpx.TimeoutException:
-            logger.error(f"Timeout calling {service_name} at {url}")
-            raise ServiceUnavailableException(service_name)
-        except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP error from {service_name}: {e.response.status_code}")
-            raise
-        except Exception as e:
-            logger.error(f"Error calling {service_name}: {str(e)}")
-            raise ServiceUnavailableException(service_name)
+            except httpx.HTTPStatusError as e:
+                logger.error(f"HTTP error from {service_name}: {e.response.status_code}")
+                raise
+            except Exception as e:
+                guard.breaker.record_failure()
+                if isinstance(e, httpx.TimeoutException):
+                    logger.error(f"Timeout calling {service_name} at {url}")
+                elif not isinstance(e, ServiceUnavailableException):
+                    logger.error(f"Error calling {service_name}: {str(e)}")
+                
+                if (
+                    idempotent
+                    and attempt < settings.RETRY_MAX_ATTEMPTS
+                    and guard.breaker.allow_request()
+                    and guard.budget.try_spend()
+                ):
+                    attempt += 1
+                    # Full jitter exponential backoff
+                    delay = random.uniform(0, min(settings.RETRY_BACKOFF_MAX, settings.RETRY_BACKOFF_BASE * 2 ** attempt))
+                    logger.warning(f"Retrying {method} {path} on {service_name} (attempt {attempt}) in {delay * 1000:.0f}ms")
+                    await asyncio.sleep(delay)
+                    continue
+                
+                raise ServiceUnavailableException(service_name)
+    
+    async def _send(
+        self,
+        client: PooledHTTPClient,
+        guard: ServiceGuard,
+        method: str,
+        path: str,
+        data: Optional[Dict[str, Any]],
+        params: Optional[Dict[str, Any]],
+        hedge: bool
+    ) -> httpx.Response:
+        """Send one attempt, hedging slow idempotent requests with a second copy"""
+        start = time.perf_counter()
+        delay = guard.latency.hedge_delay() if hedge and settings.HEDGING_ENABLED else None
+        
+        if delay is None:
+            response = await client.request(method=method, path=path, json=data, params=params)
+        else:
+            response = await self._send_hedged(client, guard, delay, method, path, data, params)
+        
+        if response.status_code < 500:
+            guard.latency.record(time.perf_counter() - start)
+        return response
+    
+    async def _send_hedged(
+        self,
+        client: PooledHTTPClient,
+        guard: ServiceGuard,
+        delay: float,
+        method: str,
+        path: str,
+        data: Optional[Dict[str, Any]],
+        params: Optional[Dict[str, Any]]
+    ) -> httpx.Response:
+        """Race the original request against a hedge sent after the p95 delay"""
+        tasks = [asyncio.ensure_future(client.request(method=method, path=path, json=data, params=params))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or not guard.budget.try_spend():
+                return await tasks[0]
+            
+            logger.info(f"Hedging {method} {path} on {guard.name} after {delay * 1000:.0f}ms")
+            tasks.append(asyncio.ensure_future(client.request(method=method, path=path, json=data, params=params)))
+            
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
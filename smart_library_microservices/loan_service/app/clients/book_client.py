@@ -1,5 +1,6 @@
-from typing import Dict, Any
+from typing import Dict, Any, List
 from app.clients.base_client import BaseServiceClient
+from app.clients.cache import book_cache
 from app.config.settings import settings
 from app.core.exceptions import BookNotFoundException, BookNotAvailableException
 import httpx
@@ -8,7 +9,16 @@ class BookServiceClient(BaseServiceClient):
     def __init__(self):
         super().__init__(settings.BOOK_SERVICE_URL, settings.SERVICE_TIMEOUT)
     
-    async def get_book(self, book_id: int) -> Dict[str, Any]:
+    async def get_book(self, book_id: int, use_cache: bool = True) -> Dict[str, Any]:
+        """Get book details, served from cache unless use_cache is False"""
+        if use_cache:
+            return await book_cache.get_or_fetch(book_id, lambda: self._fetch_book(book_id))
+        
+        book = await self._fetch_book(book_id)
+        book_cache.set(book_id, book)
+        return book
+    
+    async def _fetch_book(self, book_id: int) -> Dict[str, Any]:
         """Get book details from Book Service"""
         try:
             return await self._make_request(
@@ -21,6 +31,35 @@ class BookServiceClient(BaseServiceClient):
                 raise BookNotFoundException(book_id)
             raise
     
+    async def get_books(self, book_ids: List[int], use_cache: bool = True) -> Dict[int, Dict[str, Any]]:
+        """Get several books, keyed by ID and served from cache where possible unless use_cache is False;
+        missing IDs are omitted"""
+        if use_cache:
+            return await book_cache.get_many_or_fetch(list(dict.fromkeys(book_ids)), self._fetch_books)
+        
+        books = await self._fetch_books(book_ids)
+        for book_id, book in books.items():
+            book_cache.set(book_id, book)
+        return books
+    
+    async def _fetch_books(self, book_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Get several books from Book Service in chunks"""
+        unique_ids = list(dict.fromkeys(book_ids))
+        books: Dict[int, Dict[str, Any]] = {}
+        
+        for start in range(0, len(unique_ids), settings.BATCH_LOOKUP_SIZE):
+            chunk = unique_ids[start:start + settings.BATCH_LOOKUP_SIZE]
+            response = await self._make_request(
+                method="GET",
+                path="/api/books/batch",
+                service_name="Book Service",
+                params={"ids": ",".join(str(book_id) for book_id in chunk)}
+            )
+            for book in response.get("books", []):
+                books[book["id"]] = book
+        
+        return books
+    
     async def update_availability(self, book_id: int, operation: str) -> Dict[str, Any]:
         """Update book availability in Book Service"""
         try:
@@ -36,6 +75,22 @@ class BookServiceClient(BaseServiceClient):
             elif e.response.status_code == 404:
                 raise BookNotFoundException(book_id)
             raise
+        finally:
+            # Cached copy counts are stale whatever the outcome
+            book_cache.invalidate(book_id)
+    
+    async def update_availability_bulk(self, items: List[Dict[str, Any]], atomic: bool = True) -> Dict[str, Any]:
+        """Apply several availability updates in one Book Service transaction"""
+        try:
+            return await self._make_request(
+                method="PATCH",
+                path="/api/books/batch/availability",
+                service_name="Book Service",
+                data={"items": items, "mode": "atomic" if atomic else "best_effort"}
+            )
+        finally:
+            for item in items:
+                book_cache.invalidate(item["book_id"])
     
     async def check_health(self) -> bool:
         """Check Book Service health"""
@@ -0,0 +1,171 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+from app.config.settings import settings
+from app.core.exceptions import UserNotFoundException, BookNotFoundException
+from app.core.logging import logger
+
+class TTLCache:
+    """Size-bounded LRU cache with a TTL and stale-while-revalidate window"""
+    def __init__(self, name: str, max_entries: int, ttl: float, stale_ttl: float):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._refreshing: Set[Hashable] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refresh_errors = 0
+        self.evictions = 0
+    
+    def _age(self, key: Hashable) -> Optional[float]:
+        """Age of a usable entry, or None when it is missing or too old to serve"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        age = time.monotonic() - entry[1]
+        if age > self.ttl + self.stale_ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return age
+    
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entries when full"""
+        if not settings.CACHE_ENABLED:
+            return
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a cached value"""
+        self._entries.pop(key, None)
+    
+    def clear(self) -> None:
+        self._entries.clear()
+    
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Return a cached value, fetching it on a miss and refreshing it in the background when stale"""
+        if not settings.CACHE_ENABLED:
+            return await fetch()
+        
+        age = self._age(key)
+        if age is not None and age <= self.ttl:
+            self.hits += 1
+            return self._entries[key][0]
+        
+        if age is not None:
+            # Serve stale value now and revalidate off the request path
+            self.stale_hits += 1
+            self._refresh_in_background([key], lambda keys: self._fetch_one(keys[0], fetch))
+            return self._entries[key][0]
+        
+        self.misses += 1
+        value = await fetch()
+        self.set(key, value)
+        return value
+    
+    async def get_many_or_fetch(
+        self,
+        keys: List[Hashable],
+        fetch_many: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+    ) -> Dict[Hashable, Any]:
+        """Batch variant of get_or_fetch; keys missing from the fetch result are omitted"""
+        if not settings.CACHE_ENABLED:
+            return await fetch_many(keys)
+        
+        result: Dict[Hashable, Any] = {}
+        stale: List[Hashable] = []
+        missing: List[Hashable] = []
+        for key in keys:
+            age = self._age(key)
+            if age is None:
+                missing.append(key)
+                continue
+            result[key] = self._entries[key][0]
+            if age <= self.ttl:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+                stale.append(key)
+        
+        if stale:
+            self._refresh_in_background(stale, fetch_many)
+        
+        if missing:
+            self.misses += len(missing)
+            try:
+                fetched = await fetch_many(missing)
+            except Exception as e:
+                if not result:
+                    raise
+                # Serve what we have; missing keys are omitted as if not found
+                logger.warning(f"Fetching {len(missing)} {self.name} failed, serving cached entries only: {str(e)}")
+                return result
+            for key, value in fetched.items():
+                self.set(key, value)
+            result.update(fetched)
+        
+        return result
+    
+    async def _fetch_one(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Dict[Hashable, Any]:
+        try:
+            return {key: await fetch()}
+        except (UserNotFoundException, BookNotFoundException):
+            return {}
+    
+    def _refresh_in_background(
+        self,
+        keys: List[Hashable],
+        fetch_many: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+    ) -> None:
+        """Start a background refresh for keys that are not already being refreshed"""
+        keys = [key for key in keys if key not in self._refreshing]
+        if not keys:
+            return
+        self._refreshing.update(keys)
+        
+        async def refresh() -> None:
+            try:
+                fetched = await fetch_many(keys)
+                for key in keys:
+                    if key in fetched:
+                        self.set(key, fetched[key])
+                    else:
+                        # Gone upstream; stop serving it
+                        self.invalidate(key)
+            except Exception as e:
+                # Keep serving the stale value until it ages out
+                self.refresh_errors += 1
+                logger.warning(f"Background refresh of {self.name} cache failed: {str(e)}")
+            finally:
+                self._refreshing.difference_update(keys)
+        
+        task = asyncio.create_task(refresh())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return cache usage statistics"""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "enabled": settings.CACHE_ENABLED,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "refresh_errors": self.refresh_errors,
+            "evictions": self.evictions
+        }
+
+user_cache = TTLCache("users", settings.CACHE_MAX_ENTRIES, settings.USER_CACHE_TTL, settings.CACHE_STALE_TTL)
+book_cache = TTLCache("books", settings.CACHE_MAX_ENTRIES, settings.BOOK_CACHE_TTL, settings.CACHE_STALE_TTL)
@@ -0,0 +1,95 @@
+import httpx
+from typing import Dict, Any
+from app.config.settings import settings
+from app.core.logging import logger
+
+class PooledHTTPClient:
+    """Long-lived keep-alive HTTP client for a single downstream service"""
+    def __init__(self, name: str, base_url: str, timeout: float):
+        self.name = name
+        self.base_url = base_url
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(
+                timeout,
+                connect=settings.SERVICE_CONNECT_TIMEOUT,
+                pool=settings.HTTP_POOL_ACQUIRE_TIMEOUT
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=settings.HTTP_POOL_KEEPALIVE_EXPIRY
+            ),
+            http2=settings.HTTP2_ENABLED
+        )
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.total_requests = 0
+        self.failed_requests = 0
+    
+    async def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """Send a request over the shared connection pool"""
+        self.in_flight += 1
+        self.total_requests += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return await self.client.request(method, path, **kwargs)
+        except Exception:
+            self.failed_requests += 1
+            raise
+        finally:
+            self.in_flight -= 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return pool usage statistics"""
+        # httpx does not expose its transport publicly; fall back gracefully
+        pool = getattr(getattr(self.client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        return {
+            "base_url": self.base_url,
+            "http2": settings.HTTP2_ENABLED,
+            "max_connections": settings.HTTP_POOL_MAX_CONNECTIONS,
+            "max_keepalive_connections": settings.HTTP_POOL_MAX_KEEPALIVE,
+            "open_connections": len(connections),
+            "idle_connections": sum(1 for c in connections if c.is_idle()),
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "total_requests": self.total_requests,
+            "failed_requests": self.failed_requests,
+            "closed": self.client.is_closed
+        }
+    
+    async def close(self) -> None:
+        await self.client.aclose()
+
+class HTTPClientPool:
+    """Registry of pooled clients, one per downstream service"""
+    def __init__(self):
+        self._clients: Dict[str, PooledHTTPClient] = {}
+    
+    def get(self, name: str, base_url: str, timeout: float) -> PooledHTTPClient:
+        """Get the pooled client for a service, creating it on first use"""
+        client = self._clients.get(name)
+        if client is None or client.client.is_closed:
+            logger.info(f"Opening HTTP connection pool for {name} at {base_url}")
+            client = PooledHTTPClient(name, base_url, timeout)
+            self._clients[name] = client
+        return client
+    
+    async def startup(self) -> None:
+        """Open pools for all downstream services"""
+        self.get("User Service", settings.USER_SERVICE_URL, settings.SERVICE_TIMEOUT)
+        self.get("Book Service", settings.BOOK_SERVICE_URL, settings.SERVICE_TIMEOUT)
+    
+    async def shutdown(self) -> None:
+        """Close all pooled connections"""
+        for name, client in self._clients.items():
+            await client.close()
+            logger.info(f"Closed HTTP connection pool for {name}")
+        self._clients.clear()
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return usage statistics for every pool"""
+        return {name: client.stats() for name, client in self._clients.items()}
+
+http_pool = HTTPClientPool()
@@ -0,0 +1,148 @@
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+from app.config.settings import settings
+from app.core.logging import logger
+
+class CircuitBreaker:
+    """Closed / open / half-open circuit breaker for one downstream service"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_started_at: Optional[float] = None
+        self.times_opened = 0
+        self.rejected = 0
+    
+    def allow_request(self) -> bool:
+        """Whether a request may be sent right now"""
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            if now - self.opened_at < settings.CIRCUIT_RECOVERY_TIMEOUT:
+                self.rejected += 1
+                return False
+            self.state = self.HALF_OPEN
+            self.probe_started_at = None
+            logger.info(f"Circuit for {self.name} is half-open, probing")
+        
+        if self.state == self.HALF_OPEN:
+            # Let a single probe through; a probe that never reported back expires
+            if (
+                self.probe_started_at is not None
+                and now - self.probe_started_at < settings.CIRCUIT_RECOVERY_TIMEOUT
+            ):
+                self.rejected += 1
+                return False
+            self.probe_started_at = now
+        
+        return True
+    
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit for {self.name} closed")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.probe_started_at = None
+    
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= settings.CIRCUIT_FAILURE_THRESHOLD:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+                logger.warning(f"Circuit for {self.name} opened after {self.consecutive_failures} failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.probe_started_at = None
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected
+        }
+
+class RetryBudget:
+    """Token bucket that caps retries and hedges to a fraction of regular traffic"""
+    def __init__(self):
+        self.tokens = float(settings.RETRY_BUDGET_MIN_TOKENS)
+        self.retries = 0
+        self.exhausted = 0
+    
+    def record_request(self) -> None:
+        self.tokens = min(settings.RETRY_BUDGET_MAX_TOKENS, self.tokens + settings.RETRY_BUDGET_RATIO)
+    
+    def try_spend(self) -> bool:
+        """Take one token for a retry or hedge, if the budget allows it"""
+        if self.tokens < 1:
+            self.exhausted += 1
+            return False
+        self.tokens -= 1
+        self.retries += 1
+        return True
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tokens": round(self.tokens, 2),
+            "retries": self.retries,
+            "exhausted": self.exhausted
+        }
+
+class LatencyTracker:
+    """Rolling window of successful request latencies, used to time hedges"""
+    def __init__(self, window: int = 200):
+        self.samples: Deque[float] = deque(maxlen=window)
+    
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+    
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+    
+    def hedge_delay(self) -> Optional[float]:
+        """p95 latency, or None until enough samples have been seen"""
+        if len(self.samples) < settings.HEDGE_MIN_SAMPLES:
+            return None
+        return max(settings.HEDGE_MIN_DELAY, self.percentile(0.95))
+
+class ServiceGuard:
+    """Resilience state for one downstream service"""
+    def __init__(self, name: str):
+        self.name = name
+        self.breaker = CircuitBreaker(name)
+        self.budget = RetryBudget()
+        self.latency = LatencyTracker()
+    
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.latency.percentile(0.95)
+        return {
+            "circuit": self.breaker.stats(),
+            "retry_budget": self.budget.stats(),
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "hedging": settings.HEDGING_ENABLED
+        }
+
+class ResilienceRegistry:
+    """Registry of guards, one per downstream service"""
+    def __init__(self):
+        self._guards: Dict[str, ServiceGuard] = {}
+    
+    def get(self, name: str) -> ServiceGuard:
+        guard = self._guards.get(name)
+        if guard is None:
+            guard = ServiceGuard(name)
+            self._guards[name] = guard
+        return guard
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: guard.stats() for name, guard in self._guards.items()}
+
+resilience = ResilienceRegistry()
@@ -1,5 +1,6 @@
-from typing import Dict, Any
+from typing import Dict, Any, List
 from app.clients.base_client import BaseServiceClient
+from app.clients.cache import user_cache
 from app.config.settings import settings
 from app.core.exceptions import UserNotFoundException
 import httpx
@@ -8,7 +9,16 @@ class UserServiceClient(BaseServiceClient):
     def __init__(self):
         super().__init__(settings.USER_SERVICE_URL, settings.SERVICE_TIMEOUT)
     
-    async def get_user(self, user_id: int) -> Dict[str, Any]:
+    async def get_user(self, user_id: int, use_cache: bool = True) -> Dict[str, Any]:
+        """Get user details, served from cache unless use_cache is False"""
+        if use_cache:
+            return await user_cache.get_or_fetch(user_id, lambda: self._fetch_user(user_id))
+        
+        user = await self._fetch_user(user_id)
+        user_cache.set(user_id, user)
+        return user
+    
+    async def _fetch_user(self, user_id: int) -> Dict[str, Any]:
         """Get user details from User Service"""
         try:
             return await self._make_request(
@@ -21,6 +31,28 @@ class UserServiceClient(BaseServiceClient):
                 raise UserNotFoundException(user_id)
             raise
     
+    async def get_users(self, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Get several users, keyed by ID and served from cache where possible; missing IDs are omitted"""
+        return await user_cache.get_many_or_fetch(list(dict.fromkeys(user_ids)), self._fetch_users)
+    
+    async def _fetch_users(self, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Get several users from User Service in chunks"""
+        unique_ids = list(dict.fromkeys(user_ids))
+        users: Dict[int, Dict[str, Any]] = {}
+        
+        for start in range(0, len(unique_ids), settings.BATCH_LOOKUP_SIZE):
+            chunk = unique_ids[start:start + settings.BATCH_LOOKUP_SIZE]
+            response = await self._make_request(
+                method="GET",
+                path="/api/users/batch",
+                service_name="User Service",
+                params={"ids": ",".join(str(user_id) for user_id in chunk)}
+            )
+            for user in response.get("users", []):
+                users[user["id"]] = user
+        
+        return users
+    
     async def check_health(self) -> bool:
         """Check User Service health"""
         try:
@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
 from typing import Optional
+from library_common.serialization import FastJSONResponse
 from app.config.database import get_db
 from app.services.loan_service import LoanService
+from app.services.loan_export import MEDIA_TYPES, accepts_gzip, stream_loan_export
 from app.schemas.loan import (
     LoanCreate, LoanReturn, LoanExtend, LoanResponse,
-    LoanWithDetailsResponse, UserLoansResponse, LoanListResponse
+    LoanWithDetailsResponse, UserLoansResponse, LoanListResponse,
+    LoanDetailsListResponse, ExportFormat, LoanCheckout, LoanCheckoutResponse,
+    LoanBatchReturn, LoanBatchReturnResponse, UserLoansExtendResponse
 )
 from app.models.loan import LoanStatus
 from app.core.exceptions import LoanServiceException
@@ -16,7 +22,7 @@ router = APIRouter(prefix="/api/loans", tags=["loans"])
 @router.post("", response_model=LoanResponse, status_code=status.HTTP_201_CREATED)
 async def create_loan(
     loan_data: LoanCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> LoanResponse:
     """Create a new loan"""
     try:
@@ -28,10 +34,25 @@ async def create_loan(
         logger.error(f"Unexpected error creating loan: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.post("/checkout", response_model=LoanCheckoutResponse)
+async def checkout(
+    checkout_data: LoanCheckout,
+    db: AsyncSession = Depends(get_db)
+) -> LoanCheckoutResponse:
+    """Lend several books to one user at once, reporting which could not be lent"""
+    try:
+        service = LoanService(db)
+        return await service.checkout(checkout_data)
+    except LoanServiceException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        logger.error(f"Unexpected error checking out books: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @router.post("/returns", response_model=LoanResponse)
 async def return_loan(
     return_data: LoanReturn,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> LoanResponse:
     """Return a loan"""
     try:
@@ -43,11 +64,26 @@ async def return_loan(
         logger.error(f"Unexpected error returning loan: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.post("/returns/batch", response_model=LoanBatchReturnResponse)
+async def return_loans(
+    return_data: LoanBatchReturn,
+    db: AsyncSession = Depends(get_db)
+) -> LoanBatchReturnResponse:
+    """Return many loans at once, reporting ids that were unknown or already returned"""
+    try:
+        service = LoanService(db)
+        return await service.return_loans(return_data.loan_ids)
+    except LoanServiceException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        logger.error(f"Unexpected error returning loans: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @router.put("/{loan_id}/extend", response_model=LoanResponse)
 async def extend_loan(
     loan_id: int,
     extend_data: LoanExtend,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> LoanResponse:
     """Extend a loan"""
     try:
@@ -59,15 +95,87 @@ async def extend_loan(
         logger.error(f"Unexpected error extending loan {loan_id}: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.get("/overdue", response_model=list[LoanResponse])
+async def get_overdue_loans(
+    db: AsyncSession = Depends(get_db)
+) -> FastJSONResponse:
+    """Get all overdue loans"""
+    try:
+        service = LoanService(db)
+        return FastJSONResponse(await service.get_overdue_loans())
+    except Exception as e:
+        logger.error(f"Unexpected error fetching overdue loans: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.get("/overdue/details", response_model=list[LoanWithDetailsResponse])
+async def get_overdue_loans_with_details(
+    db: AsyncSession = Depends(get_db)
+) -> FastJSONResponse:
+    """Get all overdue loans with borrower and book details"""
+    try:
+        service = LoanService(db)
+        return FastJSONResponse(await service.get_overdue_loans_with_details())
+    except Exception as e:
+        logger.error(f"Unexpected error fetching overdue loan details: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.get("/details", response_model=LoanDetailsListResponse)
+async def list_loans_with_details(
+    page: int = Query(1, ge=1),
+    per_page: int = Query(10, ge=1, le=100),
+    status: Optional[LoanStatus] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page; replaces page"),
+    exact_total: bool = Query(False, description="Always count exactly instead of estimating large totals"),
+    db: AsyncSession = Depends(get_db)
+) -> FastJSONResponse:
+    """List loans with pagination, including user and book details"""
+    try:
+        service = LoanService(db)
+        result = await service.list_loans_with_details(page, per_page, status, cursor, exact_total)
+        
+        return FastJSONResponse(LoanDetailsListResponse.model_construct(
+            loans=result.items,
+            total=result.total,
+            page=page if cursor is None else None,
+            per_page=per_page,
+            next_cursor=result.next_cursor,
+            total_exact=result.total_exact
+        ))
+    except LoanServiceException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        logger.error(f"Unexpected error listing loans with details: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_loans(
+    request: Request,
+    format: ExportFormat = Query(ExportFormat.NDJSON),
+    since: Optional[datetime] = Query(None, description="Only loans updated at or after this time"),
+) -> StreamingResponse:
+    """Stream every loan, in order of last update, gzipped when the client accepts it"""
+    compress = accepts_gzip(request.headers.get("accept-encoding", ""))
+    headers = {
+        "Content-Disposition": f'attachment; filename="loans.{format.value}"',
+        "Vary": "Accept-Encoding"
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        stream_loan_export(format, since, compress),
+        media_type=MEDIA_TYPES[format],
+        headers=headers
+    )
+
 @router.get("/{loan_id}", response_model=LoanWithDetailsResponse)
 async def get_loan(
     loan_id: int,
-    db: Session = Depends(get_db)
-) -> LoanWithDetailsResponse:
+    db: AsyncSession = Depends(get_db)
+) -> FastJSONResponse:
     """Get loan details"""
     try:
         service = LoanService(db)
-        return await service.get_loan_with_details(loan_id)
+        return FastJSONResponse(await service.get_loan_with_details(loan_id))
     except LoanServiceException as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
@@ -77,49 +185,58 @@ async def get_loan(
 @router.get("/user/{user_id}", response_model=UserLoansResponse)
 async def get_user_loans(
     user_id: int,
-    db: Session = Depends(get_db)
-) -> UserLoansResponse:
+    db: AsyncSession = Depends(get_db)
+) -> FastJSONResponse:
     """Get loans for a user"""
     try:
         service = LoanService(db)
         loans = await service.get_user_loans(user_id)
-        return UserLoansResponse(loans=loans, total=len(loans))
+        return FastJSONResponse(UserLoansResponse.model_construct(loans=loans, total=len(loans)))
     except LoanServiceException as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
         logger.error(f"Unexpected error fetching loans for user {user_id}: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.put("/user/{user_id}/extend", response_model=UserLoansExtendResponse)
+async def extend_user_loans(
+    user_id: int,
+    db: AsyncSession = Depends(get_db)
+) -> UserLoansExtendResponse:
+    """Extend all of a user's active loans that have extensions left"""
+    try:
+        service = LoanService(db)
+        return await service.extend_user_loans(user_id)
+    except LoanServiceException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        logger.error(f"Unexpected error extending loans for user {user_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @router.get("", response_model=LoanListResponse)
 async def list_loans(
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=100),
     status: Optional[LoanStatus] = Query(None),
-    db: Session = Depends(get_db)
-) -> LoanListResponse:
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page; replaces page"),
+    exact_total: bool = Query(False, description="Always count exactly instead of estimating large totals"),
+    db: AsyncSession = Depends(get_db)
+) -> FastJSONResponse:
     """List loans with pagination"""
     try:
         service = LoanService(db)
-        loans, total = service.list_loans(page, per_page, status)
+        result = await service.list_loans(page, per_page, status, cursor, exact_total)
         
-        return LoanListResponse(
-            loans=loans,
-            total=total,
-            page=page,
-            per_page=per_page
-        )
+        return FastJSONResponse(LoanListResponse.model_construct(
+            loans=result.items,
+            total=result.total,
+            page=page if cursor is None else None,
+            per_page=per_page,
+            next_cursor=result.next_cursor,
+            total_exact=result.total_exact
+        ))
+    except LoanServiceException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
         logger.error(f"Unexpected error listing loans: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
-
-@router.get("/overdue", response_model=list[LoanResponse])
-async def get_overdue_loans(
-    db: Session = Depends(get_db)
-) -> list[LoanResponse]:
-    """Get all overdue loans"""
-    try:
-        service = LoanService(db)
-        return service.get_overdue_loans()
-    except Exception as e:
-        logger.error(f"Unexpected error fetching overdue loans: {str(e)}")
-        raise HTTPException(status_code=500, detail="Internal server error")
@@ -0,0 +1,28 @@
+import asyncio
+import time
+from typing import Any, Awaitable, List, TypeVar
+from app.core.logging import logger
+
+T = TypeVar("T")
+
+async def timed(label: str, awaitable: Awaitable[T]) -> T:
+    """Await a call and log how long it took"""
+    start = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        logger.info(f"{label} took {(time.perf_counter() - start) * 1000:.1f}ms")
+
+async def fan_out(label: str, *awaitables: Awaitable[Any]) -> List[Any]:
+    """Run independent calls concurrently, cancelling the rest if one fails"""
+    start = time.perf_counter()
+    tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        logger.info(f"{label} critical path took {(time.perf_counter() - start) * 1000:.1f}ms")
@@ -8,6 +8,15 @@ class LoanServiceException(Exception):
         self.details = details or {}
         super().__init__(self.message)
 
+class InvalidLoanDataException(LoanServiceException):
+    """Raised when loan request data is invalid"""
+    def __init__(self, details: Dict[str, Any]):
+        super().__init__(
+            message="Invalid loan data provided",
+            status_code=400,
+            details=details
+        )
+
 class LoanNotFoundException(LoanServiceException):
     """Raised when loan is not found"""
     def __init__(self, loan_id: int):
@@ -3,26 +3,49 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 from datetime import datetime
-from sqlalchemy import text
+from sqlalchemy import inspect, text
 
 from app.config.settings import settings
-from app.config.database import engine, get_db
+from app.config.database import engine, async_engine, session_scope
 from app.models.loan import Base
+from app.models.outbox import OutboxEntry
+from app.models.job_run import JobRun
 from app.controllers.loan_controller import router as loan_router
 from app.schemas.loan import HealthResponse
 from app.clients.user_client import UserServiceClient
 from app.clients.book_client import BookServiceClient
+from app.clients.http_pool import http_pool
+from app.clients.cache import user_cache, book_cache
+from app.clients.resilience import resilience
+from app.repositories.outbox_repository import OutboxRepository
+from app.services.outbox_dispatcher import outbox_dispatcher
+from app.services.overdue_sweeper import overdue_sweeper
+from app.repositories.job_run_repository import JobRunRepository
 from app.core.logging import logger
 
 # Create database tables
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info(f"Starting {settings.SERVICE_NAME}")
-    # Create tables
-    Base.metadata.create_all(bind=engine)
-    logger.info("Database tables created")
+    # Create tables, unless the schema is managed by migrations
+    if inspect(engine).has_table("alembic_version"):
+        logger.info("Database schema managed by migrations; not creating tables")
+    else:
+        Base.metadata.create_all(bind=engine)
+        logger.info("Database tables created")
+    # Open shared outbound connection pools
+    await http_pool.startup()
+    # Deliver queued book availability operations in the background
+    await outbox_dispatcher.start()
+    # Keep loan statuses current so the overdue endpoints stay read-only
+    await overdue_sweeper.start()
     yield
     logger.info(f"Shutting down {settings.SERVICE_NAME}")
+    await overdue_sweeper.stop()
+    await outbox_dispatcher.stop()
+    await http_pool.shutdown()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 # Create FastAPI app
 app = FastAPI(
@@ -58,16 +81,19 @@ app.include_router(loan_router)
 async def health_check():
     """Health check endpoint"""
     # Check database
+    outbox = outbox_dispatcher.stats()
+    sweeper = overdue_sweeper.stats()
     try:
-        db = next(get_db())
-        db.execute(text("SELECT 1"))
+        async with session_scope() as db:
+            await db.execute(text("SELECT 1"))
+            outbox["entries"] = await OutboxRepository(db).count_by_status()
+            last_run = await JobRunRepository(db).get(overdue_sweeper.JOB_NAME)
+            if last_run is not None:
+                sweeper["last_run_at"] = last_run.finished_at
         db_status = "healthy"
     except Exception as e:
         logger.error(f"Database health check failed: {str(e)}")
         db_status = "unhealthy"
-    finally:
-        if 'db' in locals():
-            db.close()
     
     # Check external services
     user_client = UserServiceClient()
@@ -89,6 +115,11 @@ async def health_check():
         database=db_status,
         user_service=user_service_status,
         book_service=book_service_status,
+        http_pools=http_pool.stats(),
+        resilience=resilience.stats(),
+        caches={"users": user_cache.stats(), "books": book_cache.stats()},
+        outbox=outbox,
+        overdue_sweeper=sweeper,
         timestamp=datetime.utcnow()
     )
 
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from app.config.database import Base
+
+class JobRun(Base):
+    """Outcome of the most recent run of a background job"""
+    __tablename__ = "job_runs"
+    
+    name = Column(String(100), primary_key=True)
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    processed = Column(Integer, nullable=False, default=0)
+    error = Column(String(500), nullable=True)
+    
+    def __repr__(self):
+        return f"<JobRun(name={self.name}, finished_at={self.finished_at}, processed={self.processed})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, Enum, ForeignKey
+from sqlalchemy import Column, Integer, DateTime, Enum, Index, text
 from sqlalchemy.sql import func
 from app.config.database import Base
 import enum
@@ -13,7 +13,7 @@ class Loan(Base):
     __tablename__ = "loans"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, nullable=False, index=True)
+    user_id = Column(Integer, nullable=False)
     book_id = Column(Integer, nullable=False, index=True)
     issue_date = Column(DateTime(timezone=True), server_default=func.now())
     due_date = Column(DateTime(timezone=True), nullable=False)
@@ -23,5 +23,25 @@ class Loan(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
+    # Matched to the hot queries; managed by migrations/versions/0003_loan_access_path_indexes.py
+    __table_args__ = (
+        # At most one outstanding loan per user and book (get_active_loan, create_loan)
+        Index(
+            "uq_loans_outstanding_user_book", "user_id", "book_id",
+            unique=True,
+            postgresql_where=text("status IN ('ACTIVE', 'OVERDUE')"),
+            sqlite_where=text("status IN ('ACTIVE', 'OVERDUE')")
+        ),
+        # get_user_loans: WHERE user_id = ? ORDER BY issue_date DESC
+        Index("ix_loans_user_id_issue_date", "user_id", "issue_date"),
+        # Overdue reads and the overdue sweeper: status = ? AND due_date < now
+        Index("ix_loans_status_due_date", "status", "due_date"),
+        # list_all, newest first, optionally filtered by status, with (issue_date, id) cursors
+        Index("ix_loans_issue_date_id", "issue_date", "id"),
+        Index("ix_loans_status_issue_date_id", "status", "issue_date", "id"),
+        # Export, in change order from an optional since (migrations/versions/0004_loan_export_index.py)
+        Index("ix_loans_updated_at_id", "updated_at", "id"),
+    )
+    
     def __repr__(self):
         return f"<Loan(id={self.id}, user_id={self.user_id}, book_id={self.book_id}, status={self.status})>"
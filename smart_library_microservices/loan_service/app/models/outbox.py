@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, String, DateTime, Enum, Index
+from sqlalchemy.sql import func
+from app.config.database import Base
+import enum
+
+class OutboxStatus(str, enum.Enum):
+    PENDING = "PENDING"
+    DELIVERED = "DELIVERED"
+    FAILED = "FAILED"
+
+class OutboxEntry(Base):
+    """Book availability operation written in the same transaction as the loan change that caused it"""
+    __tablename__ = "outbox_entries"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    idempotency_key = Column(String(64), unique=True, nullable=False)
+    # The first loan when the entry covers several returns of one book
+    loan_id = Column(Integer, nullable=False, index=True)
+    book_id = Column(Integer, nullable=False)
+    operation = Column(String(20), nullable=False)
+    quantity = Column(Integer, nullable=False, default=1, server_default="1")
+    status = Column(Enum(OutboxStatus), nullable=False, default=OutboxStatus.PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False)
+    last_error = Column(String(500), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    delivered_at = Column(DateTime(timezone=True), nullable=True)
+    
+    __table_args__ = (
+        Index("ix_outbox_entries_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+    
+    def __repr__(self):
+        return f"<OutboxEntry(id={self.id}, loan_id={self.loan_id}, operation={self.operation}, status={self.status})>"
@@ -0,0 +1,32 @@
+from typing import Optional
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.job_run import JobRun
+
+class JobRunRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def get(self, name: str) -> Optional[JobRun]:
+        """Get the last recorded run of a job"""
+        return await self.db.get(JobRun, name)
+    
+    async def record(
+        self,
+        name: str,
+        started_at: datetime,
+        finished_at: datetime,
+        processed: int,
+        error: Optional[str] = None
+    ) -> JobRun:
+        """Record the outcome of a job run, replacing the previous one"""
+        run = await self.get(name)
+        if run is None:
+            run = JobRun(name=name)
+            self.db.add(run)
+        run.started_at = started_at
+        run.finished_at = finished_at
+        run.processed = processed
+        run.error = error[:500] if error else None
+        await self.db.commit()
+        return run
@@ -1,16 +1,18 @@
-from typing import Optional, List, Tuple
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
-from datetime import datetime
+from typing import Optional, List, Set, Tuple, AsyncIterator, Sequence, Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, and_, or_, select, update, tuple_, literal
+from datetime import datetime, timedelta, timezone
+from library_common.pagination import Page, encode_cursor, decode_cursor, split_page, fetch_offset_page
 from app.models.loan import Loan, LoanStatus
 from app.schemas.loan import LoanCreate
+from app.config.settings import settings
 
 class LoanRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
-    def create(self, loan_data: LoanCreate) -> Loan:
-        """Create a new loan"""
+    async def create(self, loan_data: LoanCreate, commit: bool = True) -> Loan:
+        """Create a new loan; with commit=False it is only flushed so it gets an id"""
         loan = Loan(
             user_id=loan_data.user_id,
             book_id=loan_data.book_id,
@@ -18,78 +20,249 @@ class LoanRepository:
             status=LoanStatus.ACTIVE
         )
         self.db.add(loan)
-        self.db.commit()
-        self.db.refresh(loan)
+        if not commit:
+            await self.db.flush()
+            return loan
+        await self.db.commit()
+        await self.db.refresh(loan)
         return loan
     
-    def get_by_id(self, loan_id: int) -> Optional[Loan]:
+    async def create_many(self, user_id: int, book_ids: List[int], due_date: datetime) -> List[Loan]:
+        """Add one loan per book for a user and flush them in one round trip; the caller commits"""
+        loans = [
+            Loan(user_id=user_id, book_id=book_id, due_date=due_date, status=LoanStatus.ACTIVE)
+            for book_id in book_ids
+        ]
+        self.db.add_all(loans)
+        await self.db.flush()
+        return loans
+    
+    async def get_by_id(self, loan_id: int) -> Optional[Loan]:
         """Get loan by ID"""
-        return self.db.query(Loan).filter(Loan.id == loan_id).first()
-    
-    def get_active_loan(self, user_id: int, book_id: int) -> Optional[Loan]:
-        """Get active loan for user and book"""
-        return self.db.query(Loan).filter(
-            and_(
-                Loan.user_id == user_id,
-                Loan.book_id == book_id,
-                Loan.status == LoanStatus.ACTIVE
+        return await self.db.get(Loan, loan_id)
+    
+    async def get_active_loan(self, user_id: int, book_id: int) -> Optional[Loan]:
+        """Get the outstanding (active or overdue) loan for user and book"""
+        result = await self.db.execute(
+            select(Loan).where(
+                and_(
+                    Loan.user_id == user_id,
+                    Loan.book_id == book_id,
+                    Loan.status.in_([LoanStatus.ACTIVE, LoanStatus.OVERDUE])
+                )
+            ).limit(1)
+        )
+        return result.scalars().first()
+    
+    async def get_active_book_ids(self, user_id: int, book_ids: List[int]) -> Set[int]:
+        """Which of the books the user has an outstanding (active or overdue) loan for"""
+        if not book_ids:
+            return set()
+        result = await self.db.execute(
+            select(Loan.book_id).where(
+                and_(
+                    Loan.user_id == user_id,
+                    Loan.book_id.in_(book_ids),
+                    Loan.status.in_([LoanStatus.ACTIVE, LoanStatus.OVERDUE])
+                )
             )
-        ).first()
+        )
+        return set(result.scalars().all())
     
-    def update(self, loan: Loan) -> Loan:
+    async def update(self, loan: Loan) -> Loan:
         """Update loan"""
-        self.db.commit()
-        self.db.refresh(loan)
+        await self.db.commit()
+        await self.db.refresh(loan)
         return loan
     
-    def get_user_loans(self, user_id: int, active_only: bool = False) -> List[Loan]:
+    async def get_existing_ids(self, loan_ids: List[int]) -> Set[int]:
+        """Which of the loan ids exist"""
+        if not loan_ids:
+            return set()
+        result = await self.db.execute(select(Loan.id).where(Loan.id.in_(loan_ids)))
+        return set(result.scalars().all())
+    
+    async def return_many(self, loan_ids: List[int], return_date: datetime) -> List[Tuple[int, int]]:
+        """Mark the outstanding (active or overdue) loans among loan_ids returned in one UPDATE,
+        returning (id, book id) of those it changed; the caller commits"""
+        result = await self.db.execute(
+            update(Loan)
+            .where(
+                and_(
+                    Loan.id.in_(loan_ids),
+                    Loan.status.in_([LoanStatus.ACTIVE, LoanStatus.OVERDUE])
+                )
+            )
+            .values(status=LoanStatus.RETURNED, return_date=return_date)
+            .returning(Loan.id, Loan.book_id)
+            .execution_options(synchronize_session=False)
+        )
+        return [(row.id, row.book_id) for row in result.all()]
+    
+    async def extend_active_loans(self, user_id: int, extension_days: int, max_extensions: int) -> List[int]:
+        """Push back the due date of every active loan of a user with extensions left in one UPDATE,
+        in its own transaction; returns the ids extended"""
+        if self.db.get_bind().dialect.name == "sqlite":
+            # SQLite stores datetimes as text and has no interval arithmetic; shift the whole seconds
+            # and carry over the stored microseconds, which strftime would round to milliseconds
+            due_date = func.strftime("%Y-%m-%d %H:%M:%S", Loan.due_date, f"+{extension_days} days").concat(
+                func.substr(Loan.due_date, 20)
+            )
+        else:
+            due_date = Loan.due_date + timedelta(days=extension_days)
+        result = await self.db.execute(
+            update(Loan)
+            .where(
+                and_(
+                    Loan.user_id == user_id,
+                    Loan.status == LoanStatus.ACTIVE,
+                    Loan.extensions_count < max_extensions
+                )
+            )
+            .values(due_date=due_date, extensions_count=Loan.extensions_count + 1)
+            .returning(Loan.id)
+            .execution_options(synchronize_session=False)
+        )
+        loan_ids = list(result.scalars().all())
+        await self.db.commit()
+        return loan_ids
+    
+    async def commit(self) -> None:
+        """Commit changes made with commit=False"""
+        await self.db.commit()
+    
+    async def update_many(self, loans: List[Loan]) -> List[Loan]:
+        """Commit and reload several loans with one query"""
+        await self.db.commit()
+        if loans:
+            result = await self.db.execute(
+                select(Loan)
+                .where(Loan.id.in_([loan.id for loan in loans]))
+                .execution_options(populate_existing=True)
+            )
+            # Loading the rows refreshes the instances in place
+            result.scalars().all()
+        return loans
+    
+    async def rollback(self) -> None:
+        """Discard changes made with commit=False"""
+        await self.db.rollback()
+    
+    async def delete(self, loan: Loan) -> None:
+        """Delete loan"""
+        await self.db.delete(loan)
+        await self.db.commit()
+    
+    async def delete_many(self, loans: List[Loan]) -> None:
+        """Delete several loans in one transaction"""
+        for loan in loans:
+            await self.db.delete(loan)
+        await self.db.commit()
+    
+    async def get_user_loans(self, user_id: int, active_only: bool = False) -> List[Loan]:
         """Get loans for a user"""
-        query = self.db.query(Loan).filter(Loan.user_id == user_id)
+        query = select(Loan).where(Loan.user_id == user_id)
         if active_only:
-            query = query.filter(Loan.status == LoanStatus.ACTIVE)
-        return query.order_by(Loan.issue_date.desc()).all()
+            query = query.where(Loan.status == LoanStatus.ACTIVE)
+        result = await self.db.execute(query.order_by(Loan.issue_date.desc()))
+        return list(result.scalars().all())
     
-    def get_book_loans(self, book_id: int, active_only: bool = False) -> List[Loan]:
+    async def get_book_loans(self, book_id: int, active_only: bool = False) -> List[Loan]:
         """Get loans for a book"""
-        query = self.db.query(Loan).filter(Loan.book_id == book_id)
+        query = select(Loan).where(Loan.book_id == book_id)
         if active_only:
-            query = query.filter(Loan.status == LoanStatus.ACTIVE)
-        return query.order_by(Loan.issue_date.desc()).all()
+            query = query.where(Loan.status == LoanStatus.ACTIVE)
+        result = await self.db.execute(query.order_by(Loan.issue_date.desc()))
+        return list(result.scalars().all())
     
-    def get_overdue_loans(self) -> List[Loan]:
-        """Get all overdue loans"""
+    async def get_overdue_loans(self) -> List[Loan]:
+        """Get all overdue loans, including ones past due that the sweeper has not marked yet"""
         now = datetime.utcnow()
-        return self.db.query(Loan).filter(
-            and_(
-                Loan.status == LoanStatus.ACTIVE,
-                Loan.due_date < now
-            )
-        ).all()
+        result = await self.db.execute(
+            select(Loan).where(
+                or_(
+                    Loan.status == LoanStatus.OVERDUE,
+                    and_(
+                        Loan.status == LoanStatus.ACTIVE,
+                        Loan.due_date < now
+                    )
+                )
+            ).order_by(Loan.due_date)
+        )
+        return list(result.scalars().all())
     
-    def list_all(self, page: int, per_page: int, status: Optional[LoanStatus] = None) -> Tuple[List[Loan], int]:
-        """List loans with pagination"""
-        query = self.db.query(Loan)
+    async def list_all(
+        self,
+        page: int,
+        per_page: int,
+        status: Optional[LoanStatus] = None,
+        cursor: Optional[str] = None,
+        exact_total: bool = False
+    ) -> Page:
+        """List loans newest first, by page number or after a cursor (which skips the total count)"""
+        query = select(Loan)
         
         if status:
-            query = query.filter(Loan.status == status)
+            query = query.where(Loan.status == status)
+        query = query.order_by(Loan.issue_date.desc(), Loan.id.desc())
+        
+        total, total_exact = None, True
+        if cursor is None:
+            rows, total, total_exact = await fetch_offset_page(
+                self.db, query, page, per_page,
+                # Without a status filter the total is the table size, which may be estimated
+                estimate_table=Loan.__tablename__ if not status and not exact_total else None,
+                estimate_threshold=settings.COUNT_ESTIMATE_THRESHOLD,
+                count_cap=settings.COUNT_CAP if status and not exact_total else None
+            )
+        else:
+            # Seek past the last row instead of counting through the skipped ones
+            issue_date, loan_id = decode_cursor(cursor, datetime.fromisoformat, int)
+            if self.db.get_bind().dialect.name == "sqlite":
+                # SQLite stores CURRENT_TIMESTAMP defaults as text without fractional seconds
+                issue_date = literal(issue_date.isoformat(sep=" "))
+            query = query.where(tuple_(Loan.issue_date, Loan.id) < tuple_(issue_date, loan_id))
+            rows = (await self.db.execute(query.limit(per_page + 1))).scalars().all()
+        
+        loans, has_more = split_page(rows, per_page)
+        next_cursor = encode_cursor(loans[-1].issue_date.isoformat(), loans[-1].id) if has_more else None
         
-        total = query.count()
-        loans = query.order_by(Loan.issue_date.desc()).offset((page - 1) * per_page).limit(per_page).all()
+        return Page(loans, total, next_cursor, total_exact)
+    
+    async def stream_for_export(self, since: Optional[datetime], chunk_size: int) -> AsyncIterator[Sequence[Any]]:
+        """Loan rows in (updated_at, id) order, optionally from since on, chunk_size at a time
+        through a server-side cursor"""
+        query = (
+            select(*Loan.__table__.columns)
+            .order_by(Loan.updated_at, Loan.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        if since is not None:
+            if self.db.get_bind().dialect.name == "sqlite":
+                # SQLite stores CURRENT_TIMESTAMP defaults as naive UTC text without fractional seconds
+                if since.tzinfo is not None:
+                    since = since.astimezone(timezone.utc).replace(tzinfo=None)
+                since = literal(since.isoformat(sep=" "))
+            query = query.where(Loan.updated_at >= since)
         
-        return loans, total
+        result = await self.db.stream(query)
+        async for partition in result.partitions():
+            yield partition
     
-    def count_active_loans(self) -> int:
+    async def count_active_loans(self) -> int:
         """Count active loans"""
-        return self.db.query(func.count(Loan.id)).filter(Loan.status == LoanStatus.ACTIVE).scalar()
+        return await self.db.scalar(select(func.count(Loan.id)).where(Loan.status == LoanStatus.ACTIVE))
     
-    def update_overdue_status(self) -> int:
-        """Update status of overdue loans"""
-        now = datetime.utcnow()
-        result = self.db.query(Loan).filter(
-            and_(
-                Loan.status == LoanStatus.ACTIVE,
-                Loan.due_date < now
-            )
-        ).update({Loan.status: LoanStatus.OVERDUE})
-        self.db.commit()
-        return result
+    async def mark_overdue_chunk(self, now: datetime, limit: int) -> int:
+        """Mark up to limit past-due active loans as overdue, in its own transaction"""
+        past_due = and_(Loan.status == LoanStatus.ACTIVE, Loan.due_date < now)
+        # Marked loans leave the candidate set, so each chunk reads only the next ones off ix_loans_status_due_date
+        candidates = select(Loan.id).where(past_due).limit(limit).scalar_subquery()
+        result = await self.db.execute(
+            update(Loan)
+            .where(and_(Loan.id.in_(candidates), past_due))
+            .values(status=LoanStatus.OVERDUE)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        return result.rowcount
@@ -0,0 +1,117 @@
+import uuid
+from typing import Dict, List
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, case, delete, func, select, update
+from app.models.outbox import OutboxEntry, OutboxStatus
+
+class OutboxRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    def enqueue(
+        self, loan_id: int, book_id: int, operation: str, delay: float = 0.0, quantity: int = 1
+    ) -> OutboxEntry:
+        """Add an availability operation to the current transaction; the caller commits"""
+        entry = OutboxEntry(
+            idempotency_key=uuid.uuid4().hex,
+            loan_id=loan_id,
+            book_id=book_id,
+            operation=operation,
+            quantity=quantity,
+            status=OutboxStatus.PENDING,
+            attempts=0,
+            next_attempt_at=datetime.utcnow() + timedelta(seconds=delay)
+        )
+        self.db.add(entry)
+        return entry
+    
+    async def claim_due(self, limit: int, lease: float) -> List[OutboxEntry]:
+        """Take due entries and push their next attempt out by the lease, so other dispatchers skip them"""
+        now = datetime.utcnow()
+        result = await self.db.execute(
+            select(OutboxEntry)
+            .where(OutboxEntry.status == OutboxStatus.PENDING, OutboxEntry.next_attempt_at <= now)
+            .order_by(OutboxEntry.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        entries = list(result.scalars().all())
+        if entries:
+            await self.db.execute(
+                update(OutboxEntry)
+                .where(OutboxEntry.id.in_([entry.id for entry in entries]))
+                .values(next_attempt_at=now + timedelta(seconds=lease))
+                .execution_options(synchronize_session=False)
+            )
+        await self.db.commit()
+        return entries
+    
+    def mark_delivered(self, entry: OutboxEntry) -> None:
+        entry.status = OutboxStatus.DELIVERED
+        entry.attempts += 1
+        entry.delivered_at = datetime.utcnow()
+        entry.last_error = None
+    
+    def mark_failed(self, entry: OutboxEntry, error: str) -> None:
+        entry.status = OutboxStatus.FAILED
+        entry.attempts += 1
+        entry.last_error = error[:500]
+    
+    def mark_retry(self, entry: OutboxEntry, error: str, delay: float) -> None:
+        entry.attempts += 1
+        entry.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        entry.last_error = error[:500]
+    
+    async def withdraw_increment(self, book_id: int, loan_id: int) -> bool:
+        """Take one copy off a queued increment of the book that was never sent, preferring the loan's own;
+        returns False when there is none, e.g. because it was already delivered. The caller commits"""
+        now = datetime.utcnow()
+        unsent = and_(
+            OutboxEntry.book_id == book_id,
+            OutboxEntry.operation == "increment",
+            OutboxEntry.status == OutboxStatus.PENDING,
+            # A retried entry may have been applied with the answer lost, and a claimed one is in flight
+            OutboxEntry.attempts == 0,
+            OutboxEntry.next_attempt_at <= now
+        )
+        entry_id = await self.db.scalar(
+            select(OutboxEntry.id)
+            .where(unsent)
+            .order_by(case((OutboxEntry.loan_id == loan_id, 0), else_=1), OutboxEntry.id)
+            .limit(1)
+        )
+        if entry_id is None:
+            return False
+        # Checked again as it is updated, in case a dispatcher claimed the entry since
+        result = await self.db.execute(
+            update(OutboxEntry)
+            .where(OutboxEntry.id == entry_id, unsent)
+            .values(quantity=OutboxEntry.quantity - 1)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            return False
+        await self.db.execute(
+            delete(OutboxEntry)
+            .where(OutboxEntry.id == entry_id, OutboxEntry.quantity == 0)
+            .execution_options(synchronize_session=False)
+        )
+        return True
+    
+    async def discard(self, entry: OutboxEntry) -> None:
+        """Remove an entry whose operation was compensated for; the caller commits"""
+        await self.db.delete(entry)
+    
+    async def commit(self) -> None:
+        await self.db.commit()
+    
+    async def count_by_status(self) -> Dict[str, int]:
+        """Number of entries in each status"""
+        result = await self.db.execute(
+            select(OutboxEntry.status, func.count(OutboxEntry.id)).group_by(OutboxEntry.status)
+        )
+        counts = {status.value.lower(): 0 for status in OutboxStatus}
+        for status, count in result.all():
+            counts[status.value.lower()] = count
+        return counts
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime
+from enum import Enum
 from typing import Optional, List, Dict, Any
 from app.models.loan import LoanStatus
 
@@ -11,9 +12,17 @@ class LoanBase(BaseModel):
 class LoanCreate(LoanBase):
     pass
 
+class LoanCheckout(BaseModel):
+    user_id: int
+    book_ids: List[int] = Field(..., min_length=1)
+    due_date: datetime
+
 class LoanReturn(BaseModel):
     loan_id: int
 
+class LoanBatchReturn(BaseModel):
+    loan_ids: List[int] = Field(..., min_length=1)
+
 class LoanExtend(BaseModel):
     extension_days: Optional[int] = Field(7, ge=1, le=30)
 
@@ -43,15 +52,65 @@ class LoanWithDetailsResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+class UserLoansExtendResponse(BaseModel):
+    user_id: int
+    extension_days: int
+    extended: List[LoanResponse]
+    # Active loans left as they were because they have no extensions left
+    max_extensions_reached: List[LoanResponse]
+
 class UserLoansResponse(BaseModel):
     loans: List[LoanWithDetailsResponse]
     total: int
 
 class LoanListResponse(BaseModel):
     loans: List[LoanResponse]
-    total: int
-    page: int
+    # Not computed in cursor mode
+    total: Optional[int] = None
+    page: Optional[int] = None
     per_page: int
+    next_cursor: Optional[str] = None
+    # False when total is a planner estimate
+    total_exact: bool = True
+
+class LoanDetailsListResponse(BaseModel):
+    loans: List[LoanWithDetailsResponse]
+    # Not computed in cursor mode
+    total: Optional[int] = None
+    page: Optional[int] = None
+    per_page: int
+    next_cursor: Optional[str] = None
+    # False when total is a planner estimate
+    total_exact: bool = True
+
+class CheckoutItemStatus(str, Enum):
+    CREATED = "created"
+    NOT_FOUND = "not_found"
+    NOT_AVAILABLE = "not_available"
+    ALREADY_BORROWED = "already_borrowed"
+
+class CheckoutItemResult(BaseModel):
+    book_id: int
+    status: CheckoutItemStatus
+    loan: Optional[LoanResponse] = None
+    error: Optional[str] = None
+
+class LoanCheckoutResponse(BaseModel):
+    user_id: int
+    created: int
+    failed: int
+    # One per distinct book, in request order
+    results: List[CheckoutItemResult]
+
+class LoanBatchReturnResponse(BaseModel):
+    return_date: datetime
+    returned: List[int]
+    already_returned: List[int]
+    not_found: List[int]
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
 
 class HealthResponse(BaseModel):
     status: str
@@ -60,4 +119,9 @@ class HealthResponse(BaseModel):
     database: str
     user_service: str
     book_service: str
+    http_pools: Dict[str, Dict[str, Any]] = {}
+    resilience: Dict[str, Dict[str, Any]] = {}
+    caches: Dict[str, Dict[str, Any]] = {}
+    outbox: Dict[str, Any] = {}
+    overdue_sweeper: Dict[str, Any] = {}
     timestamp: datetime
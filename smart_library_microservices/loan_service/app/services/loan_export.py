@@ -0,0 +1,88 @@
+import csv
+import enum
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Optional, Sequence
+from app.config.database import session_scope
+from app.config.settings import settings
+from app.models.loan import Loan
+from app.repositories.loan_repository import LoanRepository
+from app.schemas.loan import ExportFormat
+from app.core.logging import logger
+
+EXPORT_COLUMNS = [column.name for column in Loan.__table__.columns]
+
+MEDIA_TYPES = {ExportFormat.NDJSON: "application/x-ndjson", ExportFormat.CSV: "text/csv"}
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows gzip, honouring q-values (gzip;q=0 refuses it)"""
+    gzip_q: Optional[float] = None
+    wildcard_q: Optional[float] = None
+    for item in accept_encoding.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        coding = coding.lower()
+        if coding in ("gzip", "x-gzip"):
+            gzip_q = q if gzip_q is None else max(gzip_q, q)
+        elif coding == "*":
+            wildcard_q = q
+    # An explicit gzip entry wins over the wildcard
+    if gzip_q is not None:
+        return gzip_q > 0
+    return wildcard_q is not None and wildcard_q > 0
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+def _encode_ndjson(rows: Sequence[Any]) -> str:
+    return "".join(json.dumps(dict(zip(EXPORT_COLUMNS, map(_plain, row))), separators=(",", ":")) + "\n" for row in rows)
+
+def _encode_csv(rows: Sequence[Any]) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerows([_plain(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+async def stream_loan_export(
+    export_format: ExportFormat, since: Optional[datetime], compress: bool
+) -> AsyncIterator[bytes]:
+    """Every loan (or those updated since a time) as NDJSON or CSV, optionally gzipped, one chunk at a time"""
+    encode = _encode_ndjson if export_format == ExportFormat.NDJSON else _encode_csv
+    # gzip container (wbits 16 + 15), compressed as the rows arrive
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    exported = 0
+    
+    def output(text: str) -> bytes:
+        data = text.encode()
+        return compressor.compress(data) if compressor else data
+    
+    if export_format == ExportFormat.CSV:
+        yield output(",".join(EXPORT_COLUMNS) + "\n")
+    try:
+        # Own session: the stream outlives the request handler
+        async with session_scope() as db:
+            async for rows in LoanRepository(db).stream_for_export(since, settings.EXPORT_CHUNK_SIZE):
+                exported += len(rows)
+                chunk = output(encode(rows))
+                if chunk:
+                    yield chunk
+    except Exception as e:
+        # Headers are already sent; the client sees a truncated body
+        logger.error(f"Loan export failed after {exported} rows: {str(e)}")
+        raise
+    if compressor:
+        yield compressor.flush()
+    logger.info(f"Exported {exported} loans as {export_format.value}{' (gzip)' if compress else ''}")
@@ -1,21 +1,34 @@
-from typing import List, Tuple, Optional, Dict, Any
-from sqlalchemy.orm import Session
+from typing import List, Optional, Dict, Any, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta
+from library_common.pagination import Page, InvalidCursorError
+from library_common.serialization import construct, from_orm
 from app.repositories.loan_repository import LoanRepository
-from app.schemas.loan import LoanCreate, LoanResponse, LoanWithDetailsResponse
+from app.repositories.outbox_repository import OutboxRepository
+from app.services.outbox_dispatcher import outbox_dispatcher
+from app.schemas.loan import (
+    LoanCreate, LoanResponse, LoanWithDetailsResponse,
+    LoanCheckout, LoanCheckoutResponse, CheckoutItemResult, CheckoutItemStatus,
+    LoanBatchReturnResponse, UserLoansExtendResponse
+)
 from app.clients.user_client import UserServiceClient
 from app.clients.book_client import BookServiceClient
 from app.models.loan import Loan, LoanStatus
+from app.models.outbox import OutboxEntry
 from app.config.settings import settings
 from app.core.exceptions import (
-    LoanNotFoundException, LoanAlreadyExistsException,
-    LoanNotActiveException, MaxExtensionsReachedException
+    LoanServiceException, LoanNotFoundException, LoanAlreadyExistsException,
+    LoanNotActiveException, MaxExtensionsReachedException,
+    BookNotAvailableException, BookNotFoundException, InvalidLoanDataException
 )
+from app.core.concurrency import fan_out, timed
 from app.core.logging import logger
 
 class LoanService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.repository = LoanRepository(db)
+        self.outbox = OutboxRepository(db)
         self.user_client = UserServiceClient()
         self.book_client = BookServiceClient()
     
@@ -23,74 +36,246 @@ class LoanService:
         """Create a new loan"""
         logger.info(f"Creating loan for user {loan_data.user_id} and book {loan_data.book_id}")
         
-        # Validate user exists
-        user = await self.user_client.get_user(loan_data.user_id)
+        # Validate user exists and book exists, concurrently
+        user, book = await fan_out(
+            "Loan creation lookups",
+            timed(f"User {loan_data.user_id} lookup", self.user_client.get_user(loan_data.user_id)),
+            # Availability must be read fresh, not from cache
+            timed(f"Book {loan_data.book_id} lookup", self.book_client.get_book(loan_data.book_id, use_cache=False))
+        )
         logger.info(f"User {loan_data.user_id} validated")
         
-        # Validate book exists and is available
-        book = await self.book_client.get_book(loan_data.book_id)
+        # Validate book is available
         if book.get("available_copies", 0) < 1:
             logger.warning(f"Book {loan_data.book_id} not available")
             raise BookNotAvailableException(loan_data.book_id)
         logger.info(f"Book {loan_data.book_id} validated and available")
         
         # Check if user already has active loan for this book
-        existing_loan = self.repository.get_active_loan(loan_data.user_id, loan_data.book_id)
+        existing_loan = await self.repository.get_active_loan(loan_data.user_id, loan_data.book_id)
         if existing_loan:
             logger.warning(f"User {loan_data.user_id} already has active loan for book {loan_data.book_id}")
             raise LoanAlreadyExistsException(loan_data.user_id, loan_data.book_id)
         
-        # Create loan
-        loan = self.repository.create(loan_data)
+        # Create loan and its availability decrement in one transaction
+        inline = settings.OUTBOX_INLINE_CHECKOUT
+        try:
+            loan = await self.repository.create(loan_data, commit=False)
+            entry = self.outbox.enqueue(
+                loan.id, loan.book_id, "decrement",
+                # Keep the background dispatcher off the entry while it is delivered inline
+                delay=settings.OUTBOX_LEASE_SECONDS if inline else 0.0
+            )
+            loan = await self.repository.update(loan)
+        except IntegrityError:
+            # A concurrent checkout got past the check above; the partial unique index stopped it
+            await self.repository.rollback()
+            logger.warning(f"User {loan_data.user_id} already has active loan for book {loan_data.book_id}")
+            raise LoanAlreadyExistsException(loan_data.user_id, loan_data.book_id)
         logger.info(f"Loan {loan.id} created")
         
+        if not inline:
+            outbox_dispatcher.wake()
+            return from_orm(LoanResponse, loan)
+        
         # Update book availability
-        try:
-            await self.book_client.update_availability(loan_data.book_id, "decrement")
-            logger.info(f"Book {loan_data.book_id} availability decremented")
-        except Exception as e:
-            # Rollback loan creation if book update fails
-            logger.error(f"Failed to update book availability: {str(e)}")
-            self.repository.db.delete(loan)
-            self.repository.db.commit()
-            raise
+        outcome = (await outbox_dispatcher.deliver(self.outbox, [entry])).get(entry.id)
+        if outcome is None:
+            # Optimistic: the dispatcher retries and cancels the loan should Book Service refuse it
+            logger.warning(f"Book {loan.book_id} decrement for loan {loan.id} deferred to the outbox")
+        elif outcome["status"] == "failed":
+            # Book Service refused the decrement: undo the loan
+            logger.error(f"Failed to update book availability: {outcome.get('error')}")
+            await self.outbox.discard(entry)
+            await self.repository.delete(loan)
+            if outcome.get("error_code") == 404:
+                raise BookNotFoundException(loan.book_id)
+            raise BookNotAvailableException(loan.book_id)
+        else:
+            logger.info(f"Book {loan.book_id} availability decremented")
+        
+        return from_orm(LoanResponse, loan)
+    
+    async def checkout(self, checkout: LoanCheckout) -> LoanCheckoutResponse:
+        """Lend several books to one user in one transaction, reporting the outcome per book"""
+        book_ids = list(dict.fromkeys(checkout.book_ids))
+        logger.info(f"Checking out {len(book_ids)} books for user {checkout.user_id}")
+        
+        if len(book_ids) > settings.CHECKOUT_MAX_BOOKS:
+            raise InvalidLoanDataException({
+                "book_ids": f"At most {settings.CHECKOUT_MAX_BOOKS} books may be checked out at once"
+            })
+        
+        # Validate the user once and read every book fresh in one batch
+        _, books = await fan_out(
+            f"Checkout lookups for {len(book_ids)} books",
+            timed(f"User {checkout.user_id} lookup", self.user_client.get_user(checkout.user_id)),
+            timed(f"Books lookup for {len(book_ids)} books", self.book_client.get_books(book_ids, use_cache=False))
+        )
+        # Not part of the fan-out, which would cancel the statement mid-flight on the session if a lookup failed
+        borrowed = await timed(
+            "Outstanding loans lookup", self.repository.get_active_book_ids(checkout.user_id, book_ids)
+        )
+        
+        rejected: Dict[int, CheckoutItemResult] = {}
+        for book_id in book_ids:
+            if book_id in borrowed:
+                error = LoanAlreadyExistsException(checkout.user_id, book_id)
+                rejected[book_id] = self._rejected(book_id, CheckoutItemStatus.ALREADY_BORROWED, error)
+            elif book_id not in books:
+                rejected[book_id] = self._rejected(book_id, CheckoutItemStatus.NOT_FOUND, BookNotFoundException(book_id))
+            elif books[book_id].get("available_copies", 0) < 1:
+                error = BookNotAvailableException(book_id)
+                rejected[book_id] = self._rejected(book_id, CheckoutItemStatus.NOT_AVAILABLE, error)
+        
+        loans, entries = await self._create_checkout_loans(
+            checkout, [book_id for book_id in book_ids if book_id not in rejected], rejected
+        )
+        
+        if entries and not settings.OUTBOX_INLINE_CHECKOUT:
+            outbox_dispatcher.wake()
+        elif entries:
+            # Reserve every copy with one bulk call; books Book Service refuses are undone individually
+            outcomes = await outbox_dispatcher.deliver(self.outbox, entries)
+            refused = []
+            for loan, entry in zip(loans, entries):
+                outcome = outcomes.get(entry.id)
+                if outcome is None:
+                    logger.warning(f"Book {loan.book_id} decrement for loan {loan.id} deferred to the outbox")
+                elif outcome["status"] == "failed":
+                    logger.error(f"Failed to update book {loan.book_id} availability: {outcome.get('error')}")
+                    await self.outbox.discard(entry)
+                    refused.append(loan)
+                    if outcome.get("error_code") == 404:
+                        error = BookNotFoundException(loan.book_id)
+                        rejected[loan.book_id] = self._rejected(loan.book_id, CheckoutItemStatus.NOT_FOUND, error)
+                    else:
+                        error = BookNotAvailableException(loan.book_id)
+                        rejected[loan.book_id] = self._rejected(loan.book_id, CheckoutItemStatus.NOT_AVAILABLE, error)
+            if refused:
+                await self.repository.delete_many(refused)
+        
+        created = {loan.book_id: loan for loan in loans if loan.book_id not in rejected}
+        logger.info(f"Checked out {len(created)} of {len(book_ids)} books for user {checkout.user_id}")
         
-        return LoanResponse.model_validate(loan)
+        return LoanCheckoutResponse(
+            user_id=checkout.user_id,
+            created=len(created),
+            failed=len(rejected),
+            results=[
+                rejected[book_id] if book_id in rejected else CheckoutItemResult(
+                    book_id=book_id,
+                    status=CheckoutItemStatus.CREATED,
+                    loan=from_orm(LoanResponse, created[book_id])
+                )
+                for book_id in book_ids
+            ]
+        )
+    
+    async def _create_checkout_loans(
+        self, checkout: LoanCheckout, book_ids: List[int], rejected: Dict[int, CheckoutItemResult]
+    ) -> Tuple[List[Loan], List[OutboxEntry]]:
+        """Insert the loans and their availability decrements in one transaction, leaving out books
+        a concurrent checkout lent the user first"""
+        inline = settings.OUTBOX_INLINE_CHECKOUT
+        while book_ids:
+            try:
+                loans = await self.repository.create_many(checkout.user_id, book_ids, checkout.due_date)
+                entries = [
+                    self.outbox.enqueue(
+                        loan.id, loan.book_id, "decrement",
+                        # Keep the background dispatcher off the entries while they are delivered inline
+                        delay=settings.OUTBOX_LEASE_SECONDS if inline else 0.0
+                    )
+                    for loan in loans
+                ]
+                return await self.repository.update_many(loans), entries
+            except IntegrityError:
+                # The partial unique index stopped a duplicate; drop the books concerned and try again
+                await self.repository.rollback()
+                conflicts = await self.repository.get_active_book_ids(checkout.user_id, book_ids)
+                if not conflicts:
+                    raise
+                for book_id in conflicts:
+                    logger.warning(f"User {checkout.user_id} already has active loan for book {book_id}")
+                    error = LoanAlreadyExistsException(checkout.user_id, book_id)
+                    rejected[book_id] = self._rejected(book_id, CheckoutItemStatus.ALREADY_BORROWED, error)
+                book_ids = [book_id for book_id in book_ids if book_id not in conflicts]
+        return [], []
+    
+    @staticmethod
+    def _rejected(book_id: int, status: CheckoutItemStatus, error: LoanServiceException) -> CheckoutItemResult:
+        return CheckoutItemResult(book_id=book_id, status=status, error=error.message)
     
     async def return_loan(self, loan_id: int) -> LoanResponse:
         """Return a loan"""
         logger.info(f"Returning loan {loan_id}")
         
-        loan = self.repository.get_by_id(loan_id)
+        loan = await self.repository.get_by_id(loan_id)
         if not loan:
             logger.warning(f"Loan {loan_id} not found")
             raise LoanNotFoundException(loan_id)
         
-        if loan.status != LoanStatus.ACTIVE:
+        # Overdue loans can still be returned
+        if loan.status not in (LoanStatus.ACTIVE, LoanStatus.OVERDUE):
             logger.warning(f"Loan {loan_id} is not active")
             raise LoanNotActiveException(loan_id)
         
-        # Update loan status
+        # Update loan status and queue the availability increment in one transaction
         loan.status = LoanStatus.RETURNED
         loan.return_date = datetime.utcnow()
-        loan = self.repository.update(loan)
+        self.outbox.enqueue(loan.id, loan.book_id, "increment")
+        loan = await self.repository.update(loan)
         logger.info(f"Loan {loan_id} marked as returned")
         
-        # Update book availability
-        try:
-            await self.book_client.update_availability(loan.book_id, "increment")
-            logger.info(f"Book {loan.book_id} availability incremented")
-        except Exception as e:
-            # Log error but don't rollback - loan is already returned
-            logger.error(f"Failed to update book availability: {str(e)}")
+        # Book availability is updated by the outbox dispatcher
+        outbox_dispatcher.wake()
         
-        return LoanResponse.model_validate(loan)
+        return from_orm(LoanResponse, loan)
+    
+    async def return_loans(self, loan_ids: List[int]) -> LoanBatchReturnResponse:
+        """Return many loans with one update, queueing one availability increment per book"""
+        loan_ids = list(dict.fromkeys(loan_ids))
+        logger.info(f"Returning {len(loan_ids)} loans")
+        
+        if len(loan_ids) > settings.RETURN_BATCH_MAX_LOANS:
+            raise InvalidLoanDataException({
+                "loan_ids": f"At most {settings.RETURN_BATCH_MAX_LOANS} loans may be returned at once"
+            })
+        
+        return_date = datetime.utcnow()
+        returned = await self.repository.return_many(loan_ids, return_date)
+        
+        # Returns of the same book share one increment, in the same transaction as the status change
+        loans_by_book: Dict[int, List[int]] = {}
+        for loan_id, book_id in returned:
+            loans_by_book.setdefault(book_id, []).append(loan_id)
+        for book_id, book_loan_ids in loans_by_book.items():
+            self.outbox.enqueue(min(book_loan_ids), book_id, "increment", quantity=len(book_loan_ids))
+        await self.repository.commit()
+        logger.info(f"{len(returned)} loans marked as returned, {len(loans_by_book)} books to increment")
+        
+        if returned:
+            # Book availability is updated by the outbox dispatcher
+            outbox_dispatcher.wake()
+        
+        # Ids the update skipped are either unknown or no longer outstanding
+        returned_ids = {loan_id for loan_id, _ in returned}
+        skipped = [loan_id for loan_id in loan_ids if loan_id not in returned_ids]
+        existing = await self.repository.get_existing_ids(skipped)
+        
+        return LoanBatchReturnResponse(
+            return_date=return_date,
+            returned=[loan_id for loan_id in loan_ids if loan_id in returned_ids],
+            already_returned=[loan_id for loan_id in skipped if loan_id in existing],
+            not_found=[loan_id for loan_id in skipped if loan_id not in existing]
+        )
     
     async def extend_loan(self, loan_id: int, extension_days: int) -> LoanResponse:
         """Extend a loan"""
         logger.info(f"Extending loan {loan_id} by {extension_days} days")
         
-        loan = self.repository.get_by_id(loan_id)
+        loan = await self.repository.get_by_id(loan_id)
         if not loan:
             logger.warning(f"Loan {loan_id} not found")
             raise LoanNotFoundException(loan_id)
@@ -106,106 +291,195 @@ class LoanService:
         # Extend loan
         loan.due_date = loan.due_date + timedelta(days=extension_days)
         loan.extensions_count += 1
-        loan = self.repository.update(loan)
+        loan = await self.repository.update(loan)
         logger.info(f"Loan {loan_id} extended to {loan.due_date}")
         
-        return LoanResponse.model_validate(loan)
+        return from_orm(LoanResponse, loan)
+    
+    async def extend_user_loans(self, user_id: int) -> UserLoansExtendResponse:
+        """Extend every active loan of a user that has extensions left, with one update"""
+        logger.info(f"Extending active loans of user {user_id} by {settings.EXTENSION_DAYS} days")
+        
+        extended_ids = set(await self.repository.extend_active_loans(
+            user_id, settings.EXTENSION_DAYS, settings.MAX_EXTENSIONS
+        ))
+        # Active loans the update skipped have reached max extensions
+        loans = await self.repository.get_user_loans(user_id, active_only=True)
+        logger.info(f"Extended {len(extended_ids)} of {len(loans)} active loans of user {user_id}")
+        
+        return UserLoansExtendResponse(
+            user_id=user_id,
+            extension_days=settings.EXTENSION_DAYS,
+            extended=[from_orm(LoanResponse, loan) for loan in loans if loan.id in extended_ids],
+            max_extensions_reached=[from_orm(LoanResponse, loan) for loan in loans if loan.id not in extended_ids]
+        )
     
     async def get_loan(self, loan_id: int) -> LoanResponse:
         """Get loan by ID"""
         logger.info(f"Fetching loan {loan_id}")
         
-        loan = self.repository.get_by_id(loan_id)
+        loan = await self.repository.get_by_id(loan_id)
         if not loan:
             logger.warning(f"Loan {loan_id} not found")
             raise LoanNotFoundException(loan_id)
         
-        return LoanResponse.model_validate(loan)
+        return from_orm(LoanResponse, loan)
     
     async def get_loan_with_details(self, loan_id: int) -> LoanWithDetailsResponse:
         """Get loan with user and book details"""
         logger.info(f"Fetching loan {loan_id} with details")
         
-        loan = self.repository.get_by_id(loan_id)
+        loan = await self.repository.get_by_id(loan_id)
         if not loan:
             logger.warning(f"Loan {loan_id} not found")
             raise LoanNotFoundException(loan_id)
         
-        # Fetch user and book details
-        try:
-            user = await self.user_client.get_user(loan.user_id)
-        except Exception as e:
-            logger.error(f"Failed to get user details: {str(e)}")
-            user = {"id": loan.user_id, "name": "Unknown", "email": "unknown"}
-        
-        try:
-            book = await self.book_client.get_book(loan.book_id)
-        except Exception as e:
-            logger.error(f"Failed to get book details: {str(e)}")
-            book = {"id": loan.book_id, "title": "Unknown", "author": "Unknown"}
-        
-        return LoanWithDetailsResponse(
-            id=loan.id,
-            user=user,
-            book=book,
-            issue_date=loan.issue_date,
-            due_date=loan.due_date,
-            return_date=loan.return_date,
-            status=loan.status,
-            extensions_count=loan.extensions_count,
-            created_at=loan.created_at,
-            updated_at=loan.updated_at
+        # Fetch user and book details concurrently, falling back on failure
+        user, book = await fan_out(
+            f"Loan {loan_id} detail lookups",
+            timed(f"User {loan.user_id} lookup", self._get_user_or_unknown(loan.user_id)),
+            timed(f"Book {loan.book_id} lookup", self._get_book_or_unknown(loan.book_id))
         )
+        
+        return self._to_details(loan, user, book)
     
     async def get_user_loans(self, user_id: int) -> List[LoanWithDetailsResponse]:
         """Get all loans for a user"""
         logger.info(f"Fetching loans for user {user_id}")
         
-        # Validate user exists
-        await self.user_client.get_user(user_id)
-        
-        loans = self.repository.get_user_loans(user_id)
+        loans = await self.repository.get_user_loans(user_id)
         result = []
         
+        # Validate user exists while fetching all book details in one round trip
+        _, books = await fan_out(
+            f"User {user_id} loan lookups",
+            timed(f"User {user_id} lookup", self.user_client.get_user(user_id)),
+            timed(f"Books lookup for {len(loans)} loans", self._get_books_or_empty([loan.book_id for loan in loans]))
+        )
+        
         for loan in loans:
-            try:
-                book = await self.book_client.get_book(loan.book_id)
-            except Exception as e:
-                logger.error(f"Failed to get book details: {str(e)}")
-                book = {"id": loan.book_id, "title": "Unknown", "author": "Unknown"}
-            
-            result.append(LoanWithDetailsResponse(
-                id=loan.id,
-                user={"id": user_id},  # User is already validated
-                book=book,
-                issue_date=loan.issue_date,
-                due_date=loan.due_date,
-                return_date=loan.return_date,
-                status=loan.status,
-                extensions_count=loan.extensions_count,
-                created_at=loan.created_at,
-                updated_at=loan.updated_at
-            ))
+            book = books.get(loan.book_id) or {"id": loan.book_id, "title": "Unknown", "author": "Unknown"}
+            # User is already validated
+            result.append(self._to_details(loan, {"id": user_id}, book))
         
         return result
     
-    def list_loans(self, page: int, per_page: int, status: Optional[LoanStatus] = None) -> Tuple[List[LoanResponse], int]:
+    async def enrich_loans(self, loans: List[Loan]) -> List[LoanWithDetailsResponse]:
+        """Attach user and book details to loans with one batch call per service"""
+        if not loans:
+            return []
+        
+        users, books = await fan_out(
+            f"Detail lookups for {len(loans)} loans",
+            timed("Users batch lookup", self._get_users_or_empty([loan.user_id for loan in loans])),
+            timed("Books batch lookup", self._get_books_or_empty([loan.book_id for loan in loans]))
+        )
+        
+        return [
+            self._to_details(
+                loan,
+                users.get(loan.user_id) or {"id": loan.user_id, "name": "Unknown", "email": "unknown"},
+                books.get(loan.book_id) or {"id": loan.book_id, "title": "Unknown", "author": "Unknown"}
+            )
+            for loan in loans
+        ]
+    
+    async def _get_user_or_unknown(self, user_id: int) -> Dict[str, Any]:
+        """Get user details, falling back to a placeholder on failure"""
+        try:
+            return await self.user_client.get_user(user_id)
+        except Exception as e:
+            logger.error(f"Failed to get user details: {str(e)}")
+            return {"id": user_id, "name": "Unknown", "email": "unknown"}
+    
+    async def _get_book_or_unknown(self, book_id: int) -> Dict[str, Any]:
+        """Get book details, falling back to a placeholder on failure"""
+        try:
+            return await self.book_client.get_book(book_id)
+        except Exception as e:
+            logger.error(f"Failed to get book details: {str(e)}")
+            return {"id": book_id, "title": "Unknown", "author": "Unknown"}
+    
+    async def _get_users_or_empty(self, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Get several users' details, returning none on failure"""
+        try:
+            return await self.user_client.get_users(user_ids) if user_ids else {}
+        except Exception as e:
+            logger.error(f"Failed to get user details: {str(e)}")
+            return {}
+    
+    async def _get_books_or_empty(self, book_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Get several books' details, returning none on failure"""
+        try:
+            return await self.book_client.get_books(book_ids) if book_ids else {}
+        except Exception as e:
+            logger.error(f"Failed to get book details: {str(e)}")
+            return {}
+    
+    @staticmethod
+    def _to_details(loan: Loan, user: Dict[str, Any], book: Dict[str, Any]) -> LoanWithDetailsResponse:
+        """Build a detailed loan response from a loan and its user and book (trusted, so not validated)"""
+        return construct(LoanWithDetailsResponse, {
+            "id": loan.id,
+            "user": user,
+            "book": book,
+            "issue_date": loan.issue_date,
+            "due_date": loan.due_date,
+            "return_date": loan.return_date,
+            "status": loan.status,
+            "extensions_count": loan.extensions_count,
+            "created_at": loan.created_at,
+            "updated_at": loan.updated_at
+        })
+    
+    async def list_loans(
+        self,
+        page: int,
+        per_page: int,
+        status: Optional[LoanStatus] = None,
+        cursor: Optional[str] = None,
+        exact_total: bool = False
+    ) -> Page:
         """List loans with pagination"""
-        logger.info(f"Listing loans - page: {page}, per_page: {per_page}, status: {status}")
+        logger.info(f"Listing loans - page: {page}, per_page: {per_page}, status: {status}, cursor: {cursor}")
         
-        loans, total = self.repository.list_all(page, per_page, status)
-        loan_responses = [LoanResponse.model_validate(loan) for loan in loans]
+        result = await self._list_page(page, per_page, status, cursor, exact_total)
+        return result._replace(items=[from_orm(LoanResponse, loan) for loan in result.items])
+    
+    async def list_loans_with_details(
+        self,
+        page: int,
+        per_page: int,
+        status: Optional[LoanStatus] = None,
+        cursor: Optional[str] = None,
+        exact_total: bool = False
+    ) -> Page:
+        """List loans with pagination, including user and book details"""
+        logger.info(f"Listing loans with details - page: {page}, per_page: {per_page}, status: {status}, cursor: {cursor}")
         
-        return loan_responses, total
+        result = await self._list_page(page, per_page, status, cursor, exact_total)
+        return result._replace(items=await self.enrich_loans(result.items))
+    
+    async def _list_page(
+        self, page: int, per_page: int, status: Optional[LoanStatus], cursor: Optional[str], exact_total: bool
+    ) -> Page:
+        """Fetch one page of loans, rejecting malformed cursors"""
+        try:
+            return await self.repository.list_all(page, per_page, status, cursor, exact_total)
+        except InvalidCursorError as e:
+            raise InvalidLoanDataException({"cursor": str(e)})
     
-    def get_overdue_loans(self) -> List[LoanResponse]:
+    async def get_overdue_loans(self) -> List[LoanResponse]:
         """Get all overdue loans"""
         logger.info("Fetching overdue loans")
         
-        # Update overdue status
-        updated = self.repository.update_overdue_status()
-        if updated > 0:
-            logger.info(f"Updated {updated} loans to OVERDUE status")
+        # Statuses are maintained by the overdue sweeper; this is a pure read
+        loans = await self.repository.get_overdue_loans()
+        return [from_orm(LoanResponse, loan) for loan in loans]
+    
+    async def get_overdue_loans_with_details(self) -> List[LoanWithDetailsResponse]:
+        """Get all overdue loans with borrower and book details"""
+        logger.info("Fetching overdue loans with details")
         
-        loans = self.repository.get_overdue_loans()
-        return [LoanResponse.model_validate(loan) for loan in loans]
+        loans = await self.repository.get_overdue_loans()
+        return await self.enrich_loans(loans)
@@ -0,0 +1,207 @@
+import asyncio
+import random
+from typing import Any, Dict, List, Optional
+import httpx
+from app.config.database import session_scope
+from app.config.settings import settings
+from app.clients.book_client import BookServiceClient
+from app.models.loan import LoanStatus
+from app.models.outbox import OutboxEntry
+from app.repositories.loan_repository import LoanRepository
+from app.repositories.outbox_repository import OutboxRepository
+from app.core.logging import logger
+
+class OutboxDispatcher:
+    """Background worker that delivers outbox entries to Book Service in batches"""
+    def __init__(self):
+        self.book_client = BookServiceClient()
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self.delivered = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.retried = 0
+        self.cancelled = 0
+        self.compensated = 0
+        self.batches = 0
+    
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info("Outbox dispatcher started")
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            logger.info("Outbox dispatcher stopped")
+    
+    def wake(self) -> None:
+        """Ask the dispatcher to look for due entries now rather than at the next poll"""
+        self._wake.set()
+    
+    async def _run(self) -> None:
+        while True:
+            try:
+                claimed = await self.dispatch_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Outbox dispatch failed: {str(e)}")
+                claimed = 0
+            
+            # A full batch means more work is probably waiting
+            if claimed >= settings.OUTBOX_BATCH_SIZE:
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=settings.OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+    
+    async def dispatch_once(self) -> int:
+        """Claim one batch of due entries and deliver it; returns the number claimed"""
+        async with session_scope() as db:
+            repository = OutboxRepository(db)
+            entries = await repository.claim_due(settings.OUTBOX_BATCH_SIZE, settings.OUTBOX_LEASE_SECONDS)
+            if entries:
+                outcomes = await self.deliver(repository, entries)
+                # Only entries Book Service judged; one given up on may still have been applied
+                refused = [
+                    entry for entry in entries
+                    if entry.operation == "decrement" and outcomes.get(entry.id, {}).get("status") == "failed"
+                ]
+                if refused:
+                    await self._compensate_refused_decrements(LoanRepository(db), repository, refused)
+            return len(entries)
+    
+    async def _compensate_refused_decrements(
+        self, loans: LoanRepository, repository: OutboxRepository, entries: List[OutboxEntry]
+    ) -> None:
+        """Undo the loans whose deferred decrement Book Service refused, as an inline checkout would have;
+        a loan already returned keeps its record, and its return's increment is withdrawn instead"""
+        cancelled = []
+        for entry in entries:
+            loan = await loans.get_by_id(entry.loan_id)
+            if loan is None:
+                continue
+            if loan.status in (LoanStatus.ACTIVE, LoanStatus.OVERDUE):
+                cancelled.append(loan)
+                logger.error(
+                    f"Cancelling loan {loan.id}: Book Service refused its decrement of book {entry.book_id} "
+                    f"({entry.last_error})"
+                )
+                continue
+            # The copy was never taken, so the return must not give one back
+            if not await repository.withdraw_increment(entry.book_id, loan.id):
+                # The increment is delivered or in flight: reverse it once it has landed. Should Book Service
+                # refuse the reversal too, it comes back here and is queued again
+                repository.enqueue(loan.id, entry.book_id, "decrement", delay=settings.OUTBOX_LEASE_SECONDS)
+            self.compensated += 1
+            logger.error(
+                f"Withdrawing the return of loan {loan.id}: Book Service refused its decrement of book "
+                f"{entry.book_id} ({entry.last_error})"
+            )
+        if cancelled:
+            await loans.delete_many(cancelled)
+            self.cancelled += len(cancelled)
+        await repository.commit()
+    
+    async def deliver(self, repository: OutboxRepository, entries: List[OutboxEntry]) -> Dict[int, Dict[str, Any]]:
+        """Send entries to Book Service as one best-effort batch; returns its results keyed by entry id, omitting
+        retried entries and those given up on, which Book Service may or may not have applied"""
+        self.batches += 1
+        items = [
+            {
+                "book_id": entry.book_id,
+                "operation": entry.operation,
+                "quantity": entry.quantity,
+                "idempotency_key": entry.idempotency_key
+            }
+            for entry in entries
+        ]
+        outcomes: Dict[int, Dict[str, Any]] = {}
+        
+        try:
+            response = await self.book_client.update_availability_bulk(items, atomic=False)
+        except httpx.HTTPStatusError as e:
+            max_attempts = settings.OUTBOX_MAX_ATTEMPTS
+            if e.response.status_code not in (408, 429):
+                # The batch as a whole was rejected (e.g. a request shape a rolling deploy does not know yet);
+                # none of its entries was judged, so they get a few more tries before being given up on
+                logger.error(f"Outbox batch of {len(entries)} rejected by Book Service: {str(e)}")
+                max_attempts = min(max_attempts, settings.OUTBOX_MAX_REJECTED_ATTEMPTS)
+            self._retry(repository, entries, str(e), max_attempts)
+            await repository.commit()
+            return outcomes
+        except Exception as e:
+            self._retry(repository, entries, str(e) or type(e).__name__, settings.OUTBOX_MAX_ATTEMPTS)
+            await repository.commit()
+            return outcomes
+        
+        results = {result.get("idempotency_key"): result for result in response.get("results", [])}
+        unmatched = [entry for entry in entries if entry.idempotency_key not in results]
+        for entry in entries:
+            result = results.get(entry.idempotency_key)
+            if result is None:
+                continue
+            outcomes[entry.id] = result
+            if result["status"] in ("applied", "duplicate"):
+                repository.mark_delivered(entry)
+                self.delivered += 1
+                if result["status"] == "duplicate":
+                    self.duplicates += 1
+            else:
+                repository.mark_failed(entry, result.get("error") or result["status"])
+                self.failed += 1
+                logger.error(
+                    f"Outbox entry {entry.id} ({entry.operation} book {entry.book_id} for loan {entry.loan_id}) "
+                    f"rejected: {result.get('error')}"
+                )
+        if unmatched:
+            logger.error(f"Book Service returned no result for {len(unmatched)} of {len(entries)} outbox entries")
+            self._retry(repository, unmatched, "No result for operation", settings.OUTBOX_MAX_ATTEMPTS)
+        await repository.commit()
+        
+        logger.info(f"Outbox delivered {len(entries) - len(unmatched)} of {len(entries)} entries")
+        return outcomes
+    
+    def _retry(self, repository: OutboxRepository, entries: List[OutboxEntry], error: str, max_attempts: int) -> None:
+        """Schedule entries for another attempt with capped, jittered exponential backoff;
+        entries out of attempts are failed instead and left for an operator, their loans untouched"""
+        exhausted = 0
+        retried = 0
+        for entry in entries:
+            if entry.attempts + 1 >= max_attempts:
+                repository.mark_failed(entry, error)
+                exhausted += 1
+                logger.error(
+                    f"Outbox entry {entry.id} ({entry.operation} book {entry.book_id} for loan {entry.loan_id}) "
+                    f"given up after {entry.attempts} attempts: {error}"
+                )
+                continue
+            delay = min(
+                settings.OUTBOX_RETRY_BACKOFF_MAX,
+                settings.OUTBOX_RETRY_BACKOFF_BASE * (2 ** entry.attempts)
+            )
+            repository.mark_retry(entry, error, random.uniform(delay / 2, delay))
+            retried += 1
+        self.retried += retried
+        self.failed += exhausted
+        if retried:
+            logger.warning(f"Outbox delivery of {retried} entries failed, will retry: {error}")
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "batches": self.batches,
+            "delivered": self.delivered,
+            "duplicates": self.duplicates,
+            "failed": self.failed,
+            "retried": self.retried,
+            "cancelled_loans": self.cancelled,
+            "compensated_returns": self.compensated
+        }
+
+outbox_dispatcher = OutboxDispatcher()
@@ -0,0 +1,85 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+from app.config.database import session_scope
+from app.config.settings import settings
+from app.repositories.loan_repository import LoanRepository
+from app.repositories.job_run_repository import JobRunRepository
+from app.core.logging import logger
+
+class OverdueSweeper:
+    """Background job that marks past-due active loans as overdue in bounded chunks"""
+    JOB_NAME = "overdue_sweep"
+    
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.last_marked = 0
+        self.last_duration_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+    
+    async def start(self) -> None:
+        if self._task is None and settings.OVERDUE_SWEEP_ENABLED:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Overdue sweeper started (every {settings.OVERDUE_SWEEP_INTERVAL}s)")
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            logger.info("Overdue sweeper stopped")
+    
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sweep_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Overdue sweep failed: {str(e)}")
+            await asyncio.sleep(settings.OVERDUE_SWEEP_INTERVAL)
+    
+    async def sweep_once(self) -> int:
+        """Mark all past-due active loans as overdue, one committed chunk at a time"""
+        started_at = datetime.utcnow()
+        start = time.perf_counter()
+        marked = 0
+        error = None
+        
+        async with session_scope() as db:
+            repository = LoanRepository(db)
+            try:
+                while True:
+                    chunk = await repository.mark_overdue_chunk(started_at, settings.OVERDUE_SWEEP_CHUNK_SIZE)
+                    marked += chunk
+                    if chunk == 0:
+                        break
+            except Exception as e:
+                error = str(e)
+                await db.rollback()
+                raise
+            finally:
+                self.runs += 1
+                self.last_marked = marked
+                self.last_error = error
+                self.last_duration_ms = round((time.perf_counter() - start) * 1000, 1)
+                await JobRunRepository(db).record(self.JOB_NAME, started_at, datetime.utcnow(), marked, error)
+        
+        if marked > 0:
+            logger.info(f"Overdue sweep marked {marked} loans as OVERDUE in {self.last_duration_ms}ms")
+        return marked
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": settings.OVERDUE_SWEEP_INTERVAL,
+            "chunk_size": settings.OVERDUE_SWEEP_CHUNK_SIZE,
+            "runs": self.runs,
+            "last_marked": self.last_marked,
+            "last_duration_ms": self.last_duration_ms,
+            "last_error": self.last_error
+        }
+
+overdue_sweeper = OverdueSweeper()
@@ -0,0 +1,35 @@
+"""Initial loan_db schema: the loans table as the service first created it
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "loans",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("book_id", sa.Integer(), nullable=False),
+        sa.Column("issue_date", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("due_date", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("return_date", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("status", sa.Enum("ACTIVE", "RETURNED", "OVERDUE", name="loanstatus"), nullable=False),
+        sa.Column("extensions_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_loans_id", "loans", ["id"])
+    op.create_index("ix_loans_user_id", "loans", ["user_id"])
+    op.create_index("ix_loans_book_id", "loans", ["book_id"])
+
+def downgrade() -> None:
+    op.drop_table("loans")
+    sa.Enum(name="loanstatus").drop(op.get_bind(), checkfirst=True)
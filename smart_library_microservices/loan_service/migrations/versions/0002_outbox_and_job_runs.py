@@ -0,0 +1,51 @@
+"""Outbox of book availability operations and background job runs
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # A service started before migrating has already created missing tables itself
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    
+    if "outbox_entries" not in existing:
+        op.create_table(
+            "outbox_entries",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("idempotency_key", sa.String(64), nullable=False, unique=True),
+            sa.Column("loan_id", sa.Integer(), nullable=False),
+            sa.Column("book_id", sa.Integer(), nullable=False),
+            sa.Column("operation", sa.String(20), nullable=False),
+            sa.Column("status", sa.Enum("PENDING", "DELIVERED", "FAILED", name="outboxstatus"), nullable=False),
+            sa.Column("attempts", sa.Integer(), nullable=False),
+            sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("last_error", sa.String(500), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("delivered_at", sa.DateTime(timezone=True), nullable=True),
+        )
+        op.create_index("ix_outbox_entries_id", "outbox_entries", ["id"])
+        op.create_index("ix_outbox_entries_loan_id", "outbox_entries", ["loan_id"])
+        op.create_index("ix_outbox_entries_status_next_attempt_at", "outbox_entries", ["status", "next_attempt_at"])
+    
+    if "job_runs" not in existing:
+        op.create_table(
+            "job_runs",
+            sa.Column("name", sa.String(100), primary_key=True),
+            sa.Column("started_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("processed", sa.Integer(), nullable=False),
+            sa.Column("error", sa.String(500), nullable=True),
+        )
+
+def downgrade() -> None:
+    op.drop_table("job_runs")
+    op.drop_table("outbox_entries")
+    sa.Enum(name="outboxstatus").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,84 @@
+"""Composite and partial indexes for the loan hot queries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+OUTSTANDING = sa.text("status IN ('ACTIVE', 'OVERDUE')")
+
+INDEXES = [
+    ("ix_loans_user_id_issue_date", ["user_id", "issue_date"]),
+    ("ix_loans_status_due_date", ["status", "due_date"]),
+    ("ix_loans_issue_date_id", ["issue_date", "id"]),
+    ("ix_loans_status_issue_date_id", ["status", "issue_date", "id"]),
+]
+
+def _check_outstanding_duplicates() -> None:
+    """Stop before building the unique index if a user holds several outstanding loans of one book"""
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT user_id, book_id, count(*) FROM loans WHERE status IN ('ACTIVE', 'OVERDUE') "
+        "GROUP BY user_id, book_id HAVING count(*) > 1 ORDER BY user_id, book_id LIMIT 10"
+    )).all()
+    if duplicates:
+        examples = ", ".join(
+            f"user {user_id} / book {book_id} ({count} loans)" for user_id, book_id, count in duplicates
+        )
+        raise RuntimeError(
+            f"Cannot create uq_loans_outstanding_user_book, users hold several outstanding loans of one book: "
+            f"{examples}. Return or merge the extra loans, then run the migration again."
+        )
+
+def _drop_invalid_indexes(names) -> None:
+    """A concurrent build that failed leaves an INVALID index behind, which IF NOT EXISTS would keep"""
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+    invalid = bind.execute(
+        sa.text(
+            "SELECT index_class.relname FROM pg_index "
+            "JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid "
+            "WHERE pg_index.indrelid = 'loans'::regclass AND NOT pg_index.indisvalid "
+            "AND index_class.relname = ANY(:names)"
+        ),
+        {"names": list(names)}
+    ).scalars().all()
+    for name in invalid:
+        op.drop_index(name, table_name="loans", postgresql_concurrently=True, if_exists=True)
+
+def upgrade() -> None:
+    _check_outstanding_duplicates()
+    # Build concurrently on PostgreSQL so checkouts are not blocked on a large table;
+    # that cannot run inside the migration transaction. Every step may already have been
+    # done by an earlier, interrupted run or by a service that created the tables itself
+    with op.get_context().autocommit_block():
+        _drop_invalid_indexes(["uq_loans_outstanding_user_book"] + [name for name, _ in INDEXES])
+        op.create_index(
+            "uq_loans_outstanding_user_book", "loans", ["user_id", "book_id"],
+            unique=True,
+            if_not_exists=True,
+            postgresql_where=OUTSTANDING,
+            sqlite_where=OUTSTANDING,
+            postgresql_concurrently=True
+        )
+        for name, columns in INDEXES:
+            op.create_index(name, "loans", columns, if_not_exists=True, postgresql_concurrently=True)
+        # Covered by the leading column of ix_loans_user_id_issue_date
+        op.drop_index("ix_loans_user_id", table_name="loans", if_exists=True, postgresql_concurrently=True)
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        _drop_invalid_indexes(["ix_loans_user_id"])
+        op.create_index("ix_loans_user_id", "loans", ["user_id"], if_not_exists=True, postgresql_concurrently=True)
+        for name, _ in reversed(INDEXES):
+            op.drop_index(name, table_name="loans", if_exists=True, postgresql_concurrently=True)
+        op.drop_index(
+            "uq_loans_outstanding_user_book", table_name="loans", if_exists=True, postgresql_concurrently=True
+        )
@@ -0,0 +1,42 @@
+"""Index for exporting loans in change order
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def _drop_invalid_index(name: str) -> None:
+    """A concurrent build that failed leaves an INVALID index behind, which IF NOT EXISTS would keep"""
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+    invalid = bind.execute(
+        sa.text(
+            "SELECT 1 FROM pg_index "
+            "JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid "
+            "WHERE pg_index.indrelid = 'loans'::regclass AND NOT pg_index.indisvalid "
+            "AND index_class.relname = :name"
+        ),
+        {"name": name}
+    ).first()
+    if invalid is not None:
+        op.drop_index(name, table_name="loans", postgresql_concurrently=True, if_exists=True)
+
+def upgrade() -> None:
+    # Safe to run again after an interrupted run, as 0003 is
+    with op.get_context().autocommit_block():
+        _drop_invalid_index("ix_loans_updated_at_id")
+        op.create_index(
+            "ix_loans_updated_at_id", "loans", ["updated_at", "id"], if_not_exists=True, postgresql_concurrently=True
+        )
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_loans_updated_at_id", table_name="loans", if_exists=True, postgresql_concurrently=True)
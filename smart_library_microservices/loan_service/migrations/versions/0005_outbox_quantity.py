@@ -0,0 +1,22 @@
+"""Copies moved by an outbox entry, for aggregated returns
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # A service started before migrating may have created the table with the column already
+    columns = [column["name"] for column in sa.inspect(op.get_bind()).get_columns("outbox_entries")]
+    if "quantity" not in columns:
+        op.add_column("outbox_entries", sa.Column("quantity", sa.Integer(), nullable=False, server_default="1"))
+
+def downgrade() -> None:
+    op.drop_column("outbox_entries", "quantity")
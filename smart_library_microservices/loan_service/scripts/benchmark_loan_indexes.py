@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Compare loan query plans and timings without and with the access path indexes"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add the parent directory to the path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from app.config.database import Base
+from app.models.loan import Loan, LoanStatus
+
+# Indexes added by migrations/versions/0003_loan_access_path_indexes.py
+ACCESS_PATH_INDEXES = [
+    index for index in Loan.__table__.indexes if index.name not in ("ix_loans_book_id", "ix_loans_updated_at_id")
+]
+
+NOW = datetime(2026, 1, 1)
+
+QUERIES = {
+    # LoanRepository.get_active_loan
+    "active_loan": (
+        "SELECT * FROM loans WHERE user_id = :user_id AND book_id = :book_id "
+        "AND status IN ('ACTIVE', 'OVERDUE') LIMIT 1"
+    ),
+    # LoanRepository.get_overdue_loans
+    "overdue_loans": (
+        "SELECT * FROM loans WHERE status = 'OVERDUE' "
+        "OR (status = 'ACTIVE' AND due_date < :now) ORDER BY due_date"
+    ),
+    # LoanRepository.mark_overdue_chunk, the candidates of one chunk
+    "overdue_sweep_chunk": (
+        "SELECT id FROM loans WHERE status = 'ACTIVE' AND due_date < :now LIMIT 1000"
+    ),
+    # LoanRepository.get_user_loans
+    "user_loans": "SELECT * FROM loans WHERE user_id = :user_id ORDER BY issue_date DESC",
+    # LoanRepository.list_all, first page
+    "list_all": "SELECT * FROM loans ORDER BY issue_date DESC, id DESC LIMIT 21",
+    # LoanRepository.list_all with a status filter
+    "list_by_status": (
+        "SELECT * FROM loans WHERE status = 'ACTIVE' ORDER BY issue_date DESC, id DESC LIMIT 21"
+    ),
+}
+
+def seed(engine, loans: int, users: int, books: int) -> dict:
+    """Fill an empty loans table: about 15% active, 5% overdue, at most one outstanding loan per user and book"""
+    rng = random.Random(42)
+    outstanding = set()
+    rows = []
+    
+    with engine.begin() as conn:
+        for _ in range(loans):
+            user_id, book_id = rng.randint(1, users), rng.randint(1, books)
+            roll = rng.random()
+            if roll < 0.2 and (user_id, book_id) not in outstanding:
+                # Outstanding loans are recent, so only a few are past due
+                outstanding.add((user_id, book_id))
+                status = LoanStatus.OVERDUE if roll < 0.05 else LoanStatus.ACTIVE
+                issue_date = NOW - timedelta(days=rng.uniform(15, 60) if roll < 0.05 else rng.uniform(0, 16))
+                return_date = None
+            else:
+                status = LoanStatus.RETURNED
+                issue_date = NOW - timedelta(days=rng.uniform(0, 365))
+                return_date = issue_date + timedelta(days=rng.uniform(1, 14))
+            due_date = issue_date + timedelta(days=14)
+            
+            rows.append({
+                "user_id": user_id,
+                "book_id": book_id,
+                "issue_date": issue_date,
+                "due_date": due_date,
+                "return_date": return_date,
+                "status": status,
+                "extensions_count": 0
+            })
+            if len(rows) == 10000:
+                conn.execute(Loan.__table__.insert(), rows)
+                rows = []
+        if rows:
+            conn.execute(Loan.__table__.insert(), rows)
+    
+    user_id, book_id = next(iter(outstanding))
+    return {"user_id": user_id, "book_id": book_id, "now": NOW.isoformat(sep=" ")}
+
+def analyze(engine) -> None:
+    """Refresh planner statistics"""
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE loans" if engine.dialect.name == "postgresql" else "ANALYZE"))
+
+def use_baseline_indexes(engine) -> None:
+    """Drop the access path indexes and restore the single-column user_id index"""
+    for index in ACCESS_PATH_INDEXES:
+        index.drop(engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_loans_user_id ON loans (user_id)"))
+    analyze(engine)
+
+def use_access_path_indexes(engine) -> None:
+    """Create the access path indexes as the migration does"""
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX IF EXISTS ix_loans_user_id"))
+    for index in ACCESS_PATH_INDEXES:
+        index.create(engine, checkfirst=True)
+    analyze(engine)
+
+def explain(engine, sql: str, params: dict) -> str:
+    """Query plan as text; PostgreSQL runs the query to report actual timings"""
+    prefix = "EXPLAIN (ANALYZE, BUFFERS) " if engine.dialect.name == "postgresql" else "EXPLAIN QUERY PLAN "
+    with engine.connect() as conn:
+        rows = conn.execute(text(prefix + sql), params).all()
+    # SQLite returns (id, parent, notused, detail)
+    return "\n".join(str(row[-1]) for row in rows)
+
+def time_query(engine, sql: str, params: dict, repeat: int) -> float:
+    """Median wall time of the query in milliseconds"""
+    timings = []
+    with engine.connect() as conn:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            conn.execute(text(sql), params).all()
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def run_phase(engine, params: dict, repeat: int) -> dict:
+    """Plan and median time of every query"""
+    return {
+        name: (explain(engine, sql, params), time_query(engine, sql, params, repeat))
+        for name, sql in QUERIES.items()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--url", default="sqlite:///./loan_index_benchmark.db",
+        help="Scratch database URL; its loans table is dropped and refilled"
+    )
+    parser.add_argument("--loans", type=int, default=200000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--books", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    
+    engine = create_engine(args.url)
+    Loan.__table__.drop(engine, checkfirst=True)
+    Base.metadata.create_all(bind=engine, tables=[Loan.__table__])
+    
+    print(f"Seeding {args.loans} loans into {engine.dialect.name}...")
+    params = seed(engine, args.loans, args.users, args.books)
+    
+    use_baseline_indexes(engine)
+    before = run_phase(engine, params, args.repeat)
+    use_access_path_indexes(engine)
+    after = run_phase(engine, params, args.repeat)
+    
+    for name in QUERIES:
+        (plan_before, ms_before), (plan_after, ms_after) = before[name], after[name]
+        print(f"\n== {name}: {ms_before:.2f} ms -> {ms_after:.2f} ms ({ms_before / max(ms_after, 1e-6):.1f}x)")
+        print("-- without access path indexes")
+        print(plan_before)
+        print("-- with access path indexes")
+        print(plan_after)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import os
+import tempfile
+
+# Point the service at a throwaway SQLite database before the app reads its settings
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'loan_service_test.db')}"
+
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+import httpx
+import pytest
+from app.clients import cache, resilience
+from app.config.database import AsyncSessionLocal, Base, SessionLocal, ThreadedSession, async_engine, engine
+from app.core.exceptions import BookNotFoundException, UserNotFoundException
+from app.services import loan_service
+from app.services.loan_service import LoanService
+from app.services.outbox_dispatcher import OutboxDispatcher
+from app.main import app
+
+class FakeUserService:
+    """User Service stand-in serving users from a dict"""
+    def __init__(self):
+        self.users: Dict[int, Dict[str, Any]] = {}
+    
+    def add(self, user_id: int) -> None:
+        self.users[user_id] = {"id": user_id, "name": f"User {user_id}", "email": f"user{user_id}@example.com"}
+    
+    async def get_user(self, user_id: int, use_cache: bool = True) -> Dict[str, Any]:
+        if user_id not in self.users:
+            raise UserNotFoundException(user_id)
+        return self.users[user_id]
+    
+    async def get_users(self, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        return {user_id: self.users[user_id] for user_id in user_ids if user_id in self.users}
+
+class FakeBookService:
+    """Book Service stand-in that applies best-effort availability batches as the real endpoint does"""
+    def __init__(self):
+        self.books: Dict[int, Dict[str, Any]] = {}
+        self.applied_keys = set()
+        self.batches: List[List[Dict[str, Any]]] = []
+        # Raised by the next availability batches instead of answering
+        self.error: Optional[Exception] = None
+    
+    def add(self, book_id: int, copies: int = 1, available_copies: Optional[int] = None) -> None:
+        self.books[book_id] = {
+            "id": book_id,
+            "title": f"Book {book_id}",
+            "author": "Author",
+            "copies": copies,
+            "available_copies": copies if available_copies is None else available_copies
+        }
+    
+    async def get_book(self, book_id: int, use_cache: bool = True) -> Dict[str, Any]:
+        if book_id not in self.books:
+            raise BookNotFoundException(book_id)
+        return dict(self.books[book_id])
+    
+    async def get_books(self, book_ids: List[int], use_cache: bool = True) -> Dict[int, Dict[str, Any]]:
+        return {book_id: dict(self.books[book_id]) for book_id in book_ids if book_id in self.books}
+    
+    async def update_availability_bulk(self, items: List[Dict[str, Any]], atomic: bool = True) -> Dict[str, Any]:
+        self.batches.append(items)
+        if self.error is not None:
+            raise self.error
+        results = []
+        for item in items:
+            result = {"book_id": item["book_id"], "idempotency_key": item["idempotency_key"]}
+            results.append(result)
+            book = self.books.get(item["book_id"])
+            if item["idempotency_key"] in self.applied_keys:
+                result["status"] = "duplicate"
+                continue
+            if book is None:
+                result.update(status="failed", error="Not found", error_code=404)
+                continue
+            change = item["quantity"] if item["operation"] == "increment" else -item["quantity"]
+            if not 0 <= book["available_copies"] + change <= book["copies"]:
+                result.update(status="failed", error="No copies", error_code=400)
+                continue
+            book["available_copies"] += change
+            self.applied_keys.add(item["idempotency_key"])
+            result.update(status="applied", available_copies=book["available_copies"])
+        return {"results": results}
+
+class Clock:
+    """Monotonic clock that only moves when a test advances it"""
+    def __init__(self):
+        self.now = 1000.0
+    
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Drive breaker and cache timing without touching the event loop's clock"""
+    clock = Clock()
+    fake_time = SimpleNamespace(monotonic=lambda: clock.now)
+    monkeypatch.setattr(resilience, "time", fake_time)
+    monkeypatch.setattr(cache, "time", fake_time)
+    return clock
+
+@pytest.fixture
+async def database():
+    Base.metadata.create_all(bind=engine)
+    yield
+    # Pooled aiosqlite connections belong to this test's event loop
+    await async_engine.dispose()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+async def db(database):
+    async with AsyncSessionLocal() as session:
+        yield session
+
+@pytest.fixture
+async def threaded_db(database):
+    """The DATABASE_ASYNC=false session: sync SQLAlchemy run in worker threads"""
+    session = ThreadedSession(SessionLocal(expire_on_commit=False))
+    yield session
+    await session.close()
+
+@pytest.fixture
+def users():
+    return FakeUserService()
+
+@pytest.fixture
+def books():
+    return FakeBookService()
+
+@pytest.fixture
+def dispatcher(books, monkeypatch):
+    """A fresh outbox dispatcher, used by the loan service, that delivers to the fake Book Service"""
+    dispatcher = OutboxDispatcher()
+    dispatcher.book_client = books
+    monkeypatch.setattr(loan_service, "outbox_dispatcher", dispatcher)
+    return dispatcher
+
+@pytest.fixture
+def service(db, users, books, dispatcher):
+    service = LoanService(db)
+    service.user_client = users
+    service.book_client = books
+    return service
+
+@pytest.fixture
+async def client(database):
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        yield client
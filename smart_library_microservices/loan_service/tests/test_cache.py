@@ -0,0 +1,90 @@
+import pytest
+from app.clients.cache import TTLCache
+from app.config.settings import settings
+from app.core.exceptions import BookNotFoundException, ServiceUnavailableException
+
+async def settle(cache):
+    """Wait for the cache's background refreshes"""
+    for task in list(cache._tasks):
+        await task
+
+async def test_cache_serves_stale_values_while_refreshing(clock):
+    cache = TTLCache("test", max_entries=10, ttl=10, stale_ttl=20)
+    versions = iter(range(1, 10))
+    
+    async def fetch():
+        return next(versions)
+    
+    assert await cache.get_or_fetch("key", fetch) == 1
+    clock.advance(15)
+    # Stale: served at once, refreshed in the background
+    assert await cache.get_or_fetch("key", fetch) == 1
+    await settle(cache)
+    assert await cache.get_or_fetch("key", fetch) == 2
+    
+    clock.advance(31)
+    # Past the stale window: fetched on the request path
+    assert await cache.get_or_fetch("key", fetch) == 3
+    assert (cache.hits, cache.stale_hits, cache.misses) == (1, 1, 2)
+
+async def test_failed_refresh_keeps_the_stale_value(clock):
+    cache = TTLCache("test", max_entries=10, ttl=10, stale_ttl=20)
+    cache.set("key", "old")
+    clock.advance(15)
+    
+    async def fetch():
+        raise ServiceUnavailableException("Book Service")
+    
+    assert await cache.get_or_fetch("key", fetch) == "old"
+    await settle(cache)
+    assert cache.refresh_errors == 1
+    assert await cache.get_or_fetch("key", fetch) == "old"
+
+async def test_refresh_drops_entries_gone_upstream(clock):
+    cache = TTLCache("test", max_entries=10, ttl=10, stale_ttl=20)
+    cache.set(1, {"id": 1})
+    clock.advance(15)
+    
+    async def fetch():
+        raise BookNotFoundException(1)
+    
+    await cache.get_or_fetch(1, fetch)
+    await settle(cache)
+    assert cache.stats()["entries"] == 0
+
+async def test_batch_lookup_fetches_only_missing_keys():
+    cache = TTLCache("test", max_entries=10, ttl=60, stale_ttl=60)
+    cache.set(1, {"id": 1})
+    requested = []
+    
+    async def fetch_many(keys):
+        requested.append(keys)
+        return {key: {"id": key} for key in keys if key != 3}
+    
+    assert await cache.get_many_or_fetch([1, 2, 3], fetch_many) == {1: {"id": 1}, 2: {"id": 2}}
+    assert requested == [[2, 3]]
+
+async def test_batch_lookup_serves_cached_entries_when_the_fetch_fails():
+    cache = TTLCache("test", max_entries=10, ttl=60, stale_ttl=60)
+    cache.set(1, {"id": 1})
+    
+    async def fetch_many(keys):
+        raise ServiceUnavailableException("Book Service")
+    
+    assert await cache.get_many_or_fetch([1, 2], fetch_many) == {1: {"id": 1}}
+    with pytest.raises(ServiceUnavailableException):
+        await cache.get_many_or_fetch([3], fetch_many)
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache("test", max_entries=2, ttl=60, stale_ttl=60)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    cache.set(3, "c")
+    assert cache.evictions == 1
+    assert cache.stats()["entries"] == 2
+
+def test_disabled_cache_stores_nothing(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_ENABLED", False)
+    cache = TTLCache("test", max_entries=10, ttl=60, stale_ttl=60)
+    cache.set(1, "value")
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,45 @@
+import asyncio
+import time
+import pytest
+from app.core.concurrency import fan_out, timed
+
+async def sleep_then(delay, value):
+    await asyncio.sleep(delay)
+    return value
+
+async def test_fan_out_runs_calls_concurrently():
+    start = time.perf_counter()
+    await fan_out("test", sleep_then(0.1, 1), sleep_then(0.1, 2), sleep_then(0.1, 3))
+    assert time.perf_counter() - start < 0.25
+
+async def test_fan_out_returns_results_in_argument_order():
+    results = await fan_out("test", sleep_then(0.03, "slow"), sleep_then(0, "fast"), sleep_then(0.01, "middle"))
+    assert results == ["slow", "fast", "middle"]
+
+async def test_fan_out_cancels_siblings_and_reraises():
+    cancelled = asyncio.Event()
+    
+    async def sibling():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+    
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise LookupError("missing")
+    
+    with pytest.raises(LookupError, match="missing"):
+        await fan_out("test", sibling(), failing())
+    # The sibling has been cancelled and awaited by the time fan_out raises
+    assert cancelled.is_set()
+
+async def test_timed_passes_through_results_and_errors():
+    assert await timed("test", sleep_then(0, 42)) == 42
+    
+    async def failing():
+        raise LookupError("missing")
+    
+    with pytest.raises(LookupError):
+        await timed("test", failing())
@@ -0,0 +1,47 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+import pytest
+from app.repositories.loan_repository import LoanRepository
+from app.schemas.loan import LoanCreate
+from app.services.loan_export import EXPORT_COLUMNS, accepts_gzip
+
+@pytest.mark.parametrize("header, expected", [
+    ("", False),
+    ("gzip", True),
+    ("deflate, gzip;q=0.5", True),
+    ("gzip;q=0", False),
+    ("GZIP; q=0.000", False),
+    ("identity", False),
+    ("*", True),
+    ("*;q=0", False),
+    ("gzip;q=0, *", False),
+    ("br, *;q=0.1", True),
+])
+def test_accepts_gzip(header, expected):
+    assert accepts_gzip(header) is expected
+
+async def create_loans(db, count):
+    repository = LoanRepository(db)
+    for book_id in range(1, count + 1):
+        await repository.create(LoanCreate(user_id=1, book_id=book_id, due_date=datetime.utcnow() + timedelta(days=14)))
+
+async def test_export_ndjson_gzipped_when_accepted(client, db):
+    await create_loans(db, 3)
+    response = await client.get("/api/loans/export", headers={"accept-encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["book_id"] for row in rows] == [1, 2, 3]
+    assert list(rows[0]) == EXPORT_COLUMNS
+
+async def test_export_csv_uncompressed_when_gzip_is_refused(client, db):
+    await create_loans(db, 2)
+    response = await client.get(
+        "/api/loans/export", params={"format": "csv"}, headers={"accept-encoding": "gzip;q=0, identity"}
+    )
+    assert "content-encoding" not in response.headers
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == EXPORT_COLUMNS
+    assert len(rows) == 3
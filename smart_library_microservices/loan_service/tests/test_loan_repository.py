@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy.exc import IntegrityError
+from library_common.pagination import InvalidCursorError
+from app.models.loan import LoanStatus
+from app.repositories.loan_repository import LoanRepository
+from app.schemas.loan import LoanCreate
+
+def due(days=14):
+    return datetime.utcnow() + timedelta(days=days)
+
+@pytest.fixture(params=["async", "threaded"])
+def session(request, db, threaded_db):
+    """Both session modes DATABASE_ASYNC selects between"""
+    return db if request.param == "async" else threaded_db
+
+async def test_create_get_update_delete(session):
+    repository = LoanRepository(session)
+    loan = await repository.create(LoanCreate(user_id=1, book_id=10, due_date=due()))
+    assert loan.status == LoanStatus.ACTIVE
+    assert loan.issue_date is not None
+    
+    assert (await repository.get_active_loan(1, 10)).id == loan.id
+    loan.status = LoanStatus.RETURNED
+    await repository.update(loan)
+    assert await repository.get_active_loan(1, 10) is None
+    assert await repository.count_active_loans() == 0
+    
+    await repository.delete(loan)
+    assert await repository.get_by_id(loan.id) is None
+
+async def test_user_and_book_loans(session):
+    repository = LoanRepository(session)
+    for book_id in (10, 11):
+        await repository.create(LoanCreate(user_id=1, book_id=book_id, due_date=due()))
+    await repository.create(LoanCreate(user_id=2, book_id=10, due_date=due()))
+    
+    assert sorted(loan.book_id for loan in await repository.get_user_loans(1)) == [10, 11]
+    assert sorted(loan.user_id for loan in await repository.get_book_loans(10, active_only=True)) == [1, 2]
+
+async def test_overdue_loans_include_ones_not_swept_yet(session):
+    repository = LoanRepository(session)
+    late = await repository.create(LoanCreate(user_id=1, book_id=10, due_date=due(-1)))
+    await repository.create(LoanCreate(user_id=1, book_id=11, due_date=due()))
+    assert [loan.id for loan in await repository.get_overdue_loans()] == [late.id]
+
+async def test_overdue_chunks_mark_each_past_due_loan_once(session):
+    repository = LoanRepository(session)
+    for book_id in range(5):
+        await repository.create(LoanCreate(user_id=1, book_id=book_id, due_date=due(-1)))
+    await repository.create(LoanCreate(user_id=1, book_id=99, due_date=due()))
+    
+    now = datetime.utcnow()
+    assert [await repository.mark_overdue_chunk(now, 2) for _ in range(4)] == [2, 2, 1, 0]
+    assert await repository.count_active_loans() == 1
+
+async def test_cursor_pages_cover_every_loan_once(db):
+    repository = LoanRepository(db)
+    loan_ids = [
+        (await repository.create(LoanCreate(user_id=1, book_id=book_id, due_date=due()))).id for book_id in range(1, 8)
+    ]
+    
+    first = await repository.list_all(page=1, per_page=3)
+    assert first.total == 7
+    seen = [loan.id for loan in first.items]
+    cursor = first.next_cursor
+    while cursor is not None:
+        page = await repository.list_all(page=1, per_page=3, cursor=cursor)
+        assert page.total is None
+        seen.extend(loan.id for loan in page.items)
+        cursor = page.next_cursor
+    # Newest first; loans issued in the same second fall back to id order
+    assert seen == sorted(loan_ids, reverse=True)
+
+async def test_status_filter_and_malformed_cursor(db):
+    repository = LoanRepository(db)
+    returned = await repository.create(LoanCreate(user_id=1, book_id=10, due_date=due()))
+    await repository.create(LoanCreate(user_id=1, book_id=11, due_date=due()))
+    returned.status = LoanStatus.RETURNED
+    await repository.update(returned)
+    
+    page = await repository.list_all(page=1, per_page=10, status=LoanStatus.RETURNED)
+    assert [loan.id for loan in page.items] == [returned.id]
+    with pytest.raises(InvalidCursorError):
+        await repository.list_all(page=1, per_page=10, cursor="garbage")
+
+async def test_one_outstanding_loan_per_user_and_book(db):
+    repository = LoanRepository(db)
+    loan = await repository.create(LoanCreate(user_id=1, book_id=1, due_date=due()))
+    loan_id = loan.id
+    with pytest.raises(IntegrityError):
+        await repository.create(LoanCreate(user_id=1, book_id=1, due_date=due()))
+    await repository.rollback()
+    
+    # Once returned, the book can be borrowed again
+    loan = await repository.get_by_id(loan_id)
+    loan.status = LoanStatus.RETURNED
+    await repository.update(loan)
+    await repository.create(LoanCreate(user_id=1, book_id=1, due_date=due()))
+    assert len(await repository.get_user_loans(1)) == 2
+
+async def test_create_many_assigns_ids_before_commit(db):
+    repository = LoanRepository(db)
+    loans = await repository.create_many(1, [10, 11, 12], due())
+    assert all(loan.id is not None for loan in loans)
+    await repository.update_many(loans)
+    assert [loan.status for loan in loans] == [LoanStatus.ACTIVE] * 3
+    assert loans[0].issue_date is not None
+
+async def test_return_many_only_changes_outstanding_loans(db):
+    repository = LoanRepository(db)
+    loans = await repository.create_many(1, [10, 11], due())
+    await repository.update_many(loans)
+    ids = [loan.id for loan in loans]
+    
+    assert sorted(await repository.return_many(ids + [999], datetime.utcnow())) == [(ids[0], 10), (ids[1], 11)]
+    await repository.commit()
+    assert await repository.return_many(ids, datetime.utcnow()) == []
+    assert await repository.get_existing_ids(ids + [999]) == set(ids)
+
+async def test_extend_active_loans_respects_the_limit(db):
+    repository = LoanRepository(db)
+    loans = await repository.create_many(1, [10, 11], due(1))
+    loans[1].extensions_count = 2
+    await repository.update_many(loans)
+    original_due = loans[0].due_date
+    
+    assert await repository.extend_active_loans(1, 7, max_extensions=2) == [loans[0].id]
+    await db.refresh(loans[0])
+    assert loans[0].extensions_count == 1
+    assert loans[0].due_date - original_due == timedelta(days=7)
@@ -0,0 +1,153 @@
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from sqlalchemy import select
+from app.config.settings import settings
+from app.core.exceptions import (
+    BookNotAvailableException, InvalidLoanDataException, LoanAlreadyExistsException, UserNotFoundException
+)
+from app.models.loan import LoanStatus
+from app.models.outbox import OutboxEntry, OutboxStatus
+from app.schemas.loan import CheckoutItemStatus, LoanCheckout, LoanCreate
+
+def due(days=14):
+    return datetime.utcnow() + timedelta(days=days)
+
+async def outbox(db):
+    return list((await db.execute(select(OutboxEntry).order_by(OutboxEntry.id))).scalars().all())
+
+async def test_create_loan_reserves_a_copy_inline(service, users, books, db):
+    users.add(1)
+    books.add(10, copies=2)
+    loan = await service.create_loan(LoanCreate(user_id=1, book_id=10, due_date=due()))
+    
+    assert loan.status == LoanStatus.ACTIVE
+    assert books.books[10]["available_copies"] == 1
+    entry, = await outbox(db)
+    assert (entry.operation, entry.status) == ("decrement", OutboxStatus.DELIVERED)
+    
+    with pytest.raises(LoanAlreadyExistsException):
+        await service.create_loan(LoanCreate(user_id=1, book_id=10, due_date=due()))
+
+async def test_refused_decrement_undoes_the_loan(service, users, books, db):
+    users.add(1)
+    books.add(10, copies=1)
+    # Another checkout takes the last copy after the availability read
+    books.books[10]["copies"] = 0
+    books.books[10]["available_copies"] = 0
+    real_get_book = books.get_book
+    
+    async def stale_get_book(book_id, use_cache=True):
+        return {**(await real_get_book(book_id)), "available_copies": 1}
+    
+    books.get_book = stale_get_book
+    with pytest.raises(BookNotAvailableException):
+        await service.create_loan(LoanCreate(user_id=1, book_id=10, due_date=due()))
+    assert await service.repository.get_user_loans(1) == []
+    assert await outbox(db) == []
+
+async def test_unreachable_book_service_defers_the_decrement(service, users, books, db):
+    users.add(1)
+    books.add(10)
+    books.error = httpx.ConnectError("connection refused")
+    loan = await service.create_loan(LoanCreate(user_id=1, book_id=10, due_date=due()))
+    
+    assert loan.status == LoanStatus.ACTIVE
+    entry, = await outbox(db)
+    assert entry.status == OutboxStatus.PENDING
+    assert entry.attempts == 1
+
+async def test_checkout_reports_each_book(service, users, books):
+    users.add(1)
+    books.add(10)
+    books.add(11)
+    books.add(12, available_copies=0)
+    await service.create_loan(LoanCreate(user_id=1, book_id=11, due_date=due()))
+    
+    response = await service.checkout(LoanCheckout(user_id=1, book_ids=[10, 11, 12, 13, 10], due_date=due()))
+    assert (response.created, response.failed) == (1, 3)
+    assert [(result.book_id, result.status) for result in response.results] == [
+        (10, CheckoutItemStatus.CREATED),
+        (11, CheckoutItemStatus.ALREADY_BORROWED),
+        (12, CheckoutItemStatus.NOT_AVAILABLE),
+        (13, CheckoutItemStatus.NOT_FOUND),
+    ]
+    assert response.results[0].loan.book_id == 10
+    assert books.books[10]["available_copies"] == 0
+    # One bulk call for the whole checkout
+    assert len(books.batches[-1]) == 1
+
+async def test_checkout_undoes_books_refused_at_delivery(service, users, books, db):
+    users.add(1)
+    books.add(10)
+    books.add(11)
+    real_get_books = books.get_books
+    
+    async def stale_get_books(book_ids, use_cache=True):
+        found = await real_get_books(book_ids)
+        books.books[11]["available_copies"] = 0
+        return found
+    
+    books.get_books = stale_get_books
+    response = await service.checkout(LoanCheckout(user_id=1, book_ids=[10, 11], due_date=due()))
+    assert [result.status for result in response.results] == [
+        CheckoutItemStatus.CREATED, CheckoutItemStatus.NOT_AVAILABLE
+    ]
+    assert [loan.book_id for loan in await service.repository.get_user_loans(1)] == [10]
+    assert [entry.book_id for entry in await outbox(db)] == [10]
+
+async def test_checkout_for_unknown_user_leaves_the_session_alone(service, books, monkeypatch):
+    books.add(10)
+    queried = []
+    
+    async def get_active_book_ids(user_id, book_ids):
+        queried.append(book_ids)
+        return set()
+    
+    monkeypatch.setattr(service.repository, "get_active_book_ids", get_active_book_ids)
+    with pytest.raises(UserNotFoundException):
+        await service.checkout(LoanCheckout(user_id=1, book_ids=[10], due_date=due()))
+    assert queried == []
+
+async def test_checkout_size_is_limited(service, monkeypatch):
+    monkeypatch.setattr(settings, "CHECKOUT_MAX_BOOKS", 2)
+    with pytest.raises(InvalidLoanDataException):
+        await service.checkout(LoanCheckout(user_id=1, book_ids=[1, 2, 3], due_date=due()))
+
+async def test_bulk_return_queues_one_increment_per_book(service, users, books, db):
+    for user_id in (1, 2):
+        users.add(user_id)
+    books.add(10, copies=2)
+    books.add(11)
+    first = await service.checkout(LoanCheckout(user_id=1, book_ids=[10, 11], due_date=due()))
+    second = await service.create_loan(LoanCreate(user_id=2, book_id=10, due_date=due()))
+    loan_ids = [result.loan.id for result in first.results] + [second.id]
+    await service.return_loan(loan_ids[1])
+    
+    response = await service.return_loans(loan_ids + [999, loan_ids[0]])
+    assert response.returned == [loan_ids[0], loan_ids[2]]
+    assert response.already_returned == [loan_ids[1]]
+    assert response.not_found == [999]
+    
+    increments = [entry for entry in await outbox(db) if entry.operation == "increment"]
+    assert sorted((entry.book_id, entry.quantity) for entry in increments) == [(10, 2), (11, 1)]
+
+async def test_bulk_return_size_is_limited(service, monkeypatch):
+    monkeypatch.setattr(settings, "RETURN_BATCH_MAX_LOANS", 1)
+    with pytest.raises(InvalidLoanDataException):
+        await service.return_loans([1, 2])
+
+async def test_renew_all_extends_loans_with_extensions_left(service, users, books):
+    users.add(1)
+    books.add(10)
+    books.add(11)
+    checkout = await service.checkout(LoanCheckout(user_id=1, book_ids=[10, 11], due_date=due()))
+    capped = checkout.results[1].loan
+    for _ in range(settings.MAX_EXTENSIONS):
+        await service.extend_loan(capped.id, 7)
+    
+    response = await service.extend_user_loans(1)
+    assert [loan.id for loan in response.extended] == [checkout.results[0].loan.id]
+    assert response.extended[0].extensions_count == 1
+    assert response.extended[0].due_date - checkout.results[0].loan.due_date == timedelta(days=settings.EXTENSION_DAYS)
+    assert [loan.id for loan in response.max_extensions_reached] == [capped.id]
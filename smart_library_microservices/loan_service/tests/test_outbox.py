@@ -0,0 +1,190 @@
+from datetime import datetime, timedelta
+import httpx
+from sqlalchemy import select
+from app.config.database import session_scope
+from app.config.settings import settings
+from app.models.loan import LoanStatus
+from app.models.outbox import OutboxEntry, OutboxStatus
+from app.repositories.loan_repository import LoanRepository
+from app.repositories.outbox_repository import OutboxRepository
+from app.schemas.loan import LoanCreate
+
+async def queue(db, *operations, book_id=10):
+    """Commit one loan per operation with its outbox entry, due now; returns the entry ids"""
+    outbox = OutboxRepository(db)
+    entries = []
+    for user_id, operation in enumerate(operations, start=1):
+        loan = await LoanRepository(db).create(
+            LoanCreate(user_id=user_id, book_id=book_id, due_date=datetime.utcnow() + timedelta(days=14)),
+            commit=False
+        )
+        entries.append(outbox.enqueue(loan.id, book_id, operation))
+    await db.commit()
+    return [entry.id for entry in entries]
+
+async def entries():
+    """Outbox entries as the dispatcher left them, read in a fresh session"""
+    async with session_scope() as db:
+        return list((await db.execute(select(OutboxEntry).order_by(OutboxEntry.id))).scalars().all())
+
+async def test_due_entries_are_delivered_in_one_batch(db, books, dispatcher):
+    books.add(10, copies=3)
+    await queue(db, "decrement", "decrement")
+    
+    assert await dispatcher.dispatch_once() == 2
+    assert len(books.batches) == 1
+    assert books.books[10]["available_copies"] == 1
+    assert [entry.status for entry in await entries()] == [OutboxStatus.DELIVERED] * 2
+    # Nothing is left to claim
+    assert await dispatcher.dispatch_once() == 0
+
+async def test_redelivery_is_idempotent(db, books, dispatcher):
+    books.add(10, copies=2)
+    await queue(db, "decrement")
+    entry, = await entries()
+    # Book Service applied the operation, but the answer was lost
+    books.applied_keys.add(entry.idempotency_key)
+    books.books[10]["available_copies"] = 1
+    
+    await dispatcher.dispatch_once()
+    assert books.books[10]["available_copies"] == 1
+    assert (await entries())[0].status == OutboxStatus.DELIVERED
+    assert dispatcher.stats()["duplicates"] == 1
+
+async def test_unreachable_book_service_is_retried_later(db, books, dispatcher):
+    books.add(10)
+    await queue(db, "decrement")
+    books.error = httpx.ConnectError("connection refused")
+    
+    await dispatcher.dispatch_once()
+    entry, = await entries()
+    assert entry.status == OutboxStatus.PENDING
+    assert entry.attempts == 1
+    assert entry.next_attempt_at > datetime.utcnow()
+    assert "connection refused" in entry.last_error
+    # Not due again yet
+    assert await dispatcher.dispatch_once() == 0
+
+async def test_rejected_batch_is_retried_rather_than_failed(db, books, dispatcher):
+    books.add(10)
+    await queue(db, "decrement")
+    request = httpx.Request("PATCH", "http://book-service/api/books/batch/availability")
+    books.error = httpx.HTTPStatusError("422", request=request, response=httpx.Response(422, request=request))
+    
+    await dispatcher.dispatch_once()
+    entry, = await entries()
+    assert entry.status == OutboxStatus.PENDING
+    assert dispatcher.stats()["retried"] == 1
+    assert dispatcher.stats()["failed"] == 0
+
+async def test_rejected_batch_is_given_up_after_a_few_attempts(db, books, dispatcher, monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_RETRY_BACKOFF_BASE", 0.0)
+    books.add(10)
+    await queue(db, "decrement")
+    request = httpx.Request("PATCH", "http://book-service/api/books/batch/availability")
+    books.error = httpx.HTTPStatusError("400", request=request, response=httpx.Response(400, request=request))
+    
+    for _ in range(settings.OUTBOX_MAX_REJECTED_ATTEMPTS):
+        assert await dispatcher.dispatch_once() == 1
+    entry, = await entries()
+    assert (entry.status, entry.attempts) == (OutboxStatus.FAILED, settings.OUTBOX_MAX_REJECTED_ATTEMPTS)
+    # Book Service never judged the decrement, so the loan is left for an operator rather than cancelled
+    async with session_scope() as other:
+        assert (await LoanRepository(other).get_by_id(entry.loan_id)).status == LoanStatus.ACTIVE
+    assert dispatcher.stats()["cancelled_loans"] == 0
+
+async def test_unreachable_book_service_is_given_up_after_max_attempts(db, books, dispatcher, monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_RETRY_BACKOFF_BASE", 0.0)
+    monkeypatch.setattr(settings, "OUTBOX_MAX_ATTEMPTS", 4)
+    books.add(10)
+    await queue(db, "decrement", "increment")
+    books.error = httpx.ConnectError("connection refused")
+    
+    for _ in range(3):
+        await dispatcher.dispatch_once()
+    assert [entry.status for entry in await entries()] == [OutboxStatus.PENDING] * 2
+    await dispatcher.dispatch_once()
+    assert [(entry.status, entry.attempts) for entry in await entries()] == [(OutboxStatus.FAILED, 4)] * 2
+    # A timed-out decrement may have been applied, so its loan is kept
+    assert dispatcher.stats()["cancelled_loans"] == 0
+    assert await dispatcher.dispatch_once() == 0
+
+async def test_entries_missing_from_the_response_are_retried(db, books, dispatcher):
+    books.add(10, copies=2)
+    await queue(db, "decrement", "decrement")
+    real_update = books.update_availability_bulk
+    
+    async def truncated_update(items, atomic=True):
+        response = await real_update(items, atomic)
+        # Book Service answers for the second entry only
+        return {"results": response["results"][1:]}
+    
+    books.update_availability_bulk = truncated_update
+    await dispatcher.dispatch_once()
+    first, second = await entries()
+    assert (first.status, first.last_error) == (OutboxStatus.PENDING, "No result for operation")
+    assert second.status == OutboxStatus.DELIVERED
+    assert dispatcher.stats()["retried"] == 1
+
+async def test_refused_deferred_checkout_is_cancelled(db, books, dispatcher):
+    books.add(10, copies=1, available_copies=0)
+    await queue(db, "decrement")
+    
+    await dispatcher.dispatch_once()
+    entry, = await entries()
+    assert entry.status == OutboxStatus.FAILED
+    assert entry.last_error == "No copies"
+    async with session_scope() as other:
+        assert await LoanRepository(other).get_by_id(entry.loan_id) is None
+    assert dispatcher.stats()["cancelled_loans"] == 1
+
+async def returned(db, loan_id):
+    """Mark the loan returned and queue its increment, as returning it does"""
+    loans = LoanRepository(db)
+    loan = await loans.get_by_id(loan_id)
+    loan.status = LoanStatus.RETURNED
+    loan.return_date = datetime.utcnow()
+    OutboxRepository(db).enqueue(loan.id, loan.book_id, "increment")
+    await loans.update(loan)
+
+async def test_refused_decrement_of_a_returned_loan_withdraws_its_queued_increment(db, books, dispatcher, monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_BATCH_SIZE", 1)
+    books.add(10, copies=1, available_copies=0)
+    await queue(db, "decrement")
+    decrement, = await entries()
+    await returned(db, decrement.loan_id)
+    
+    # Only the decrement is claimed; the increment is still queued when it is refused
+    await dispatcher.dispatch_once()
+    assert [entry.status for entry in await entries()] == [OutboxStatus.FAILED]
+    async with session_scope() as other:
+        assert (await LoanRepository(other).get_by_id(decrement.loan_id)).status == LoanStatus.RETURNED
+    assert (dispatcher.stats()["cancelled_loans"], dispatcher.stats()["compensated_returns"]) == (0, 1)
+    assert books.books[10]["available_copies"] == 0
+
+async def test_refused_decrement_of_a_returned_loan_reverses_its_delivered_increment(db, books, dispatcher, monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_LEASE_SECONDS", 0.0)
+    books.add(10, copies=1, available_copies=0)
+    await queue(db, "decrement")
+    decrement, = await entries()
+    await returned(db, decrement.loan_id)
+    
+    # The increment is delivered in the same batch that the decrement is refused in
+    await dispatcher.dispatch_once()
+    assert books.books[10]["available_copies"] == 1
+    _, increment, reversal = await entries()
+    assert increment.status == OutboxStatus.DELIVERED
+    assert (reversal.operation, reversal.loan_id, reversal.status) == ("decrement", decrement.loan_id, OutboxStatus.PENDING)
+    
+    await dispatcher.dispatch_once()
+    assert books.books[10]["available_copies"] == 0
+    assert (await entries())[-1].status == OutboxStatus.DELIVERED
+    assert dispatcher.stats()["compensated_returns"] == 1
+
+async def test_claimed_entries_are_leased(db):
+    await queue(db, "increment")
+    outbox = OutboxRepository(db)
+    assert len(await outbox.claim_due(10, lease=60)) == 1
+    # A second dispatcher skips entries under lease
+    assert await outbox.claim_due(10, lease=60) == []
+    assert (await outbox.count_by_status())["pending"] == 1
@@ -0,0 +1,27 @@
+from datetime import datetime, timedelta
+from app.config.settings import settings
+from app.models.loan import LoanStatus
+from app.repositories.job_run_repository import JobRunRepository
+from app.repositories.loan_repository import LoanRepository
+from app.schemas.loan import LoanCreate
+from app.services.overdue_sweeper import OverdueSweeper
+
+async def test_sweep_marks_past_due_loans_in_chunks(db, monkeypatch):
+    monkeypatch.setattr(settings, "OVERDUE_SWEEP_CHUNK_SIZE", 2)
+    repository = LoanRepository(db)
+    now = datetime.utcnow()
+    loan_ids = [
+        (await repository.create(LoanCreate(user_id=1, book_id=book_id, due_date=now + timedelta(days=days)))).id
+        for book_id, days in enumerate([-1, -1, -1, -1, -1, 1])
+    ]
+    current_id = loan_ids[-1]
+    
+    sweeper = OverdueSweeper()
+    assert await sweeper.sweep_once() == 5
+    assert await sweeper.sweep_once() == 0
+    db.expire_all()
+    assert {loan.id: loan.status for loan in await repository.get_user_loans(1)} == {
+        loan_id: LoanStatus.ACTIVE if loan_id == current_id else LoanStatus.OVERDUE for loan_id in loan_ids
+    }
+    # The last run found nothing left to mark
+    assert (await JobRunRepository(db).get(OverdueSweeper.JOB_NAME)).processed == 0
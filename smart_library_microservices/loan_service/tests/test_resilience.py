@@ -0,0 +1,91 @@
+import httpx
+import pytest
+from app.clients.base_client import BaseServiceClient
+from app.clients.http_pool import http_pool
+from app.clients.resilience import CircuitBreaker, RetryBudget, resilience
+from app.config.settings import settings
+from app.core.exceptions import ServiceUnavailableException
+
+def test_breaker_opens_after_consecutive_failures(clock, monkeypatch):
+    monkeypatch.setattr(settings, "CIRCUIT_FAILURE_THRESHOLD", 3)
+    breaker = CircuitBreaker("test")
+    for _ in range(2):
+        breaker.record_failure()
+    breaker.record_success()
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    assert breaker.stats()["rejected"] == 1
+
+def test_breaker_lets_one_probe_through_after_recovery(clock, monkeypatch):
+    monkeypatch.setattr(settings, "CIRCUIT_FAILURE_THRESHOLD", 1)
+    monkeypatch.setattr(settings, "CIRCUIT_RECOVERY_TIMEOUT", 30.0)
+    breaker = CircuitBreaker("test")
+    breaker.record_failure()
+    
+    clock.advance(30)
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only the probe is let through
+    assert not breaker.allow_request()
+    
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.times_opened == 2
+    
+    clock.advance(30)
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+def test_lost_probe_expires(clock, monkeypatch):
+    monkeypatch.setattr(settings, "CIRCUIT_FAILURE_THRESHOLD", 1)
+    breaker = CircuitBreaker("test")
+    breaker.record_failure()
+    clock.advance(settings.CIRCUIT_RECOVERY_TIMEOUT)
+    assert breaker.allow_request()
+    
+    clock.advance(settings.CIRCUIT_RECOVERY_TIMEOUT)
+    assert breaker.allow_request()
+
+def test_retry_budget_refills_with_traffic(monkeypatch):
+    monkeypatch.setattr(settings, "RETRY_BUDGET_MIN_TOKENS", 1)
+    monkeypatch.setattr(settings, "RETRY_BUDGET_RATIO", 0.5)
+    budget = RetryBudget()
+    assert budget.try_spend()
+    assert not budget.try_spend()
+    budget.record_request()
+    budget.record_request()
+    assert budget.try_spend()
+    assert budget.stats() == {"tokens": 0.0, "retries": 2, "exhausted": 1}
+
+async def test_server_errors_open_the_circuit_and_then_fail_fast(monkeypatch):
+    monkeypatch.setattr(settings, "CIRCUIT_FAILURE_THRESHOLD", 2)
+    monkeypatch.setattr(settings, "RETRY_BACKOFF_MAX", 0.0)
+    calls = []
+    
+    def respond(request):
+        calls.append(request.url.path)
+        return httpx.Response(503)
+    
+    name = "Flaky Service"
+    pooled = http_pool.get(name, "http://flaky", 1)
+    await pooled.client.aclose()
+    pooled.client = httpx.AsyncClient(base_url="http://flaky", transport=httpx.MockTransport(respond))
+    client = BaseServiceClient("http://flaky")
+    
+    # The GET is retried once, which is the second failure and opens the circuit
+    with pytest.raises(ServiceUnavailableException):
+        await client._make_request("GET", "/things", name)
+    assert calls == ["/things", "/things"]
+    assert resilience.get(name).breaker.state == CircuitBreaker.OPEN
+    
+    with pytest.raises(ServiceUnavailableException):
+        await client._make_request("GET", "/things", name)
+    assert len(calls) == 2
+    await pooled.client.aclose()
@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from library_common.serialization import FastJSONResponse, from_orm
+from app.models.loan import Loan, LoanStatus
+from app.schemas.loan import LoanResponse, LoanWithDetailsResponse
+from app.services.loan_service import LoanService
+
+async def default_json(model, content) -> bytes:
+    """What FastAPI renders when a handler returns content for response_model=model"""
+    field = create_response_field(f"Response_{model.__name__}", model)
+    return JSONResponse(await serialize_response(field=field, response_content=content)).body
+
+def loan(status, issued, returned=None):
+    return Loan(
+        id=1, user_id=2, book_id=3, issue_date=issued, due_date=issued.replace(day=16), return_date=returned,
+        status=status, extensions_count=0, created_at=issued, updated_at=returned or issued
+    )
+
+LOANS = [
+    loan(LoanStatus.ACTIVE, datetime(2026, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc)),
+    loan(LoanStatus.OVERDUE, datetime(2026, 1, 2, 3, 4, 5)),
+    loan(
+        LoanStatus.RETURNED, datetime(2026, 1, 2, tzinfo=timezone.utc), datetime(2026, 1, 9, 12, tzinfo=timezone.utc)
+    ),
+]
+
+def details(row):
+    user = {"id": 2, "name": "Zoë", "email": "zoe@example.com"}
+    book = {"id": 3, "title": "Dune", "author": "Herbert", "genre": None, "updated_at": "2026-01-02T00:00:00Z"}
+    return LoanService._to_details(row, user, book)
+
+@pytest.mark.parametrize("row", LOANS)
+async def test_loan_matches_default_encoding(row):
+    response = from_orm(LoanResponse, row)
+    assert FastJSONResponse(response).body == await default_json(LoanResponse, response)
+
+@pytest.mark.parametrize("row", LOANS)
+async def test_loan_with_details_matches_default_encoding(row):
+    response = details(row)
+    assert FastJSONResponse(response).body == await default_json(LoanWithDetailsResponse, response)
+
+def test_constructed_responses_set_every_field():
+    """construct skips defaults: a field added to a response model must also be added where it is built"""
+    built = [(LoanResponse, from_orm(LoanResponse, LOANS[0])), (LoanWithDetailsResponse, details(LOANS[0]))]
+    for model, response in built:
+        assert set(response.__dict__) == set(model.model_fields), model.__name__
+        assert response.model_fields_set == set(model.model_fields), model.__name__
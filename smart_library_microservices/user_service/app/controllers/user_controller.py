@@ -1,13 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
-from typing import Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Any, List, Optional
+from library_common.imports import iter_records
+from library_common.serialization import FastJSONResponse
 from app.config.database import get_db
 from app.services.user_service import UserService
 from app.schemas.user import (
     UserCreate, UserUpdate, UserResponse, 
-    UserListResponse, PaginationParams
+    UserListResponse, PaginationParams, UserBatchResponse,
+    ImportFormat, IMPORT_CSV_COLUMNS, UserImportResponse
 )
-from app.core.exceptions import UserServiceException
+from app.core.exceptions import UserServiceException, InvalidUserDataException, InvalidImportFileException
 from app.core.logging import logger
 
 router = APIRouter(prefix="/api/users", tags=["users"])
@@ -15,27 +18,71 @@ router = APIRouter(prefix="/api/users", tags=["users"])
 @router.post("", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def create_user(
     user_data: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> UserResponse:
     """Create a new user"""
     try:
         service = UserService(db)
-        return service.create_user(user_data)
+        return await service.create_user(user_data)
     except UserServiceException as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
         logger.error(f"Unexpected error creating user: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.post("/import", response_model=UserImportResponse)
+async def import_users(
+    request: Request,
+    format: Optional[ImportFormat] = Query(None, description="csv or ndjson; defaults to csv for a text/csv body"),
+    db: AsyncSession = Depends(get_db)
+) -> UserImportResponse:
+    """Create users from a streamed CSV or NDJSON body, reporting counts and the rows that failed"""
+    try:
+        if format is None:
+            format = ImportFormat.CSV if "csv" in request.headers.get("content-type", "") else ImportFormat.NDJSON
+        service = UserService(db)
+        return await service.import_users(iter_records(
+            request.stream(), format, IMPORT_CSV_COLUMNS, InvalidImportFileException
+        ))
+    except UserServiceException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        logger.error(f"Unexpected error importing users: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+def parse_ids(ids: str) -> List[int]:
+    """Parse a comma-separated list of IDs, dropping duplicates but keeping order"""
+    try:
+        parsed = [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise InvalidUserDataException({"ids": "ids must be a comma-separated list of integers"})
+    return list(dict.fromkeys(parsed))
+
+@router.get("/batch", response_model=UserBatchResponse)
+async def get_users_batch(
+    ids: str = Query(..., description="Comma-separated user IDs"),
+    db: AsyncSession = Depends(get_db)
+) -> FastJSONResponse:
+    """Get several users by ID in one request"""
+    try:
+        service = UserService(db)
+        users, not_found = await service.get_users(parse_ids(ids))
+        return FastJSONResponse(UserBatchResponse.model_construct(users=users, not_found=not_found))
+    except UserServiceException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        logger.error(f"Unexpected error fetching users batch: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: int,
-    db: Session = Depends(get_db)
-) -> UserResponse:
+    db: AsyncSession = Depends(get_db)
+) -> FastJSONResponse:
     """Get user by ID"""
     try:
         service = UserService(db)
-        return service.get_user(user_id)
+        return FastJSONResponse(await service.get_user(user_id))
     except UserServiceException as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
@@ -46,12 +93,12 @@ async def get_user(
 async def update_user(
     user_id: int,
     user_data: UserUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> UserResponse:
     """Update user"""
     try:
         service = UserService(db)
-        return service.update_user(user_id, user_data)
+        return await service.update_user(user_id, user_data)
     except UserServiceException as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
@@ -61,12 +108,12 @@ async def update_user(
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> None:
     """Delete user"""
     try:
         service = UserService(db)
-        service.delete_user(user_id)
+        await service.delete_user(user_id)
     except UserServiceException as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
@@ -77,19 +124,25 @@ async def delete_user(
 async def list_users(
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db)
-) -> UserListResponse:
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page; replaces page"),
+    exact_total: bool = Query(False, description="Always count exactly instead of estimating large totals"),
+    db: AsyncSession = Depends(get_db)
+) -> FastJSONResponse:
     """List users with pagination"""
     try:
         service = UserService(db)
-        users, total = service.list_users(page, per_page)
+        result = await service.list_users(page, per_page, cursor, exact_total)
         
-        return UserListResponse(
-            users=users,
-            total=total,
-            page=page,
-            per_page=per_page
-        )
+        return FastJSONResponse(UserListResponse.model_construct(
+            users=result.items,
+            total=result.total,
+            page=page if cursor is None else None,
+            per_page=per_page,
+            next_cursor=result.next_cursor,
+            total_exact=result.total_exact
+        ))
+    except UserServiceException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
         logger.error(f"Unexpected error listing users: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -24,6 +24,14 @@ class UserAlreadyExistsException(UserServiceException):
             status_code=409
         )
 
+class InvalidImportFileException(UserServiceException):
+    """Raised when an import file cannot be read at all"""
+    def __init__(self, reason: str):
+        super().__init__(
+            message=f"Invalid import file: {reason}",
+            status_code=400
+        )
+
 class InvalidUserDataException(UserServiceException):
     """Raised when user data is invalid"""
     def __init__(self, details: Dict[str, Any]):
@@ -6,7 +6,7 @@ from datetime import datetime
 from sqlalchemy import text
 
 from app.config.settings import settings
-from app.config.database import engine, get_db
+from app.config.database import engine, async_engine, get_db
 from app.models.user import Base
 from app.controllers.user_controller import router as user_router
 from app.schemas.user import HealthResponse
@@ -21,6 +21,8 @@ async def lifespan(app: FastAPI):
     logger.info("Database tables created")
     yield
     logger.info(f"Shutting down {settings.SERVICE_NAME}")
+    if async_engine is not None:
+        await async_engine.dispose()
 
 # Create FastAPI app
 app = FastAPI(
@@ -57,15 +59,12 @@ async def health_check():
     """Health check endpoint"""
     try:
         # Check database connection
-        db = next(get_db())
-        db.execute(text("SELECT 1"))
+        async for db in get_db():
+            await db.execute(text("SELECT 1"))
         db_status = "healthy"
     except Exception as e:
         logger.error(f"Database health check failed: {str(e)}")
         db_status = "unhealthy"
-    finally:
-        if 'db' in locals():
-            db.close()
     
     return HealthResponse(
         status="healthy" if db_status == "healthy" else "degraded",
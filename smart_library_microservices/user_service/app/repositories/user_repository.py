@@ -1,32 +1,74 @@
-from typing import Optional, List, Tuple
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from typing import Optional, List, Dict, Set
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from library_common.pagination import Page, encode_cursor, decode_cursor, split_page, fetch_offset_page
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
+from app.config.settings import settings
 
 class UserRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
-    def create(self, user_data: UserCreate) -> User:
+    async def create(self, user_data: UserCreate) -> User:
         """Create a new user"""
         user = User(**user_data.model_dump())
         self.db.add(user)
-        self.db.commit()
-        self.db.refresh(user)
+        await self.db.commit()
+        await self.db.refresh(user)
         return user
     
-    def get_by_id(self, user_id: int) -> Optional[User]:
+    async def create_many(self, users: List[UserCreate]) -> Dict[str, int]:
+        """Insert users with multi-row INSERTs in one transaction, skipping emails that already exist;
+        returns the id of each user inserted by email"""
+        if not users:
+            return {}
+        rows = [user.model_dump() for user in users]
+        
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            statement = postgresql.insert(User).on_conflict_do_nothing(index_elements=[User.email])
+        elif dialect == "sqlite":
+            statement = sqlite.insert(User).on_conflict_do_nothing(index_elements=[User.email])
+        else:
+            statement = insert(User)
+        # Rows are sent as batched multi-row VALUES; RETURNING yields only the rows inserted
+        result = await self.db.execute(statement.returning(User.id, User.email), rows)
+        created = {email: user_id for user_id, email in result.all()}
+        await self.db.commit()
+        return created
+    
+    async def get_existing_emails(self, emails: List[str]) -> Set[str]:
+        """Those of the emails that are registered, in one query"""
+        if not emails:
+            return set()
+        result = await self.db.execute(select(User.email).where(User.email.in_(emails)))
+        return set(result.scalars().all())
+    
+    async def rollback(self) -> None:
+        """Discard the pending transaction"""
+        await self.db.rollback()
+    
+    async def get_by_id(self, user_id: int) -> Optional[User]:
         """Get user by ID"""
-        return self.db.query(User).filter(User.id == user_id).first()
+        return await self.db.get(User, user_id)
+    
+    async def get_by_ids(self, user_ids: List[int]) -> List[User]:
+        """Get users by a list of IDs in a single query"""
+        if not user_ids:
+            return []
+        result = await self.db.execute(select(User).where(User.id.in_(user_ids)))
+        return list(result.scalars().all())
     
-    def get_by_email(self, email: str) -> Optional[User]:
+    async def get_by_email(self, email: str) -> Optional[User]:
         """Get user by email"""
-        return self.db.query(User).filter(User.email == email).first()
+        result = await self.db.execute(select(User).where(User.email == email).limit(1))
+        return result.scalars().first()
     
-    def update(self, user_id: int, user_data: UserUpdate) -> Optional[User]:
+    async def update(self, user_id: int, user_data: UserUpdate) -> Optional[User]:
         """Update user"""
-        user = self.get_by_id(user_id)
+        user = await self.get_by_id(user_id)
         if not user:
             return None
         
@@ -34,28 +76,41 @@ class UserRepository:
         for field, value in update_data.items():
             setattr(user, field, value)
         
-        self.db.commit()
-        self.db.refresh(user)
+        await self.db.commit()
+        await self.db.refresh(user)
         return user
     
-    def delete(self, user_id: int) -> bool:
+    async def delete(self, user_id: int) -> bool:
         """Delete user"""
-        user = self.get_by_id(user_id)
+        user = await self.get_by_id(user_id)
         if not user:
             return False
         
-        self.db.delete(user)
-        self.db.commit()
+        await self.db.delete(user)
+        await self.db.commit()
         return True
     
-    def list_all(self, page: int, per_page: int) -> Tuple[List[User], int]:
-        """List all users with pagination"""
-        query = self.db.query(User)
-        total = query.count()
+    async def list_all(
+        self, page: int, per_page: int, cursor: Optional[str] = None, exact_total: bool = False
+    ) -> Page:
+        """List users by id, by page number or after a cursor (which skips the total count)"""
+        query = select(User).order_by(User.id)
+        total, total_exact = None, True
+        
+        if cursor is None:
+            rows, total, total_exact = await fetch_offset_page(
+                self.db, query, page, per_page,
+                estimate_table=None if exact_total else User.__tablename__,
+                estimate_threshold=settings.COUNT_ESTIMATE_THRESHOLD
+            )
+        else:
+            last_id, = decode_cursor(cursor, int)
+            rows = (await self.db.execute(query.where(User.id > last_id).limit(per_page + 1))).scalars().all()
         
-        users = query.offset((page - 1) * per_page).limit(per_page).all()
-        return users, total
+        users, has_more = split_page(rows, per_page)
+        next_cursor = encode_cursor(users[-1].id) if has_more else None
+        return Page(users, total, next_cursor, total_exact)
     
-    def count(self) -> int:
+    async def count(self) -> int:
         """Count total users"""
-        return self.db.query(func.count(User.id)).scalar()
+        return await self.db.scalar(select(func.count(User.id)))
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, EmailStr, Field, ConfigDict
 from datetime import datetime
 from typing import Optional
+from library_common.imports import ImportFormat
 from app.models.user import UserRole
 
 class UserBase(BaseModel):
@@ -25,10 +26,40 @@ class UserResponse(UserBase):
 
 class UserListResponse(BaseModel):
     users: list[UserResponse]
-    total: int
-    page: int
+    # Not computed in cursor mode
+    total: Optional[int] = None
+    page: Optional[int] = None
     per_page: int
-    
+    next_cursor: Optional[str] = None
+    # False when total is a planner estimate
+    total_exact: bool = True
+
+class UserBatchResponse(BaseModel):
+    users: list[UserResponse]
+    not_found: list[int]
+
+# Columns an import's CSV header must name
+IMPORT_CSV_COLUMNS = ("name", "email")
+
+class UserImportError(BaseModel):
+    # 1-based, not counting a CSV header
+    row: int
+    email: Optional[str] = None
+    error: str
+
+class UserImportResponse(BaseModel):
+    received: int = 0
+    created: int = 0
+    # Emails already registered or earlier in the file
+    duplicates: int = 0
+    failed: int = 0
+    # Failed rows, in the order they were found
+    errors: list[UserImportError] = []
+    # True when more rows failed than are listed
+    errors_truncated: bool = False
+    duration_seconds: float = 0.0
+    rows_per_second: float = 0.0
+
 class PaginationParams(BaseModel):
     page: int = Field(1, ge=1)
     per_page: int = Field(10, ge=1, le=100)
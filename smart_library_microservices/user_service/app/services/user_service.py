@@ -1,82 +1,190 @@
-from typing import List, Tuple
-from sqlalchemy.orm import Session
+import time
+from typing import AsyncIterator, List, Tuple, Optional
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from library_common.imports import ImportRecord
+from library_common.pagination import Page, InvalidCursorError
+from library_common.serialization import from_orm
 from app.repositories.user_repository import UserRepository
-from app.schemas.user import UserCreate, UserUpdate, UserResponse
-from app.core.exceptions import UserNotFoundException, UserAlreadyExistsException
+from app.schemas.user import (
+    UserCreate, UserUpdate, UserResponse,
+    UserImportResponse, UserImportError
+)
+from app.core.exceptions import (
+    UserNotFoundException, UserAlreadyExistsException, InvalidUserDataException
+)
+from app.config.settings import settings
 from app.core.logging import logger
 
 class UserService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.repository = UserRepository(db)
     
-    def create_user(self, user_data: UserCreate) -> UserResponse:
+    async def create_user(self, user_data: UserCreate) -> UserResponse:
         """Create a new user"""
         logger.info(f"Creating user with email: {user_data.email}")
         
         # Check if user already exists
-        existing_user = self.repository.get_by_email(user_data.email)
+        existing_user = await self.repository.get_by_email(user_data.email)
         if existing_user:
             logger.warning(f"User with email {user_data.email} already exists")
             raise UserAlreadyExistsException(user_data.email)
         
         # Create user
-        user = self.repository.create(user_data)
+        user = await self.repository.create(user_data)
         logger.info(f"User created with id: {user.id}")
         
-        return UserResponse.model_validate(user)
+        return from_orm(UserResponse, user)
     
-    def get_user(self, user_id: int) -> UserResponse:
+    async def import_users(self, records: AsyncIterator[ImportRecord]) -> UserImportResponse:
+        """Create users from a stream of rows in batches, reporting rows that fail instead of stopping"""
+        logger.info("Importing users")
+        started = time.perf_counter()
+        report = UserImportResponse()
+        # Emails earlier in this import
+        seen = set()
+        batch: List[Tuple[int, UserCreate]] = []
+        
+        async for record in records:
+            report.received += 1
+            if record.error is not None:
+                self._reject_import_row(report, record.row, None, record.error)
+                continue
+            try:
+                user = UserCreate.model_validate(record.data)
+            except ValidationError as e:
+                email = record.data.get("email")
+                self._reject_import_row(report, record.row, email if isinstance(email, str) else None, "; ".join(
+                    f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+                ))
+                continue
+            if user.email in seen:
+                report.duplicates += 1
+                continue
+            seen.add(user.email)
+            
+            batch.append((record.row, user))
+            if len(batch) >= settings.IMPORT_BATCH_SIZE:
+                await self._import_batch(batch, report)
+                batch = []
+        if batch:
+            await self._import_batch(batch, report)
+        
+        elapsed = time.perf_counter() - started
+        report.duration_seconds = round(elapsed, 3)
+        report.rows_per_second = round(report.received / elapsed, 1) if elapsed else 0.0
+        logger.info(
+            f"User import finished: {report.received} rows, {report.created} created, "
+            f"{report.duplicates} duplicates, {report.failed} failed in {report.duration_seconds}s "
+            f"({report.rows_per_second} rows/s)"
+        )
+        return report
+    
+    async def _import_batch(self, batch: List[Tuple[int, UserCreate]], report: UserImportResponse) -> None:
+        """Insert the rows of a batch whose emails are not yet registered"""
+        existing = await self.repository.get_existing_emails([user.email for _, user in batch])
+        new = []
+        for row, user in batch:
+            if user.email in existing:
+                report.duplicates += 1
+            else:
+                new.append((row, user))
+        
+        try:
+            created = await self.repository.create_many([user for _, user in new])
+        except SQLAlchemyError as e:
+            await self.repository.rollback()
+            logger.error(f"Import batch of {len(new)} users failed: {str(e)}")
+            for row, user in new:
+                self._reject_import_row(report, row, user.email, "Batch insert failed")
+            return
+        
+        report.created += len(created)
+        # The rest were registered concurrently since the lookup
+        report.duplicates += len(new) - len(created)
+    
+    @staticmethod
+    def _reject_import_row(report: UserImportResponse, row: int, email: Optional[str], error: str) -> None:
+        report.failed += 1
+        if len(report.errors) < settings.IMPORT_MAX_ERRORS:
+            report.errors.append(UserImportError(row=row, email=email, error=error))
+        else:
+            report.errors_truncated = True
+    
+    async def get_user(self, user_id: int) -> UserResponse:
         """Get user by ID"""
         logger.info(f"Fetching user with id: {user_id}")
         
-        user = self.repository.get_by_id(user_id)
+        user = await self.repository.get_by_id(user_id)
         if not user:
             logger.warning(f"User with id {user_id} not found")
             raise UserNotFoundException(user_id)
         
-        return UserResponse.model_validate(user)
+        return from_orm(UserResponse, user)
+    
+    async def get_users(self, user_ids: List[int]) -> Tuple[List[UserResponse], List[int]]:
+        """Get several users by ID, reporting the IDs that were not found"""
+        logger.info(f"Fetching {len(user_ids)} users by id")
+        
+        if len(user_ids) > settings.MAX_BATCH_SIZE:
+            raise InvalidUserDataException({
+                "ids": f"At most {settings.MAX_BATCH_SIZE} ids may be requested at once"
+            })
+        
+        users = {user.id: user for user in await self.repository.get_by_ids(user_ids)}
+        found = [from_orm(UserResponse, users[user_id]) for user_id in user_ids if user_id in users]
+        not_found = [user_id for user_id in user_ids if user_id not in users]
+        if not_found:
+            logger.warning(f"Users not found: {not_found}")
+        
+        return found, not_found
     
-    def update_user(self, user_id: int, user_data: UserUpdate) -> UserResponse:
+    async def update_user(self, user_id: int, user_data: UserUpdate) -> UserResponse:
         """Update user"""
         logger.info(f"Updating user with id: {user_id}")
         
         # Check if user exists
-        user = self.repository.get_by_id(user_id)
+        user = await self.repository.get_by_id(user_id)
         if not user:
             logger.warning(f"User with id {user_id} not found")
             raise UserNotFoundException(user_id)
         
         # Check if email is being updated and already exists
         if user_data.email and user_data.email != user.email:
-            existing_user = self.repository.get_by_email(user_data.email)
+            existing_user = await self.repository.get_by_email(user_data.email)
             if existing_user:
                 logger.warning(f"User with email {user_data.email} already exists")
                 raise UserAlreadyExistsException(user_data.email)
         
         # Update user
-        updated_user = self.repository.update(user_id, user_data)
+        updated_user = await self.repository.update(user_id, user_data)
         logger.info(f"User {user_id} updated successfully")
         
-        return UserResponse.model_validate(updated_user)
+        return from_orm(UserResponse, updated_user)
     
-    def delete_user(self, user_id: int) -> bool:
+    async def delete_user(self, user_id: int) -> bool:
         """Delete user"""
         logger.info(f"Deleting user with id: {user_id}")
         
-        if not self.repository.get_by_id(user_id):
+        if not await self.repository.get_by_id(user_id):
             logger.warning(f"User with id {user_id} not found")
             raise UserNotFoundException(user_id)
         
-        result = self.repository.delete(user_id)
+        result = await self.repository.delete(user_id)
         logger.info(f"User {user_id} deleted successfully")
         
         return result
     
-    def list_users(self, page: int, per_page: int) -> Tuple[List[UserResponse], int]:
+    async def list_users(
+        self, page: int, per_page: int, cursor: Optional[str] = None, exact_total: bool = False
+    ) -> Page:
         """List all users with pagination"""
-        logger.info(f"Listing users - page: {page}, per_page: {per_page}")
+        logger.info(f"Listing users - page: {page}, per_page: {per_page}, cursor: {cursor}")
         
-        users, total = self.repository.list_all(page, per_page)
-        user_responses = [UserResponse.model_validate(user) for user in users]
+        try:
+            result = await self.repository.list_all(page, per_page, cursor, exact_total)
+        except InvalidCursorError as e:
+            raise InvalidUserDataException({"cursor": str(e)})
         
-        return user_responses, total
+        return result._replace(items=[from_orm(UserResponse, user) for user in result.items])
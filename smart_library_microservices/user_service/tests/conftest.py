@@ -0,0 +1,35 @@
+import os
+import tempfile
+
+# Point the service at a throwaway SQLite database before the app reads its settings
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'user_service_test.db')}"
+
+import httpx
+import pytest
+from app.config.database import AsyncSessionLocal, Base, SessionLocal, ThreadedSession, async_engine, engine
+from app.main import app
+
+@pytest.fixture
+async def database():
+    Base.metadata.create_all(bind=engine)
+    yield
+    # Pooled aiosqlite connections belong to this test's event loop
+    await async_engine.dispose()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+async def db(database):
+    async with AsyncSessionLocal() as session:
+        yield session
+
+@pytest.fixture
+async def threaded_db(database):
+    """The DATABASE_ASYNC=false session: sync SQLAlchemy run in worker threads"""
+    session = ThreadedSession(SessionLocal(expire_on_commit=False))
+    yield session
+    await session.close()
+
+@pytest.fixture
+async def client(database):
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        yield client
@@ -0,0 +1,25 @@
+from datetime import datetime, timezone
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from library_common.serialization import FastJSONResponse, from_orm
+from app.models.user import User, UserRole
+from app.schemas.user import UserResponse
+
+async def default_json(model, content) -> bytes:
+    """What FastAPI renders when a handler returns content for response_model=model"""
+    field = create_response_field(f"Response_{model.__name__}", model)
+    return JSONResponse(await serialize_response(field=field, response_content=content)).body
+
+@pytest.mark.parametrize("created_at", [
+    datetime(2026, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+    # SQLite hands back naive datetimes
+    datetime(2026, 1, 2, 3, 4, 5)
+])
+@pytest.mark.parametrize("role", list(UserRole))
+async def test_user_matches_default_encoding(created_at, role):
+    user = User(id=1, name="Zoë", email="zoe@example.com", role=role, created_at=created_at, updated_at=created_at)
+    response = from_orm(UserResponse, user)
+    assert set(response.__dict__) == set(UserResponse.model_fields)
+    assert FastJSONResponse(response).body == await default_json(UserResponse, response)
@@ -0,0 +1,66 @@
+from typing import AsyncIterator
+from library_common.imports import iter_records
+from app.config.settings import settings
+from app.core.exceptions import InvalidImportFileException
+from app.schemas.user import IMPORT_CSV_COLUMNS, ImportFormat
+from app.services.user_service import UserService
+
+async def chunked(data: bytes, size: int = 7) -> AsyncIterator[bytes]:
+    """Feed a body in small pieces, splitting lines and characters across chunks"""
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+def records(data: bytes, import_format: ImportFormat):
+    return iter_records(chunked(data), import_format, IMPORT_CSV_COLUMNS, InvalidImportFileException)
+
+async def test_import_counts_rows_and_lists_only_failures(db):
+    data = (
+        "name,email,role\n"
+        "Ann,ann@example.com,\n"
+        "Bob,not-an-email,\n"
+        "Ann again,ann@example.com,\n"
+        "Cy,cy@example.com,faculty,extra\n"
+    ).encode()
+    report = await UserService(db).import_users(records(data, ImportFormat.CSV))
+    
+    assert (report.received, report.created, report.duplicates, report.failed) == (4, 1, 1, 2)
+    assert [error.row for error in report.errors] == [2, 4]
+    assert report.errors[0].email == "not-an-email"
+    assert report.errors[1].error == "Expected 3 fields, got 4"
+    assert not report.errors_truncated
+
+async def test_reimport_only_counts_duplicates(db):
+    data = b"name,email\nAnn,ann@example.com\nBob,bob@example.com\n"
+    service = UserService(db)
+    await service.import_users(records(data, ImportFormat.CSV))
+    report = await service.import_users(records(data, ImportFormat.CSV))
+    assert (report.created, report.duplicates, report.failed) == (0, 2, 0)
+    assert report.errors == []
+
+async def test_import_error_list_is_capped(db, monkeypatch):
+    monkeypatch.setattr(settings, "IMPORT_MAX_ERRORS", 2)
+    monkeypatch.setattr(settings, "IMPORT_BATCH_SIZE", 2)
+    data = "".join(f'{{"name": "U{i}", "email": "bad{i}"}}\n' for i in range(5)).encode()
+    data += b'{"name": "Ok", "email": "ok@example.com"}\n'
+    report = await UserService(db).import_users(records(data, ImportFormat.NDJSON))
+    
+    assert report.failed == 5
+    assert report.created == 1
+    assert [error.row for error in report.errors] == [1, 2]
+    assert report.errors_truncated
+
+async def test_import_endpoint(client):
+    response = await client.post(
+        "/api/users/import",
+        content=b"name,email\nAnn,ann@example.com\nBob,bob\n",
+        headers={"content-type": "text/csv"}
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["created"], body["failed"]) == (1, 1)
+    assert body["errors"][0]["row"] == 2
+    
+    response = await client.post(
+        "/api/users/import", content=b"email\nann@example.com\n", headers={"content-type": "text/csv"}
+    )
+    assert response.status_code == 400
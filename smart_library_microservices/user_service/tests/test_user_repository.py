@@ -0,0 +1,129 @@
+import pytest
+from library_common.pagination import InvalidCursorError
+from app.repositories.user_repository import UserRepository
+from app.schemas.user import UserCreate, UserUpdate
+
+def make_users(count, start=0):
+    return [UserCreate(name=f"User {i}", email=f"user{i}@example.com") for i in range(start, start + count)]
+
+@pytest.fixture(params=["async", "threaded"])
+def session(request, db, threaded_db):
+    """Both session modes DATABASE_ASYNC selects between"""
+    return db if request.param == "async" else threaded_db
+
+async def test_create_get_update_delete(session):
+    repository = UserRepository(session)
+    user = await repository.create(UserCreate(name="Ann", email="ann@example.com"))
+    assert user.id is not None
+    assert user.created_at is not None
+    
+    assert (await repository.get_by_email("ann@example.com")).id == user.id
+    updated = await repository.update(user.id, UserUpdate(name="Anne"))
+    assert updated.name == "Anne"
+    assert (await repository.get_by_id(user.id)).email == "ann@example.com"
+    
+    assert await repository.delete(user.id)
+    assert await repository.get_by_id(user.id) is None
+    assert not await repository.delete(user.id)
+
+async def test_count(session):
+    repository = UserRepository(session)
+    for i in range(3):
+        await repository.create(UserCreate(name=f"User {i}", email=f"user{i}@example.com"))
+    assert await repository.count() == 3
+
+async def test_user_endpoints(client):
+    response = await client.post("/api/users", json={"name": "Ann", "email": "ann@example.com"})
+    assert response.status_code == 201
+    user_id = response.json()["id"]
+    
+    assert (await client.get(f"/api/users/{user_id}")).json()["name"] == "Ann"
+    response = await client.post("/api/users", json={"name": "Ann", "email": "ann@example.com"})
+    assert response.status_code == 409
+    assert (await client.delete(f"/api/users/{user_id}")).status_code == 204
+    assert (await client.get(f"/api/users/{user_id}")).status_code == 404
+
+async def test_get_by_ids_returns_only_existing(db):
+    repository = UserRepository(db)
+    ann = await repository.create(UserCreate(name="Ann", email="ann@example.com"))
+    await repository.create(UserCreate(name="Bob", email="bob@example.com"))
+    assert [user.email for user in await repository.get_by_ids([ann.id, 999])] == ["ann@example.com"]
+    assert await repository.get_by_ids([]) == []
+
+async def test_batch_endpoint_reports_missing_ids(client):
+    user_id = (await client.post("/api/users", json={"name": "Ann", "email": "ann@example.com"})).json()["id"]
+    
+    body = (await client.get("/api/users/batch", params={"ids": f"{user_id},999,{user_id}"})).json()
+    assert [user["id"] for user in body["users"]] == [user_id]
+    assert body["not_found"] == [999]
+    
+    assert (await client.get("/api/users/batch", params={"ids": "1,x"})).status_code == 400
+
+async def test_cursor_pages_cover_every_user_once(db):
+    repository = UserRepository(db)
+    for i in range(7):
+        await repository.create(UserCreate(name=f"User {i}", email=f"user{i}@example.com"))
+    seen = []
+    cursor = None
+    while True:
+        page = await repository.list_all(page=1, per_page=3, cursor=cursor)
+        if cursor is not None:
+            # Cursor pages skip the count
+            assert page.total is None
+        seen.extend(user.email for user in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert seen == [f"user{i}@example.com" for i in range(7)]
+
+async def test_malformed_cursor_is_rejected(db):
+    with pytest.raises(InvalidCursorError):
+        await UserRepository(db).list_all(page=1, per_page=10, cursor="not-a-cursor")
+
+async def test_list_endpoint_follows_cursor(client):
+    for i in range(3):
+        response = await client.post("/api/users", json={"name": f"User {i}", "email": f"user{i}@example.com"})
+        assert response.status_code == 201
+    
+    first = (await client.get("/api/users", params={"per_page": 2})).json()
+    assert first["total"] == 3
+    assert len(first["users"]) == 2
+    
+    second = (await client.get("/api/users", params={"per_page": 2, "cursor": first["next_cursor"]})).json()
+    assert [user["email"] for user in second["users"]] == ["user2@example.com"]
+    assert second["next_cursor"] is None
+    assert second["page"] is None
+    
+    response = await client.get("/api/users", params={"cursor": "%%%"})
+    assert response.status_code == 400
+
+async def test_offset_page_reports_exact_total(db):
+    repository = UserRepository(db)
+    for i in range(5):
+        await repository.create(UserCreate(name=f"User {i}", email=f"user{i}@example.com"))
+    page = await repository.list_all(page=2, per_page=2)
+    assert [user.email for user in page.items] == ["user2@example.com", "user3@example.com"]
+    assert (page.total, page.total_exact) == (5, True)
+    assert page.next_cursor is not None
+    
+    # The last page and pages past it report the total too
+    assert (await repository.list_all(page=3, per_page=2)).total == 5
+    past_end = await repository.list_all(page=4, per_page=2)
+    assert past_end.items == []
+    assert past_end.total == 5
+
+async def test_create_many_skips_registered_emails(db):
+    repository = UserRepository(db)
+    first = await repository.create_many(make_users(3))
+    assert sorted(first) == ["user0@example.com", "user1@example.com", "user2@example.com"]
+    
+    second = await repository.create_many(make_users(3, start=2))
+    assert sorted(second) == ["user3@example.com", "user4@example.com"]
+    assert await repository.count() == 5
+
+async def test_get_existing_emails(db):
+    repository = UserRepository(db)
+    await repository.create_many(make_users(2))
+    existing = await repository.get_existing_emails(["user1@example.com", "nobody@example.com"])
+    assert existing == {"user1@example.com"}
+    assert await repository.get_existing_emails([]) == set()